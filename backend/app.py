@@ -1,9 +1,9 @@
 import os
 import json
-import joblib
+import math
+import time
 import numpy as np
 import base64
-from io import BytesIO
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
@@ -12,16 +12,26 @@ from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 
-import torch
-import torch.nn as nn
-import matplotlib
-matplotlib.use('Agg')  # Use 'Agg' backend to prevent GUI warnings in non-GUI servers
-import matplotlib.pyplot as plt
-
 import pandas as pd
 import google.generativeai as genai
 from PIL import Image
 
+from stock_model import SUPPORTED_SYMBOLS, model_file_paths
+from model_registry import model_registry
+from forecasting import FORECAST_HORIZON, forecast_many
+from forecast_store import ForecastStore
+from charts import CHART_FORMATS, HISTORY_POINTS, chart_cache, chart_spec
+from render_pool import RenderPoolFull, render_pool
+from company_index import DEFAULT_PAGE_SIZE, company_index
+from symbol_suggest import DEFAULT_SUGGESTIONS
+from history_series import DEFAULT_LTTB_POINTS, history_cache
+from price_history import is_valid_symbol
+from response_cache import response_cache
+from news_index import DEFAULT_PAGE_SIZE as NEWS_PAGE_SIZE, news_index
+from search_index import DEFAULT_RESULTS as SEARCH_RESULTS, search_index
+from single_flight import input_hash, single_flight
+from last_updated import INGEST_TOKEN, INGEST_TOKEN_HEADER, read_last_updated
+
 
 load_dotenv()
 
@@ -43,94 +53,20 @@ app.config['SECRET_KEY'] = SECRET_KEY
 db = SQLAlchemy(app)
 
 # =========================
-# 1. Define the PyTorch Model
-# =========================
-
-class StockLSTM(nn.Module):
-    def __init__(self, input_size, hidden_size, num_layers, output_size):
-        super(StockLSTM, self).__init__()
-        self.hidden_size = hidden_size
-        self.num_layers = num_layers
-        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=0.4)
-        self.fc_layers = nn.Sequential(
-            nn.Linear(hidden_size, 64),
-            nn.ReLU(),
-            nn.Linear(64, 16),
-            nn.ReLU(),
-            nn.Linear(16, output_size)
-        )
-
-    def forward(self, x):
-        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
-        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
-        out, _ = self.lstm(x, (h0, c0))
-        out = self.fc_layers(out[:, -1, :])
-        return out
-
-# =========================
-# 2. Model Loading Function (Fixed input_size)
+# 1. Model Registry
 # =========================
+# StockLSTM and its loader live in stock_model.py. Routes fetch model components
+# through model_registry, which keeps them in memory until their files change.
 
-def load_model_and_scaler(symbol):
+@app.route('/api/model-registry', methods=['GET'])
+def get_model_registry_stats():
     """
-    Loads a trained PyTorch model, a scaler, and relevant data based on the symbol.
+    Returns hit/miss/reload counters of the in-memory model registry.
     """
-    try:
-        model_dir = os.path.join('D:\\Model', symbol, 'model_components')
-        historical_path = os.path.join(
-            'C:\\Users\\DELL\\Desktop\\Stock Prices',
-            f"{symbol}.csv"
-        )
-        model_path = os.path.join(model_dir, f'{symbol}_model.pth')
-        scaler_path = os.path.join(model_dir, f'{symbol}_scaler.pkl')
-        sequence_path = os.path.join(model_dir, f'{symbol.lower()}_last_sequence.npy')
-
-        # Check if all required files exist
-        required_files = [model_path, scaler_path, historical_path, sequence_path]
-        for path in required_files:
-            if not os.path.exists(path):
-                print(f"Missing file: {path}")
-                return None, None, None, None
-
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        
-        # Load model with correct input_size (26 features)
-        model = StockLSTM(
-            input_size=26,  # Updated to match trained model's expected input
-            hidden_size=128,
-            num_layers=3,
-            output_size=1
-        ).to(device)
-        
-        model.load_state_dict(torch.load(model_path, map_location=device))
-        model.eval()
-        
-        scaler = joblib.load(scaler_path)
-        historical_df = pd.read_csv(historical_path, index_col=0, parse_dates=True)
-        
-        if 'Close' not in historical_df.columns:
-            print("Missing 'Close' column in historical data")
-            return None, None, None, None
-            
-        # Filter out any NaT values in the index
-        historical_df = historical_df[~pd.isna(historical_df.index)]
-        historical_data = historical_df[['Close']]
-        last_sequence = np.load(sequence_path, allow_pickle=True)
-
-        # Validate and reshape sequence
-        if last_sequence.ndim == 1:
-            last_sequence = last_sequence.reshape((-1, 26))  # Match input_size
-        elif last_sequence.shape[1] != 26:
-            last_sequence = last_sequence[:, -26:]
-
-        return model, scaler, historical_data, last_sequence
-
-    except Exception as e:
-        print(f"Error loading model for {symbol}: {str(e)}")
-        return None, None, None, None
+    return jsonify(model_registry.stats())
 
 # =========================
-# 3. Fallback Prediction Generation Function
+# 2. Fallback Prediction Generation Function
 # =========================
 
 def generate_mock_prediction(symbol):
@@ -183,13 +119,14 @@ def generate_mock_prediction(symbol):
         predictions = historical_prices[-1] * (1 + prediction_walk)
         
         # Create plot
-        graph = create_prediction_plot(historical_data, predictions, future_dates, symbol, is_mock=True)
+        graph_url, chart = create_prediction_plot(historical_data, predictions, future_dates, symbol, is_mock=True)
         
         return {
             'success': True,
             'symbol': symbol,
             'predictions': predictions.tolist(),
-            'graph': graph,
+            'graph_url': graph_url,
+            'chart': chart,
             'dates': [d.strftime('%Y-%m-%d') for d in future_dates],
             'is_mock': True
         }
@@ -223,13 +160,14 @@ def generate_mock_prediction(symbol):
             historical_data = pd.DataFrame({'Close': historical_prices}, index=historical_dates)
             
             # Create plot
-            graph = create_prediction_plot(historical_data, predictions, future_dates, symbol, is_mock=True)
+            graph_url, chart = create_prediction_plot(historical_data, predictions, future_dates, symbol, is_mock=True)
             
             return {
                 'success': True,
                 'symbol': symbol,
                 'predictions': predictions,
-                'graph': graph,
+                'graph_url': graph_url,
+                'chart': chart,
                 'dates': [d.strftime('%Y-%m-%d') for d in future_dates],
                 'is_mock': True,
                 'is_fallback': True
@@ -243,7 +181,7 @@ def generate_mock_prediction(symbol):
             }
 
 # =========================
-# 4. Load Data Function
+# 3. Load Data Function
 # =========================
 
 def load_data(filename):
@@ -261,7 +199,7 @@ def load_data(filename):
         return []
 
 # =========================
-# 5. Database Models
+# 4. Database Models
 # =========================
 
 from datetime import datetime
@@ -295,7 +233,7 @@ class Portfolio(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
 
 # =========================
-# 6. Authentication Routes
+# 5. Authentication Routes
 # =========================
 
 @app.route('/api/register', methods=['POST'])
@@ -399,20 +337,60 @@ def check_auth():
     return jsonify({'authenticated': False}), 401
 
 # =========================
-# 7. Portfolio Routes
+# 6. Portfolio Routes
 # =========================
 
+# Query parameters that switch /api/companies from the full list to a page
+COMPANY_QUERY_PARAMS = {'sector', 'prefix', 'q', 'sort', 'order', 'limit', 'cursor'}
+
 @app.route('/api/companies', methods=['GET'])
 def get_companies():
     """
     Retrieves a list of companies.
+
+    Without any of the parameters below the full list is returned, so e.g. a
+    cache-busting ?_=123 does not change the response. With any of them, a page
+    {'companies': [...], 'next_cursor': ...} is returned.
+
+    Query Parameters:
+    - sector (str): Only companies in this sector.
+    - prefix (str): Symbol prefix.
+    - q (str): Substring of the symbol or company name.
+    - sort (str): name (default), symbol, market_cap, price, listed_shares, paid_up
+      or total_paid_up_capital.
+    - order (str): asc (default) or desc.
+    - min_<field> / max_<field> (float): Numeric range, e.g. min_market_price=200.
+    - limit (int): Page size, 50 by default.
+    - cursor (str): next_cursor from the previous page.
     """
     try:
-        companies = load_data('companies.json')  # Ensure 'companies.json' exists in the 'data' directory
-        # Add unique ID to each company
-        for i, company in enumerate(companies):
-            company['id'] = i + 1
-        return jsonify(companies)
+        # Served from the pre-encoded snapshot; rebuilt only when companies.json changes
+        snapshot = company_index.current()
+        if not any(name in COMPANY_QUERY_PARAMS or name.startswith(('min_', 'max_')) for name in request.args):
+            return stored_json_response(snapshot.companies_entry)
+
+        ranges = {}
+        for name, value in request.args.items():
+            if name.startswith(('min_', 'max_')):
+                low, high = ranges.get(name[4:], (None, None))
+                bound = float(value)
+                if not math.isfinite(bound):
+                    raise ValueError(f"{name} must be a finite number")
+                ranges[name[4:]] = (bound, high) if name.startswith('min_') else (low, bound)
+
+        companies, next_cursor = snapshot.query(
+            sector=request.args.get('sector'),
+            prefix=request.args.get('prefix'),
+            search=request.args.get('q'),
+            sort=request.args.get('sort', 'name'),
+            descending=request.args.get('order', 'asc').lower() == 'desc',
+            ranges=ranges,
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE),
+            cursor=request.args.get('cursor'),
+        )
+        return jsonify({'companies': companies, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error in get_companies: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -423,152 +401,209 @@ def get_sectors():
     Retrieves a list of unique sectors from companies.
     """
     try:
-        companies = load_data('companies.json')  # Ensure 'companies.json' exists in the 'data' directory
-        # Extract unique sectors
-        sectors = list(set(company['sector'] for company in companies if 'sector' in company))
-        sectors.sort()  # Sort sectors alphabetically
-        return jsonify(sectors)
+        snapshot = company_index.current()
+        return stored_json_response(snapshot.sectors_entry)
     except Exception as e:
         print(f"Error in get_sectors: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/symbols/suggest', methods=['GET'])
+def suggest_symbols():
+    """
+    Suggests companies for text typed into a symbol search box.
+
+    Every word of q must match the start of the symbol or of a word of the
+    company name; words of three or more characters also match with one typo.
+
+    Query Parameters:
+    - q (str): Typed text, e.g. "nab" or "nabl bank".
+    - limit (int): Maximum number of suggestions, 8 by default.
+    """
+    try:
+        suggester = company_index.current().suggester()
+        suggestions = suggester.suggest(request.args.get('q', ''),
+                                        request.args.get('limit', DEFAULT_SUGGESTIONS))
+        return jsonify(suggestions)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in suggest_symbols: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # =========================
-# 8. Prediction Routes
+# 7. Prediction Routes
 # =========================
 
-@app.route('/api/predict/<symbol>', methods=['GET'])
-def predict(symbol):
+def build_prediction(symbol, historical_data, predictions):
     """
-    Generates prediction for a given stock symbol.
-    If model data is not available, falls back to mock prediction.
-    
+    Builds the prediction payload for a symbol from its forecast prices.
+
     Parameters:
     - symbol (str): The stock symbol (e.g., SCB, NABIL).
+    - historical_data (DataFrame): Historical 'Close' prices.
+    - predictions (list): Predicted prices for the next FORECAST_HORIZON days.
     """
-    # Define supported symbols based on frontend
-    supported_symbols = ['SCB', 'NABIL', 'JBBL', 'API', 'NTC']
+    # IMPORTANT: Get the last valid date from historical data for predictions to start from
+    # Sort the index to ensure we get the latest date
+    sorted_index = sorted(historical_data.index)
+    # Find the last valid date (not NaT)
+    last_valid_date = None
+    for idx in reversed(sorted_index):
+        if not pd.isna(idx):
+            last_valid_date = idx
+            break
+            
+    if last_valid_date is None:
+        print(f"No valid dates found in historical data for {symbol}, using 2024-12-10")
+        # If no valid date found, use 2024-12-10 as specified
+        last_valid_date = pd.Timestamp("2024-12-10")
     
-    if symbol not in supported_symbols:
-        return jsonify({'success': False, 'error': f"Symbol {symbol} not supported."}), 400
+    # Generate future dates starting from the day after the last historical date
+    future_dates = pd.date_range(
+        start=last_valid_date + pd.Timedelta(days=1),
+        periods=FORECAST_HORIZON,
+        freq='D'
+    )
 
-    # Try loading model components
-    result = load_model_and_scaler(symbol)
+    # Create visualization
+    graph_url, chart = create_prediction_plot(historical_data, predictions, future_dates, symbol)
     
-    # If model components are available, use them for prediction
-    if result and not any(x is None for x in result):
-        model, scaler, historical_data, last_sequence = result
-        
-        try:
-            device = next(model.parameters()).device
-            
-            # Ensure sequence shape is correct [1, sequence_length, features]
-            input_tensor = torch.FloatTensor(last_sequence).unsqueeze(0).to(device)
-            if input_tensor.shape[2] != 26:
-                return jsonify({'success': False, 'error': "Invalid input sequence shape"}), 500
+    # Calculate expected return percentage over the prediction period
+    if len(predictions) > 0:
+        first_price = predictions[0]
+        last_price = predictions[-1]
+        expected_return = ((last_price - first_price) / first_price) * 100
+    else:
+        expected_return = 0.0
+
+    return {
+        'success': True,
+        'symbol': symbol,
+        'predictions': predictions,
+        'graph_url': graph_url,
+        'chart': chart,
+        'dates': [d.strftime('%Y-%m-%d') for d in future_dates],
+        'is_mock': False,
+        'expected_return': expected_return
+    }
 
-            predictions = []
-            current_sequence = input_tensor.clone()
-            
-            for _ in range(30):
-                with torch.no_grad():
-                    output = model(current_sequence).cpu().numpy()
-
-                # Inverse transform prediction
-                dummy = np.zeros((1, scaler.n_features_in_))
-                dummy[0, 0] = output[0][0]
-                pred_price = scaler.inverse_transform(dummy)[0, 0]
-                predictions.append(pred_price)
-
-                # Update sequence
-                new_seq = current_sequence.cpu().numpy().squeeze(0)
-                new_seq = np.roll(new_seq, -1, axis=0)
-                new_seq[-1, 0] = output[0][0]  # Update only the 'Close' feature
-                current_sequence = torch.FloatTensor(new_seq).unsqueeze(0).to(device)
-
-            # IMPORTANT: Get the last valid date from historical data for predictions to start from
-            # Sort the index to ensure we get the latest date
-            sorted_index = sorted(historical_data.index)
-            # Find the last valid date (not NaT)
-            last_valid_date = None
-            for idx in reversed(sorted_index):
-                if not pd.isna(idx):
-                    last_valid_date = idx
-                    break
-                    
-            if last_valid_date is None:
-                print(f"No valid dates found in historical data for {symbol}, using 2024-12-10")
-                # If no valid date found, use 2024-12-10 as specified
-                last_valid_date = pd.Timestamp("2024-12-10")
-            
-            # Generate future dates starting from the day after the last historical date
-            future_dates = pd.date_range(
-                start=last_valid_date + pd.Timedelta(days=1),
-                periods=30,
-                freq='D'
-            )
+def compute_forecasts(symbols):
+    """
+    Computes prediction payloads for the forecast store in one batched rollout.
+    Symbols without model data, or whose forecast fails, get a mock prediction.
+    """
+    available = {}
+    for symbol in symbols:
+        result = model_registry.get(symbol)
+        if result and not any(x is None for x in result):
+            available[symbol] = result
 
-            # Create visualization
-            graph = create_prediction_plot(historical_data, predictions, future_dates, symbol)
-            
-            # Calculate expected return percentage over the prediction period
-            if len(predictions) > 0:
-                first_price = predictions[0]
-                last_price = predictions[-1]
-                expected_return = ((last_price - first_price) / first_price) * 100
-            else:
-                expected_return = 0.0
-
-            return jsonify({
-                'success': True,
-                'symbol': symbol,
-                'predictions': predictions,
-                'graph': graph,
-                'dates': [d.strftime('%Y-%m-%d') for d in future_dates],
-                'is_mock': False,
-                'expected_return': expected_return
-            })
+    forecasts = forecast_many(available, FORECAST_HORIZON)
 
-        except Exception as e:
-            print(f"Prediction error for {symbol}: {str(e)}")
-            # Fall back to mock prediction on error
-            return jsonify(generate_mock_prediction(symbol))
+    payloads = {}
+    for symbol in symbols:
+        predictions = forecasts.get(symbol)
+        if predictions is not None:
+            try:
+                payloads[symbol] = build_prediction(symbol, available[symbol][2], predictions.tolist())
+                continue
+            except Exception as e:
+                print(f"Prediction error for {symbol}: {str(e)}")
+        else:
+            print(f"Model components not found for {symbol}, using mock prediction.")
+        payloads[symbol] = generate_mock_prediction(symbol)
+    return payloads
+
+def register_forecast_charts(forecasts):
+    """
+    Re-registers the charts of stored forecasts, e.g. after loading them from disk.
+    """
+    for payload in forecasts.values():
+        if 'chart' in payload:
+            chart_cache.register(payload['chart'])
+
+# Render chart images in worker processes instead of request threads
+chart_cache.renderer = render_pool.render
+
+# Predictions are recomputed in the background when data/last_updated.txt changes
+forecast_store = ForecastStore(compute_forecasts, SUPPORTED_SYMBOLS, on_publish=register_forecast_charts)
+# Start the refresh job in every serving process (gunicorn/waitress workers, or the
+# dev server's child), but not in the parent process of the debug reloader
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    forecast_store.start()
+
+def stored_json_response(entry):
+    """
+    Returns pre-serialized JSON with ETag/Last-Modified, answering 304 when unchanged.
+    Entries with a pre-gzipped body (see response_cache.make_entry) send it to
+    clients that accept gzip.
+    """
+    compressed = entry.get('gzip')
+    if compressed is not None and request.accept_encodings['gzip']:
+        response = app.response_class(compressed, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f"{entry['etag']}-gz")
     else:
-        # If model components are not available, use mock prediction
-        print(f"Model components not found for {symbol}, using mock prediction.")
-        return jsonify(generate_mock_prediction(symbol))
+        response = app.response_class(entry['body'], mimetype='application/json')
+        response.set_etag(entry['etag'])
+    if 'gzip' in entry:
+        response.vary.add('Accept-Encoding')
+    response.last_modified = entry['last_modified']
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/predict/<symbol>', methods=['GET'])
+def predict(symbol):
+    """
+    Returns the precomputed prediction for a given stock symbol.
+    If model data is not available, or the store has not been filled yet, falls back to mock prediction.
+    
+    Parameters:
+    - symbol (str): The stock symbol (e.g., SCB, NABIL).
+    """
+    if symbol not in SUPPORTED_SYMBOLS:
+        return jsonify({'success': False, 'error': f"Symbol {symbol} not supported."}), 400
+
+    # The store never computes in the request thread; concurrent mock fallbacks share one generation
+    entry = forecast_store.get(symbol)
+    if entry is None:
+        return jsonify(single_flight.do(('predict', symbol, None), lambda: generate_mock_prediction(symbol)))
+
+    return stored_json_response(entry)
+
+@app.route('/api/single-flight', methods=['GET'])
+def get_single_flight_stats():
+    """
+    Returns counters of calls run and requests coalesced onto in-flight calls.
+    """
+    return jsonify(single_flight.stats())
 
 # =========================
-# 9. Plot Generation Function
+# 8. Plot Generation and Chart Routes
 # =========================
 
 def create_prediction_plot(historical_data, predictions, future_dates, symbol, is_mock=False):
     """
-    Creates a visualization of historical data and predictions.
-    
+    Registers a chart of historical data and predictions with the chart cache.
+    The image itself is rendered on the first request to its URL.
+
     Parameters:
     - historical_data (DataFrame): Historical stock data.
     - predictions (list/array): Predicted stock prices.
     - future_dates (DatetimeIndex): Dates for predictions.
     - symbol (str): Stock symbol.
     - is_mock (bool): Whether the data is mock data.
-    
+
     Returns:
-    - str: Base64-encoded PNG image.
+    - tuple: URL of the chart image and the chart spec it is drawn from.
     """
     try:
-        plt.figure(figsize=(15, 8))
-        
         # Filter out any NaT values in historical_data
         valid_historical_data = historical_data[~pd.isna(historical_data.index)]
-        
+
         # Plot historical data (last 100 points or all if less)
-        historical_display_count = min(100, len(valid_historical_data))
-        if historical_display_count > 0:
-            historical_dates = valid_historical_data.index[-historical_display_count:]
-            historical_values = valid_historical_data['Close'].values[-historical_display_count:]
-            plt.plot(historical_dates, historical_values, 
-                    label='Historical Close', color='blue', linewidth=2)
-        
+        historical_tail = valid_historical_data.iloc[-HISTORY_POINTS:]
+
         # Ensure future_dates is a proper DatetimeIndex
         if not isinstance(future_dates, pd.DatetimeIndex):
             # Convert to DatetimeIndex if it's a list of datetime-like objects
@@ -581,48 +616,58 @@ def create_prediction_plot(historical_data, predictions, future_dates, symbol, i
                     periods=len(predictions),
                     freq='D'
                 )
-        
-        # Plot predictions
-        plt.plot(future_dates, predictions, label='Predicted Close', 
-                color='red', linestyle='-', marker='o', markersize=5)
-        
-        title = f'{symbol} Price Prediction'
-        if is_mock:
-            title += ' (Simulated Data)'
-        plt.title(title, fontsize=16)
-        plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Price (NPR)', fontsize=12)
-        plt.legend()
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Save to buffer
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150)
-        plt.close()
-        return base64.b64encode(buffer.getvalue()).decode()
-    
+
+        spec = chart_spec(symbol, historical_tail.index, historical_tail['Close'].values,
+                          future_dates, predictions, is_mock)
+
     except Exception as e:
         print(f"Error creating prediction plot: {str(e)}")
-        # Create a simple fallback plot
-        try:
-            plt.figure(figsize=(15, 8))
-            plt.plot(range(len(predictions)), predictions, color='red', label='Predicted')
-            plt.title(f"{symbol} Price Prediction (Fallback Plot)")
-            plt.grid(True)
-            plt.legend()
-            
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png', dpi=150)
-            plt.close()
-            return base64.b64encode(buffer.getvalue()).decode()
-        except:
-            # Last resort if even the fallback plot fails
-            return ""
+        # Create a simple fallback plot of the predictions alone
+        spec = chart_spec(symbol, [], [], [], predictions, is_mock)
+
+    key = chart_cache.register(spec)
+    return f"/api/chart/{key}.png", spec
+
+@app.route('/api/chart-stats', methods=['GET'])
+def get_chart_stats():
+    """
+    Returns chart cache counters and render pool job timings.
+    """
+    return jsonify({'cache': chart_cache.stats(), 'render_pool': render_pool.stats()})
+
+@app.route('/api/chart/<key>.<fmt>', methods=['GET'])
+def get_chart(key, fmt):
+    """
+    Serves a rendered prediction chart by its content hash.
+
+    Parameters:
+    - key (str): Chart key from a prediction's graph_url.
+    - fmt (str): Image format, 'png' or 'svg'.
+    """
+    if fmt not in CHART_FORMATS:
+        return jsonify({'error': f"Unsupported chart format {fmt}"}), 404
+
+    try:
+        # Keys are content hashes, so identical concurrent requests share one render
+        image = single_flight.do(('chart', key, fmt), lambda: chart_cache.get(key, fmt))
+    except (RenderPoolFull, TimeoutError) as e:
+        print(f"Chart render rejected for {key}: {str(e)}")
+        response = jsonify({'error': 'Chart rendering is busy, please retry'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    if image is None:
+        return jsonify({'error': 'Chart not found'}), 404
+
+    # Keys are content hashes, so a given URL never changes
+    response = app.response_class(image, mimetype=CHART_FORMATS[fmt])
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
 
 # =========================
-# 10. News Routes
+# 9. News Routes
 # =========================
 
 @app.route('/api/news/<category>', methods=['GET'])
@@ -631,60 +676,65 @@ def get_news(category=None):
     """
     Retrieves news articles based on the specified category.
 
+    Served from the news index, deduplicated by URL. Without the paging
+    parameters below, the MeroLagani homepage news of the category is returned
+    as a list in homepage order. With any of them, a page
+    {'news': [...], 'next_cursor': ...} is returned, newest first, that also
+    includes the per-symbol ShareSansar news.
+
     Parameters:
     - category (str, optional): The news category. Defaults to 'all'.
+
+    Query Parameters:
+    - symbol (str): Only news about this symbol, e.g. NABIL.
+    - since (str): Only news dated on or after this YYYY-MM-DD date.
+    - limit (int): Page size, 20 by default.
+    - cursor (str): next_cursor from the previous page.
     """
     if category is None:
         category = request.args.get('category', 'all')
     
     try:
-        # Get the absolute path to news_links.json
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        news_file_path = os.path.join(current_dir, 'news_links.json')
-
-        # Check if file exists
-        if not os.path.exists(news_file_path):
-            return jsonify([])  # Return empty array if file doesn't exist
-
-        # Read the news data
-        with open(news_file_path, 'r', encoding='utf-8') as f:
-            news_data = json.load(f)
-
-        # Handle category selection
-        if category.lower() == 'all':
-            all_news = []
-            for cat_news in news_data.values():
-                if isinstance(cat_news, list):
-                    all_news.extend(cat_news)
-            return jsonify(all_news)
-
-        # Return category-specific news or empty list if category doesn't exist
-        return jsonify(news_data.get(category, []))
+        snapshot = news_index.current()
+        if not any(name in request.args for name in ('symbol', 'since', 'limit', 'cursor')):
+            return stored_json_response(snapshot.list_entry(category))
+
+        news, next_cursor = snapshot.query(
+            category=category,
+            symbol=request.args.get('symbol'),
+            since=request.args.get('since'),
+            limit=request.args.get('limit', NEWS_PAGE_SIZE),
+            cursor=request.args.get('cursor'),
+        )
+        return jsonify({'news': news, 'next_cursor': next_cursor})
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error fetching news: {str(e)}")  # Log the error
         return jsonify([])  # Return empty array on error
 
 # =========================
-# 11. Market Summary Route
+# 10. Market Summary Route
 # =========================
 
+# Written by summary.py next to this file
+MARKET_SUMMARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'market-summary-1.json')
+
 @app.route('/api/market-summary', methods=['GET'])
 def get_market_summary():
     """
     Retrieves market summary data.
     """
     try:
-        with open('market-summary-1.json', 'r') as f:
-            market_summary_data = json.load(f)
-        return jsonify(market_summary_data)
+        return stored_json_response(response_cache.get(MARKET_SUMMARY_PATH))
     except FileNotFoundError:
         return jsonify({"error": "Market summary data not found"}), 404
     except json.JSONDecodeError:
         return jsonify({"error": "Error parsing market summary data"}), 500
 
 # =========================
-# 12. Analysis Route
+# 11. Analysis Route
 # =========================
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 model = genai.GenerativeModel('gemini-2.0-flash')
@@ -721,8 +771,7 @@ def analyze():
                     Market Trend: Identify the overall market trend based on the image.
                     Provide concise, actionable insights with no explanations."""
 
-        # Generate response with error handling
-        try:
+        def generate():
             response = model.generate_content([
                 prompt,
                 {
@@ -730,11 +779,16 @@ def analyze():
                     'data': image_bytes
                 }
             ])
-            
-            if not hasattr(response, 'text') or not response.text:
+            return response.text if hasattr(response, 'text') else None
+
+        # Generate response with error handling; identical concurrent requests share one Gemini call
+        try:
+            analysis = single_flight.do(('analyze', script, input_hash(image_bytes)), generate)
+
+            if not analysis:
                 return generate_fallback_analysis(script)
                 
-            return jsonify({'analysis': response.text})
+            return jsonify({'analysis': analysis})
                 
         except Exception as ai_error:
             print(f"AI generation error: {str(ai_error)}")
@@ -815,7 +869,7 @@ Overall market trend appears {template['trend']} with potential resistance at hi
     return jsonify({'analysis': analysis, 'is_fallback': True})
 
 # =========================
-# 13. Stock Directory Structure Check
+# 12. Stock Directory Structure Check
 # =========================
 
 @app.route('/api/check-model-availability', methods=['GET'])
@@ -824,19 +878,15 @@ def check_model_availability():
     Checks which stock models are available and returns their status.
     Useful for frontend to determine which models can provide real predictions.
     """
-    supported_symbols = ['SCB', 'NABIL', 'JBBL', 'API', 'NTC']
     model_status = {}
     
-    for symbol in supported_symbols:
-        model_dir = os.path.join('D:\\Model', symbol, 'model_components')
-        model_path = os.path.join(model_dir, f'{symbol}_model.pth')
-        scaler_path = os.path.join(model_dir, f'{symbol}_scaler.pkl')
-        sequence_path = os.path.join(model_dir, f'{symbol.lower()}_last_sequence.npy')
+    for symbol in SUPPORTED_SYMBOLS:
+        paths = model_file_paths(symbol)
         
         # Check if required files exist
-        has_model = os.path.exists(model_path)
-        has_scaler = os.path.exists(scaler_path)
-        has_sequence = os.path.exists(sequence_path)
+        has_model = os.path.exists(paths['model'])
+        has_scaler = os.path.exists(paths['scaler'])
+        has_sequence = os.path.exists(paths['sequence'])
         
         model_status[symbol] = {
             'available': has_model and has_scaler and has_sequence,
@@ -850,7 +900,7 @@ def check_model_availability():
     return jsonify(model_status)
 
 # =========================
-# 14. Stock Return Comparison
+# 13. Stock Return Comparison
 # =========================
 
 @app.route('/api/stock-returns', methods=['GET'])
@@ -858,67 +908,54 @@ def get_stock_returns():
     """
     Generates expected returns for all supported stocks
     to help users identify good investment opportunities.
+
+    Query Parameters:
+    - symbols (str, optional): Comma-separated symbols to rank instead of the supported set.
+      Symbols outside the supported set are ignored.
     """
-    supported_symbols = ['SCB', 'NABIL', 'JBBL', 'API', 'NTC']
+    # Optional comma-separated list of symbols to rank, e.g. ?symbols=SCB,NABIL
+    requested = request.args.get('symbols')
+    if requested:
+        # Only supported symbols reach the model registry, which builds file paths from them
+        requested = dict.fromkeys(s.strip().upper() for s in requested.split(','))
+        symbols = [symbol for symbol in requested if symbol in SUPPORTED_SYMBOLS]
+        if not symbols:
+            return jsonify({'error': 'None of the requested symbols are supported'}), 400
+    else:
+        symbols = SUPPORTED_SYMBOLS
+
+    # Collect model components for every symbol that has them
+    available = {}
+    for symbol in symbols:
+        result = model_registry.get(symbol)
+        if result and not any(x is None for x in result):
+            available[symbol] = result
+
+    # One batched rollout for all symbols sharing the StockLSTM architecture
+    forecasts = forecast_many(available)
+
     stock_returns = []
     
-    for symbol in supported_symbols:
-        # Try to get real prediction data
-        result = load_model_and_scaler(symbol)
+    for symbol in symbols:
+        predictions = forecasts.get(symbol)
         
-        if result and not any(x is None for x in result):
-            model, scaler, historical_data, last_sequence = result
+        if predictions is not None and len(predictions) > 0:
+            historical_data = available[symbol][2]
+            first_price = predictions[0]
+            last_price = predictions[-1]
+            expected_return = ((last_price - first_price) / first_price) * 100
             
-            try:
-                device = next(model.parameters()).device
-                
-                # Make prediction for this stock
-                input_tensor = torch.FloatTensor(last_sequence).unsqueeze(0).to(device)
-                
-                if input_tensor.shape[2] != 26:
-                    raise ValueError("Invalid input sequence shape")
-                
-                predictions = []
-                current_sequence = input_tensor.clone()
-                
-                # Generate predictions for 30 days
-                for _ in range(30):
-                    with torch.no_grad():
-                        output = model(current_sequence).cpu().numpy()
-                    
-                    # Inverse transform prediction
-                    dummy = np.zeros((1, scaler.n_features_in_))
-                    dummy[0, 0] = output[0][0]
-                    pred_price = scaler.inverse_transform(dummy)[0, 0]
-                    predictions.append(pred_price)
-                    
-                    # Update sequence
-                    new_seq = current_sequence.cpu().numpy().squeeze(0)
-                    new_seq = np.roll(new_seq, -1, axis=0)
-                    new_seq[-1, 0] = output[0][0]  # Update only the 'Close' feature
-                    current_sequence = torch.FloatTensor(new_seq).unsqueeze(0).to(device)
-                
-                # Calculate expected return percentage
-                if len(predictions) > 0:
-                    first_price = predictions[0]
-                    last_price = predictions[-1]
-                    expected_return = ((last_price - first_price) / first_price) * 100
-                    
-                    # Get current price for reference
-                    current_price = valid_historical_data['Close'].iloc[-1] if 'valid_historical_data' in locals() and len(valid_historical_data) > 0 else first_price
-                    
-                    stock_returns.append({
-                        'symbol': symbol,
-                        'expected_return': expected_return,
-                        'current_price': float(current_price),
-                        'predicted_price': float(last_price),
-                        'is_mock': False
-                    })
-                    continue
-                
-            except Exception as e:
-                print(f"Error calculating return for {symbol}: {str(e)}")
-                # Fall through to mock return calculation
+            # Get current price for reference
+            current_price = historical_data['Close'].iloc[-1] if len(historical_data) > 0 else first_price
+            
+            stock_returns.append({
+                'symbol': symbol,
+                'expected_return': float(expected_return),
+                'current_price': float(current_price),
+                'predicted_price': float(last_price),
+                'is_mock': False
+            })
+            continue
         
         # If we got here, either no model or prediction failed
         # Generate mock return data
@@ -962,7 +999,139 @@ def get_stock_returns():
     return jsonify(stock_returns)
 
 # =========================
-# 15. Main Execution
+# 14. Price History Route
+# =========================
+
+@app.route('/api/history/<symbol>', methods=['GET'])
+def get_history(symbol):
+    """
+    Returns OHLCV history as columnar JSON for a stock symbol or NEPSE.
+
+    Query parameters:
+    - start, end (str, optional): Inclusive window as YYYY-MM-DD.
+    - range (str, optional): 1m, 3m, 6m, 1y, 5y or max, counted back from the last trading day.
+    - resolution (str): raw (daily), weekly, monthly or lttb.
+    - points (int): Number of points for lttb downsampling.
+    """
+    # The symbol names a CSV and a store directory, so anything but alphanumerics is unknown
+    if not is_valid_symbol(symbol):
+        return jsonify({'error': f"No price history for {symbol}"}), 404
+
+    try:
+        entry = history_cache.get(
+            symbol,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            window=request.args.get('range'),
+            resolution=request.args.get('resolution', 'raw'),
+            points=request.args.get('points', DEFAULT_LTTB_POINTS),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error loading history for {symbol}: {str(e)}")
+        return jsonify({'error': 'Failed to load price history'}), 500
+
+    if entry is None:
+        return jsonify({'error': f"No price history for {symbol}"}), 404
+    return stored_json_response(entry)
+
+# =========================
+# 15. Search Route
+# =========================
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """
+    Searches news, announcement and financial report titles, best matches first.
+
+    Results are ranked by BM25 with a boost for recent items. Symbols count
+    as words of the items listed under them, so "dividend NABIL" finds NABIL's
+    dividend news.
+
+    Query Parameters:
+    - q (str): Search text.
+    - symbol (str, optional): Only items listed under this symbol.
+    - kind (str, optional): news, announcement or financial_report.
+    - limit (int, optional): Maximum number of results, 20 by default.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+
+    try:
+        started = time.perf_counter()
+        results = search_index.search(
+            query,
+            limit=request.args.get('limit', SEARCH_RESULTS),
+            symbol=request.args.get('symbol'),
+            kind=request.args.get('kind'),
+        )
+        took_ms = round((time.perf_counter() - started) * 1000, 2)
+        return jsonify({'query': query, 'results': results, 'took_ms': took_ms})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error searching for {query}: {str(e)}")
+        return jsonify({'error': 'Search failed'}), 500
+
+# =========================
+# 16. Ingestion Notifications
+# =========================
+# ingest.py posts here after each successful scrape, so caches are refreshed
+# as soon as new data lands instead of on the next file check.
+
+# Source -> functions that refresh what is derived from its files
+REFRESH_HOOKS = {
+    'company_list': [company_index.refresh, forecast_store.refresh_in_background],
+    # Rewrites within the file's mtime resolution could otherwise go unnoticed
+    'market_summary': [lambda: response_cache.invalidate(MARKET_SUMMARY_PATH)],
+    'merolagani_news': [news_index.refresh, search_index.update],
+    'company_news': [news_index.refresh, search_index.update],
+    'announcements': [search_index.update],
+}
+
+@app.route('/api/internal/refresh', methods=['POST'])
+def refresh_source():
+    """
+    Refreshes the caches derived from one ingestion source.
+
+    Only accepted from the local machine, and with the X-Ingest-Token header
+    when INGEST_TOKEN is set.
+
+    Expected JSON Payload:
+    {
+        "source": "company_list",
+        "updated_at": "2025-01-23 20:17:30"
+    }
+    """
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'Forbidden'}), 403
+    if INGEST_TOKEN and request.headers.get(INGEST_TOKEN_HEADER) != INGEST_TOKEN:
+        return jsonify({'error': 'Forbidden'}), 403
+
+    source = (request.get_json(silent=True) or {}).get('source')
+    if not source:
+        return jsonify({'error': 'source is required'}), 400
+
+    refreshed = []
+    for hook in REFRESH_HOOKS.get(source, []):
+        try:
+            hook()
+            refreshed.append(getattr(hook, '__qualname__', str(hook)))
+        except Exception as e:
+            print(f"Error refreshing {source}: {str(e)}")
+    return jsonify({'source': source, 'refreshed': refreshed})
+
+@app.route('/api/last-updated', methods=['GET'])
+def get_last_updated():
+    """
+    Returns when each ingestion source last brought in new data.
+    """
+    return jsonify(read_last_updated())
+
+# =========================
+# 17. Main Execution
 # =========================
 
 if __name__ == '__main__':
@@ -0,0 +1,260 @@
+import os
+import time
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Sessions kept alive for all scrapers in this process
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '4'))
+# A session is restarted after this many borrows, to shed leaked memory and state
+BROWSER_MAX_USES = int(os.getenv('BROWSER_MAX_USES', '50'))
+# Longest a scraper waits for a free session
+BROWSER_ACQUIRE_TIMEOUT = float(os.getenv('BROWSER_ACQUIRE_TIMEOUT', '300'))
+BROWSER_HEADLESS = os.getenv('BROWSER_HEADLESS', '1') != '0'
+# Sessions only priority borrowers (the one-minute market summary) may use, so they
+# never wait behind crawls that fill the rest of the pool
+BROWSER_RESERVED_SESSIONS = int(os.getenv('BROWSER_RESERVED_SESSIONS', '1'))
+
+# Where the resolved chromedriver path is remembered between runs
+DRIVER_PATH_CACHE = os.getenv('CHROMEDRIVER_CACHE', os.path.join(BASE_DIR, 'data', '.chromedriver_path'))
+
+# Requests the scrapers never need: stylesheets, web fonts and images
+BLOCKED_URL_PATTERNS = [
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp', '*.ico',
+]
+
+# =========================
+# 1. Driver binary
+# =========================
+
+_driver_path = None
+_driver_path_resolved = False
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path():
+    """
+    Returns the chromedriver path, resolving it at most once per process.
+
+    Uses CHROMEDRIVER_PATH if set, then the path cached on disk by an earlier
+    run, and only then asks webdriver_manager, which needs the network. Returns
+    None if none of these work, in which case Selenium Manager locates the
+    driver itself.
+    """
+    global _driver_path, _driver_path_resolved
+    with _driver_path_lock:
+        if _driver_path_resolved:
+            return _driver_path
+
+        path = os.getenv('CHROMEDRIVER_PATH')
+        if not path:
+            try:
+                with open(DRIVER_PATH_CACHE, 'r', encoding='utf-8') as f:
+                    path = f.read().strip()
+            except OSError:
+                path = None
+        if path and not os.path.exists(path):
+            path = None
+
+        if path is None:
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                path = ChromeDriverManager().install()
+                os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+                with open(DRIVER_PATH_CACHE, 'w', encoding='utf-8') as f:
+                    f.write(path)
+            except Exception as e:
+                print(f"Could not download chromedriver, leaving it to Selenium Manager: {str(e)}")
+                path = None
+
+        _driver_path = path
+        _driver_path_resolved = True
+        return path
+
+
+def create_driver(headless=BROWSER_HEADLESS, block_resources=True):
+    """
+    Starts a Chrome session configured for scraping.
+
+    Parameters:
+    - headless (bool): Run Chrome without a window.
+    - block_resources (bool): Skip loading images, fonts and stylesheets.
+
+    Returns:
+    - webdriver.Chrome: The new session.
+    """
+    options = Options()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1920,1080')  # Ensures all elements are visible
+    if block_resources:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    driver_path = resolve_driver_path()
+    service = Service(driver_path) if driver_path else Service()
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.set_page_load_timeout(30)
+    driver.set_script_timeout(30)
+
+    if block_resources:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            print(f"Could not block page resources: {str(e)}")
+    return driver
+
+# =========================
+# 2. Session pool
+# =========================
+
+class BrowserPool:
+    """
+    Long-lived Chrome sessions shared by all scrapers in a process.
+
+    Scrapers borrow a session with `with browser_pool.session() as driver:`
+    and give it back when done, so Chrome starts once per process instead of
+    once per scrape. At most `size` sessions exist; borrowers wait for a free
+    one. `reserved` of them are kept for priority borrowers: other borrowers
+    share the remaining size - reserved. Sessions are restarted after
+    max_uses borrows, or right away when a borrower reports them broken.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES, headless=BROWSER_HEADLESS,
+                 factory=create_driver, reserved=BROWSER_RESERVED_SESSIONS):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.reserved = max(0, min(reserved, size - 1))
+        self._factory = factory
+        self._slots = threading.BoundedSemaphore(size)
+        self._shared_slots = threading.BoundedSemaphore(size - self.reserved)
+        self._shared_borrowers = set()  # id() of sessions lent out of the shared slots
+        self._idle = deque()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.started = 0
+        self.recycled = 0
+        self.borrows = 0
+
+    def acquire(self, timeout=BROWSER_ACQUIRE_TIMEOUT, priority=False):
+        """
+        Returns an idle session, starting a new one if the pool is not yet full.
+
+        Parameters:
+        - timeout (float): Longest to wait for a free session.
+        - priority (bool): May use the reserved sessions.
+
+        Raises:
+        - TimeoutError: If no session frees up within timeout.
+        """
+        deadline = time.monotonic() + timeout
+        if not priority and not self._shared_slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser session free after {timeout:g}s")
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            if not priority:
+                self._shared_slots.release()
+            raise TimeoutError(f"No browser session free after {timeout:g}s")
+        try:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Browser pool is shut down")
+                driver = self._idle.popleft() if self._idle else None
+                self.borrows += 1
+            if driver is None:
+                driver = self._factory(headless=self.headless)
+                with self._lock:
+                    self._uses[id(driver)] = 0
+                    self.started += 1
+            if not priority:
+                with self._lock:
+                    self._shared_borrowers.add(id(driver))
+            return driver
+        except Exception:
+            self._slots.release()
+            if not priority:
+                self._shared_slots.release()
+            raise
+
+    def release(self, driver, broken=False):
+        """
+        Returns a session to the pool, or quits it if it is broken or worn out.
+        """
+        with self._lock:
+            shared = id(driver) in self._shared_borrowers
+            self._shared_borrowers.discard(id(driver))
+            uses = self._uses.get(id(driver), 0) + 1
+            retire = broken or self._closed or uses >= self.max_uses
+            if retire:
+                self._uses.pop(id(driver), None)
+                self.recycled += 1
+            else:
+                self._uses[id(driver)] = uses
+                self._idle.append(driver)
+        if retire:
+            _quit(driver)
+        self._slots.release()
+        if shared:
+            self._shared_slots.release()
+
+    @contextmanager
+    def session(self, priority=False):
+        """
+        Borrows a session for the duration of a with block. Sessions that see a
+        WebDriver error are replaced rather than handed to the next scraper.
+        """
+        from selenium.common.exceptions import WebDriverException
+
+        driver = self.acquire(priority=priority)
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'reserved': self.reserved,
+                'idle': len(self._idle),
+                'started': self.started,
+                'recycled': self.recycled,
+                'borrows': self.borrows,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for driver in idle:
+            _quit(driver)
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+# Shared pool used by every scraper
+browser_pool = BrowserPool()
+atexit.register(browser_pool.shutdown)
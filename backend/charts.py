@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Use 'Agg' backend to prevent GUI warnings in non-GUI servers
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Memory budget for rendered chart images
+CHART_CACHE_MAX_MB = int(os.getenv('CHART_CACHE_MAX_MB', '64'))
+# Number of chart specs remembered so their images can be re-rendered after eviction
+CHART_SPEC_LIMIT = 1024
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Chart specs on disk, one <key>.json per chart, so every app worker can render any chart
+CHART_SPEC_DIR = os.getenv('CHART_SPEC_DIR', os.path.join(BASE_DIR, 'data', 'charts'))
+# Spec files unused for this long are removed
+CHART_SPEC_MAX_AGE_SECONDS = float(os.getenv('CHART_SPEC_MAX_AGE_SECONDS', str(7 * 24 * 60 * 60)))
+# How often registering a chart also sweeps old spec files
+CHART_SPEC_SWEEP_SECONDS = 60 * 60
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{20}$')
+
+# Number of historical points drawn before the predictions
+HISTORY_POINTS = 100
+CHART_SIZE = (15, 8)
+CHART_DPI = 100
+
+CHART_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+# =========================
+# 1. Chart Specs
+# =========================
+
+def chart_spec(symbol, historical_dates, historical_close, future_dates, predictions, is_mock=False):
+    """
+    Builds the JSON-serializable description of a prediction chart.
+
+    Parameters:
+    - symbol (str): Stock symbol.
+    - historical_dates (list): Dates of the historical closes ('YYYY-MM-DD' strings or datetimes).
+    - historical_close (list/array): Historical closing prices.
+    - future_dates (list): Dates of the predictions.
+    - predictions (list/array): Predicted prices.
+    - is_mock (bool): Whether the data is mock data.
+    """
+    def as_day(d):
+        return d if isinstance(d, str) else d.strftime('%Y-%m-%d')
+
+    return {
+        'symbol': symbol,
+        'historical_dates': [as_day(d) for d in historical_dates][-HISTORY_POINTS:],
+        'historical_close': [float(v) for v in historical_close][-HISTORY_POINTS:],
+        'future_dates': [as_day(d) for d in future_dates],
+        'predictions': [float(v) for v in predictions],
+        'is_mock': bool(is_mock),
+    }
+
+
+def chart_key(spec):
+    """
+    Returns the content address of a chart: a hash of everything that is drawn.
+    """
+    encoded = json.dumps(spec, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:20]
+
+# =========================
+# 2. Rendering
+# =========================
+
+_local = threading.local()
+
+
+def _figure():
+    """
+    Returns this thread's reusable Figure. The object-oriented API keeps no
+    global state, unlike pyplot, so threads can render concurrently.
+    """
+    figure = getattr(_local, 'figure', None)
+    if figure is None:
+        figure = Figure(figsize=CHART_SIZE)
+        FigureCanvasAgg(figure)
+        _local.figure = figure
+    figure.clear()
+    return figure
+
+
+def render_chart(spec, fmt='png'):
+    """
+    Draws historical closes and predictions and returns the encoded image bytes.
+    """
+    figure = _figure()
+    ax = figure.add_subplot()
+
+    if spec['historical_dates']:
+        ax.plot(np.array(spec['historical_dates'], dtype='datetime64[D]'), spec['historical_close'],
+                label='Historical Close', color='blue', linewidth=2)
+
+    if spec['future_dates']:
+        ax.plot(np.array(spec['future_dates'], dtype='datetime64[D]'), spec['predictions'],
+                label='Predicted Close', color='red', linestyle='-', marker='o', markersize=5)
+    else:
+        ax.plot(range(len(spec['predictions'])), spec['predictions'],
+                label='Predicted Close', color='red', linestyle='-', marker='o', markersize=5)
+
+    title = f"{spec['symbol']} Price Prediction"
+    if spec['is_mock']:
+        title += ' (Simulated Data)'
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel('Date', fontsize=12)
+    ax.set_ylabel('Price (NPR)', fontsize=12)
+    ax.legend()
+    ax.grid(True)
+    ax.tick_params(axis='x', labelrotation=45)
+    figure.tight_layout()
+
+    buffer = BytesIO()
+    figure.savefig(buffer, format=fmt, dpi=CHART_DPI)
+    return buffer.getvalue()
+
+# =========================
+# 3. Chart Cache
+# =========================
+
+class ChartCache:
+    """
+    Content-addressed cache of rendered charts.
+
+    register() records a spec and returns its key without drawing anything;
+    get() renders on first access and keeps images in an LRU bounded by max_bytes.
+    renderer(spec, fmt) produces the image bytes, in this process by default.
+
+    Specs are also written to spec_dir under their key, so a chart registered
+    by the worker that served /api/predict can be rendered by any other
+    worker, and after a restart.
+    """
+
+    def __init__(self, max_bytes=CHART_CACHE_MAX_MB * 1024 * 1024, spec_limit=CHART_SPEC_LIMIT,
+                 renderer=render_chart, spec_dir=CHART_SPEC_DIR):
+        self.renderer = renderer
+        self.max_bytes = max_bytes
+        self.spec_limit = spec_limit
+        self.spec_dir = spec_dir
+        self._swept = 0.0
+        self._specs = OrderedDict()
+        self._images = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register(self, spec):
+        key = chart_key(spec)
+        self._remember(key, spec)
+        try:
+            self._write_spec(key, spec)
+        except OSError as e:
+            print(f"Error saving chart spec {key}: {str(e)}")
+        return key
+
+    def _remember(self, key, spec):
+        with self._lock:
+            self._specs[key] = spec
+            self._specs.move_to_end(key)
+            while len(self._specs) > self.spec_limit:
+                self._specs.popitem(last=False)
+
+    def _spec_path(self, key):
+        return os.path.join(self.spec_dir, f"{key}.json")
+
+    def _write_spec(self, key, spec):
+        path = self._spec_path(key)
+        if os.path.exists(path):
+            os.utime(path)  # Keep specs that are still registered from being swept
+        else:
+            # Write to a temp file and rename so other workers never read a partial spec
+            os.makedirs(self.spec_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(spec, f)
+            os.replace(tmp_path, path)
+
+        now = time.monotonic()
+        if now - self._swept >= CHART_SPEC_SWEEP_SECONDS:
+            self._swept = now
+            self._sweep()
+
+    def _sweep(self):
+        cutoff = time.time() - CHART_SPEC_MAX_AGE_SECONDS
+        for name in os.listdir(self.spec_dir):
+            path = os.path.join(self.spec_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _load_spec(self, key):
+        """
+        Reads a spec another worker registered, or returns None.
+        """
+        if not KEY_PATTERN.match(key):
+            return None
+        try:
+            with open(self._spec_path(key), 'r', encoding='utf-8') as f:
+                spec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, spec)
+        return spec
+
+    def get(self, key, fmt='png'):
+        """
+        Returns the image bytes for a chart key, or None if the key is unknown.
+        """
+        with self._lock:
+            image = self._images.get((key, fmt))
+            if image is not None:
+                self._images.move_to_end((key, fmt))
+                self.hits += 1
+                return image
+            spec = self._specs.get(key)
+
+        if spec is None:
+            spec = self._load_spec(key)
+            if spec is None:
+                return None
+        with self._lock:
+            self.misses += 1
+
+        image = self.renderer(spec, fmt)
+
+        with self._lock:
+            if (key, fmt) not in self._images:
+                self._images[(key, fmt)] = image
+                self._nbytes += len(image)
+            while self._nbytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._nbytes -= len(evicted)
+                self.evictions += 1
+        return image
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'cached_images': len(self._images),
+                'cached_bytes': self._nbytes,
+                'known_charts': len(self._specs),
+            }
+
+
+# Shared cache used by the Flask routes
+chart_cache = ChartCache()
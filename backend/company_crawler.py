@@ -0,0 +1,321 @@
+import os
+import re
+import csv
+import json
+import time
+import argparse
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from table_extract import extract_table, click_next, dated_links
+from scrape_waits import LatencyBudget, wait_for_element, wait_for_rows, wait_for_table_change
+from sharesansar_http import BASE_URL as SHARESANSAR_BASE_URL, CompanyPage, HttpFetchError
+from browser_pool import browser_pool
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPANIES_PATH = os.path.join(BASE_DIR, 'data', 'companies.json')
+
+COMPANY_URL = f"{SHARESANSAR_BASE_URL}/company/{{symbol}}"
+
+# Tabs of a ShareSansar company page: the tab link, the DataTable it fills and
+# the CSV it is saved to under <SYMBOL>/
+TABS = {
+    'news': {
+        'anchor': '#cnews',
+        'table': 'myTableCNews',
+        'filename': 'sharesansar_news.csv',
+    },
+    'announcements': {
+        'anchor': '#cannouncements',
+        'table': 'myTableCAnnouncements',
+        'filename': 'sharesansar_announcements.csv',
+    },
+}
+
+CSV_HEADER = ['Date', 'Title', 'URL']
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Symbols crawled at the same time; browser fallbacks are further capped by the pool size
+CRAWL_WORKERS = int(os.getenv('COMPANY_CRAWL_WORKERS', '4'))
+
+
+class BrowserSessionLost(WebDriverException):
+    """
+    Raised by crawl_company when its browser session fails, so the pool
+    retires the session. Carries the results of the tabs handled before.
+    """
+
+    def __init__(self, symbol, saved, cause):
+        super().__init__(f"Browser session lost while crawling {symbol}: {cause}")
+        self.saved = saved
+
+
+def tab_csv_path(symbol, tab, root=BASE_DIR):
+    """
+    Returns the CSV a symbol's tab is saved to, e.g. NABIL/sharesansar_news.csv.
+    """
+    return os.path.join(root, symbol.upper(), TABS[tab]['filename'])
+
+
+def write_rows(path, rows):
+    """
+    Writes (date, title, url) rows to a CSV through a temp file and a rename,
+    so readers never see a partially written file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def row_key(date, title, url):
+    """
+    Identifies an item across crawls by its (Date, URL), or its title when it has no link.
+    """
+    return (date, url if url and url != 'N/A' else title)
+
+
+def read_rows(path):
+    """
+    Returns the (date, title, url) rows of a saved CSV, or an empty list if there is none.
+    """
+    try:
+        with open(path, mode='r', newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip the header row
+            return [tuple(row[:3]) for row in reader if len(row) >= 3]
+    except OSError:
+        return []
+
+
+def all_symbols(path=COMPANIES_PATH):
+    """
+    Returns every symbol in companies.json, in file order.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return [company['symbol'] for company in json.load(f) if company.get('symbol')]
+
+# =========================
+# 1. Scraping one company page
+# =========================
+
+def selenium_pages(driver, tab, budget):
+    """
+    Opens a tab on the company page the driver is on and yields the rows of
+    its table one page at a time. The next page is only requested when the
+    caller asks for it.
+
+    Parameters:
+    - driver (webdriver.Chrome): The Selenium WebDriver instance.
+    - tab (str): Key of TABS.
+    - budget (LatencyBudget): Budget the waits draw from.
+    """
+    config = TABS[tab]
+    table = f"#{config['table']}"
+    next_button = f"{table}_next"
+
+    # Click the tab as soon as it is on the page
+    tab_link = wait_for_element(driver, (By.CSS_SELECTOR, f"a[href='{config['anchor']}']"), budget)
+    driver.execute_script("arguments[0].click();", tab_link)
+
+    # Wait for the DataTable to be drawn with its first page of rows
+    state = wait_for_rows(driver, table, budget)
+
+    while True:
+        # Read all rows and the pagination state in one call
+        with budget.extracting():
+            page = extract_table(driver, table, next_selector=next_button)
+        yield page['rows']
+
+        # Stop when the "Next" button is disabled
+        if not page['has_next'] or not click_next(driver, next_button):
+            return
+        # Continue as soon as the next page has been drawn
+        state = wait_for_table_change(driver, table, state, budget)
+
+
+def http_pages(company_page, tab):
+    """
+    Yields the rows of a tab's table one page at a time from its JSON endpoint.
+
+    Raises:
+    - HttpFetchError: If the rows do not start with a date like the rendered table
+      does, or are not listed newest first as collect_rows() assumes.
+    """
+    previous = None
+    for rows in company_page.table_pages(TABS[tab]['table']):
+        for cells in rows[:1]:
+            if not cells or not DATE_PATTERN.match(cells[0]['text']):
+                raise HttpFetchError(f"Unexpected {tab} row layout for {company_page.symbol}")
+        for cells in rows:
+            match = DATE_PATTERN.match(cells[0]['text']) if cells else None
+            if match is None:
+                continue
+            if previous is not None and match.group(0) > previous:
+                raise HttpFetchError(f"{tab} rows for {company_page.symbol} are not newest first")
+            previous = match.group(0)
+        yield rows
+
+
+def collect_rows(pages, known=None):
+    """
+    Collects (date, title, url) rows from pages of table rows.
+
+    Parameters:
+    - pages (iterable): Lists of rows as produced by selenium_pages or http_pages.
+    - known (set, optional): row_key()s of rows already saved. Reading stops at
+      the first known row, since everything after it is older, and no
+      further pages are requested.
+
+    Returns:
+    - list: The rows before the first known row, newest first as listed on the site.
+    """
+    rows = []
+    for page in pages:
+        for row in dated_links(page):
+            if known and row_key(*row) in known:
+                return rows
+            rows.append(row)
+    return rows
+
+
+def crawl_company(symbol, tabs, get_driver=None, root=BASE_DIR, incremental=True, use_http=True):
+    """
+    Saves each requested tab of a company to its CSV.
+
+    Tabs are fetched over plain HTTP from the endpoints behind the DataTables
+    when possible. If that fails, the company page is loaded once in a browser
+    session from get_driver() and the tabs are read from the rendered tables.
+
+    Parameters:
+    - symbol (str): Stock symbol, e.g. NABIL.
+    - tabs (list): Keys of TABS.
+    - get_driver (callable, optional): Returns a WebDriver for the Selenium fallback.
+    - root (str): Directory holding the per-symbol folders.
+    - incremental (bool): Only fetch rows newer than those already saved and
+      prepend them to the CSV, instead of re-reading every page.
+    - use_http (bool): Try the HTTP path before Selenium.
+
+    Returns:
+    - dict: Tab -> number of new rows saved, or None if the tab failed.
+
+    Raises:
+    - BrowserSessionLost: If the browser session fails; the remaining tabs are
+      not attempted, so the session is not used again.
+    """
+    symbol = symbol.upper()
+    budget = LatencyBudget(f"{symbol} {', '.join(tabs)}")
+    company_page = None
+    driver = None
+    saved = {}
+    try:
+        for position, tab in enumerate(tabs):
+            try:
+                path = tab_csv_path(symbol, tab, root)
+                existing = read_rows(path) if incremental else []
+                known = {row_key(*row) for row in existing}
+
+                rows = None
+                if use_http:
+                    try:
+                        if company_page is None:
+                            company_page = CompanyPage(symbol)
+                        rows = collect_rows(http_pages(company_page, tab), known)
+                    except HttpFetchError as e:
+                        print(f"HTTP fetch of {symbol} {tab} failed, using the browser: {str(e)}")
+                        use_http = False  # Don't retry HTTP for the remaining tabs
+
+                if rows is None:
+                    if get_driver is None:
+                        raise RuntimeError("No browser session available")
+                    if driver is None:
+                        driver = get_driver()
+                        driver.get(COMPANY_URL.format(symbol=symbol.lower()))
+                    rows = collect_rows(selenium_pages(driver, tab, budget), known)
+
+                # Leave the file untouched when nothing is new, so its mtime stays meaningful
+                if rows or not existing:
+                    write_rows(path, rows + existing)
+                saved[tab] = len(rows)
+                print(f"{symbol} {tab}: saved {len(rows)} new rows ({len(existing)} already saved)")
+            except WebDriverException as e:
+                print(f"Browser session failed on {tab} for {symbol}: {str(e)}")
+                for remaining in tabs[position:]:
+                    saved[remaining] = None
+                raise BrowserSessionLost(symbol, saved, e) from e
+            except Exception as e:
+                print(f"Error scraping {tab} for {symbol}: {str(e)}")
+                saved[tab] = None
+    finally:
+        budget.report()
+    return saved
+
+# =========================
+# 2. Crawling many companies
+# =========================
+
+def crawl(symbols, tabs=('news', 'announcements'), workers=CRAWL_WORKERS, root=BASE_DIR, incremental=True,
+          use_http=True):
+    """
+    Crawls the given tabs of many companies with a bounded number of workers.
+    Each symbol is one job; a job only borrows a session from the shared
+    browser pool when it has to fall back from HTTP to Selenium.
+
+    Parameters:
+    - symbols (list): Stock symbols.
+    - tabs (iterable): Keys of TABS.
+    - workers (int): Maximum number of browser sessions.
+    - root (str): Directory holding the per-symbol folders.
+    - incremental (bool): Stop each tab at the newest row already saved.
+    - use_http (bool): Try the HTTP path before Selenium.
+
+    Returns:
+    - dict: Symbol -> the result of crawl_company, in the order of symbols.
+    """
+    tabs = list(tabs)
+    unknown = [tab for tab in tabs if tab not in TABS]
+    if unknown:
+        raise ValueError(f"Unknown tabs: {', '.join(unknown)}")
+
+    def job(symbol):
+        try:
+            with ExitStack() as stack:
+                # Only borrow a browser session if the HTTP path fails
+                get_driver = lambda: stack.enter_context(browser_pool.session())
+                return crawl_company(symbol, tabs, get_driver, root, incremental, use_http)
+        except BrowserSessionLost as e:
+            # The pool has retired the session on the way out of the with block
+            return e.saved
+
+    started = time.perf_counter()
+    pool_before = browser_pool.stats()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = dict(zip(symbols, executor.map(job, symbols)))
+    pool_after = browser_pool.stats()
+
+    failed = [f"{symbol} {tab}" for symbol, saved in results.items() for tab, rows in saved.items() if rows is None]
+    print(f"\nCrawled {len(symbols)} symbols x {len(tabs)} tabs in {time.perf_counter() - started:.1f}s"
+          f" with {pool_after['borrows'] - pool_before['borrows']} browser borrows; {len(failed)} failed")
+    for name in failed:
+        print(f"  failed: {name}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl ShareSansar company tabs into <SYMBOL>/sharesansar_*.csv")
+    parser.add_argument('symbols', nargs='*', help="Symbols to crawl (default: every symbol in companies.json)")
+    parser.add_argument('--tabs', default='news,announcements',
+                        help=f"Comma-separated tabs out of {', '.join(TABS)}")
+    parser.add_argument('--workers', type=int, default=CRAWL_WORKERS, help="Symbols to crawl at once")
+    parser.add_argument('--full', action='store_true', help="Re-read every page and rewrite the CSVs")
+    parser.add_argument('--browser', action='store_true', help="Skip the HTTP path and use Selenium only")
+    args = parser.parse_args()
+
+    symbols = [symbol.upper() for symbol in args.symbols] or all_symbols()
+    crawl(symbols, args.tabs.split(','), args.workers, incremental=not args.full, use_http=not args.browser)
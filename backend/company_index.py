@@ -0,0 +1,312 @@
+import os
+import json
+import base64
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+from response_cache import make_entry
+from symbol_suggest import SymbolSuggester
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPANIES_PATH = os.path.join(BASE_DIR, 'data', 'companies.json')
+
+# companies.json stores these as display strings such as "44,080,094,400.00"
+NUMERIC_FIELDS = [
+    'listed_shares',
+    'paid_up',
+    'total_paid_up_capital',
+    'market_capitalization',
+    'market_price',
+]
+
+# Fields /api/companies can sort by; text fields sort case-insensitively
+TEXT_SORT_FIELDS = ['name', 'symbol']
+SORT_FIELDS = TEXT_SORT_FIELDS + NUMERIC_FIELDS
+SORT_ALIASES = {
+    'market_cap': 'market_capitalization',
+    'price': 'market_price',
+    'shares': 'listed_shares',
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_number(value):
+    """
+    Parses a scraped number like "44,080,094,400.00" into a float, or None if it is blank.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace(',', '').strip()
+    if not text or text in ('-', 'N/A'):
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class CompanySnapshot:
+    """
+    Immutable view of one version of companies.json.
+
+    Holds the companies with their ids, float values of the numeric fields,
+    lookups by symbol and by sector, and the pre-encoded (and pre-gzipped)
+    /api/companies and /api/sectors responses.
+    """
+
+    def __init__(self, companies, last_modified=None):
+        # Add unique ID to each company
+        for i, company in enumerate(companies):
+            company['id'] = i + 1
+        self.companies = companies
+
+        self.numeric = [
+            {field: parse_number(company.get(field)) for field in NUMERIC_FIELDS}
+            for company in companies
+        ]
+
+        self.by_symbol = {}
+        self.by_sector = {}
+        for i, company in enumerate(companies):
+            if company.get('symbol'):
+                self.by_symbol[company['symbol'].upper()] = i
+            if company.get('sector'):
+                self.by_sector.setdefault(company['sector'], []).append(i)
+        self.sectors = sorted(self.by_sector)
+
+        self.companies_json = json.dumps(companies, sort_keys=True).encode('utf-8')
+        self.sectors_json = json.dumps(self.sectors).encode('utf-8')
+        self.companies_entry = make_entry(self.companies_json, last_modified)
+        self.sectors_entry = make_entry(self.sectors_json, last_modified)
+
+        # Text fields are sorted through their rank in case-insensitive order,
+        # so every sort field has a numeric per-company value
+        self.ranks = {}
+        for field in TEXT_SORT_FIELDS:
+            order = sorted(range(len(companies)), key=lambda i: (companies[i].get(field) or '').lower())
+            ranks = [0] * len(companies)
+            for rank, i in enumerate(order):
+                ranks[i] = rank
+            self.ranks[field] = ranks
+        self.symbols_sorted = sorted((c.get('symbol') or '').lower() for c in companies)
+        self._indexes = {}
+        self._suggester = None
+        self._suggester_lock = threading.Lock()
+
+    def get(self, symbol):
+        """
+        Returns the company with the given symbol, or None.
+        """
+        i = self.by_symbol.get(symbol.upper())
+        return None if i is None else self.companies[i]
+
+    def suggester(self):
+        """
+        Returns the symbol autocomplete index of this snapshot, built on first use.
+        """
+        if self._suggester is None:
+            with self._suggester_lock:
+                if self._suggester is None:
+                    self._suggester = SymbolSuggester(self.companies)
+        return self._suggester
+
+    # -------------------------
+    # Sorted indexes and queries
+    # -------------------------
+
+    def sort_value(self, field, i):
+        if field in self.ranks:
+            return self.ranks[field][i]
+        return self.numeric[i][field]
+
+    def sorted_index(self, sector, field, descending=False):
+        """
+        Returns (keys, positions) for the companies of a sector (or all when None)
+        ordered by field. Keys are (missing, value, id) tuples, with the value
+        negated for descending order, so companies without a value always come
+        last and every key is unique. Built on first use and kept with the snapshot.
+        """
+        cache_key = (sector, field, descending)
+        index = self._indexes.get(cache_key)
+        if index is not None:
+            return index
+
+        positions = self.by_sector.get(sector, []) if sector else range(len(self.companies))
+        entries = []
+        for i in positions:
+            value = self.sort_value(field, i)
+            if value is None:
+                entries.append(((True, 0.0, i + 1), i))
+            else:
+                entries.append(((False, -value if descending else value, i + 1), i))
+        entries.sort()
+        index = ([key for key, _ in entries], [i for _, i in entries])
+        self._indexes[cache_key] = index
+        return index
+
+    def symbol_prefix_ranks(self, prefix):
+        """
+        Returns the [lo, hi) range of symbol ranks whose symbol starts with prefix.
+        """
+        prefix = prefix.lower()
+        lo = bisect_left(self.symbols_sorted, prefix)
+        hi = bisect_left(self.symbols_sorted, prefix + '\uffff')
+        return lo, hi
+
+    def query(self, sector=None, prefix=None, search=None, sort='name', descending=False,
+              ranges=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Filters, sorts and pages companies using the precomputed sorted indexes.
+
+        A range on the sort field (or a symbol prefix when sorting by symbol) is
+        located by binary search, so a page costs O(log n + k). Other filters are
+        checked while walking the index.
+
+        Parameters:
+        - sector (str, optional): Only companies of this sector.
+        - prefix (str, optional): Symbol prefix, case-insensitive.
+        - search (str, optional): Substring of the symbol or name, case-insensitive.
+        - sort (str): One of SORT_FIELDS or SORT_ALIASES.
+        - descending (bool): Sort order.
+        - ranges (dict, optional): Numeric field -> (min, max); either bound may be None.
+        - limit (int): Page size.
+        - cursor (str, optional): next_cursor of the previous page.
+
+        Returns:
+        - tuple: The companies on the page and the cursor of the next page (or None).
+
+        Raises:
+        - ValueError: On an unknown field or a malformed cursor.
+        """
+        sort = SORT_ALIASES.get(sort, sort)
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        ranges = {SORT_ALIASES.get(f, f): bounds for f, bounds in (ranges or {}).items()}
+        for field in ranges:
+            if field not in NUMERIC_FIELDS:
+                raise ValueError(f"Cannot filter by {field}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        # Symbol prefixes become a range over symbol ranks
+        if prefix:
+            lo_rank, hi_rank = self.symbol_prefix_ranks(prefix)
+            ranges['symbol'] = (lo_rank, hi_rank - 1)
+
+        keys, positions = self.sorted_index(sector, sort, descending)
+
+        # Narrow to the sort field's range with binary search
+        start, end = 0, len(keys)
+        if sort in ranges:
+            low, high = ranges.pop(sort)
+            if descending:
+                low, high = (None if high is None else -high), (None if low is None else -low)
+            if low is not None:
+                start = bisect_left(keys, (False, low, 0))
+            end = bisect_right(keys, (False, float('inf') if high is None else high, float('inf')))
+
+        if cursor:
+            start = max(start, bisect_right(keys, decode_cursor(cursor)))
+
+        needle = search.lower() if search else None
+        page = []
+        last_key = None
+        pos = start
+        while pos < end and len(page) < limit:
+            i = positions[pos]
+            pos += 1
+            if not self._matches(i, ranges, needle):
+                continue
+            page.append(self.companies[i])
+            last_key = keys[pos - 1]
+
+        next_cursor = encode_cursor(last_key) if pos < end and len(page) == limit else None
+        return page, next_cursor
+
+    def _matches(self, i, ranges, needle):
+        for field, (low, high) in ranges.items():
+            value = self.sort_value(field, i)
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        if needle:
+            company = self.companies[i]
+            if needle not in (company.get('symbol') or '').lower() and needle not in (company.get('name') or '').lower():
+                return False
+        return True
+
+
+def encode_cursor(key):
+    """
+    Encodes an index key as an opaque, URL-safe cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        missing, value, company_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (bool(missing), float(value), int(company_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class CompanyIndex:
+    """
+    Keeps a CompanySnapshot of companies.json, rebuilt when the file changes.
+    """
+
+    def __init__(self, path=COMPANIES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot = CompanySnapshot([])
+
+    def current(self):
+        """
+        Returns the snapshot for the current contents of companies.json,
+        rebuilding it first if the file's mtime or size changed.
+        """
+        signature = self._file_signature()
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._rebuild(signature)
+        return self._snapshot
+
+    def refresh(self):
+        """
+        Rebuilds the snapshot now, e.g. when the ingestion daemon reports a new
+        company list, even if the file's mtime and size look unchanged.
+        """
+        with self._lock:
+            self._rebuild(self._file_signature())
+        return self._snapshot
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _rebuild(self, signature):
+        companies = []
+        if signature is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    companies = json.load(f)
+            except Exception as e:
+                # Keep serving the previous snapshot, e.g. while a scraper is mid-write
+                print(f"Error loading data from {self.path}: {str(e)}")
+                return
+        last_modified = datetime.fromtimestamp(signature[0] / 1e9, timezone.utc) if signature else None
+        self._snapshot = CompanySnapshot(companies, last_modified)
+        self._signature = signature
+
+
+# Shared index used by the Flask routes
+company_index = CompanyIndex()
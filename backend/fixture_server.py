@@ -0,0 +1,386 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Recorded responses, one subdirectory per site
+FIXTURES_DIR = os.getenv('SCRAPE_FIXTURES_DIR', os.path.join(BASE_DIR, 'fixtures'))
+
+# Sites the scrapers read, by the name their fixtures are stored under
+SITES = {
+    'sharesansar': "https://www.sharesansar.com",
+    'merolagani': "https://eng.merolagani.com",
+}
+
+# Query parameters that change on every request without changing the response:
+# jQuery's cache buster and the DataTables draw counter (echoed back on replay)
+VOLATILE_PARAMS = {'_', 'draw'}
+# DataTables sends its column, ordering and search state with every page request
+DATATABLES_PARAM_PREFIXES = ('columns[', 'order[', 'search[')
+
+# Response headers passed through to the scraper; everything else is dropped
+KEPT_HEADERS = {'content-type', 'location', 'cache-control'}
+# Request headers not forwarded upstream while recording
+HOP_HEADERS = {'host', 'connection', 'content-length', 'accept-encoding', 'keep-alive', 'te', 'upgrade'}
+
+TEXT_TYPES = ('text/', 'application/json', 'application/javascript', 'application/x-javascript')
+
+# =========================
+# 1. Fixture store
+# =========================
+
+def request_params(query, body=b'', content_type=''):
+    """
+    Returns the parameters of a request as a list of (name, value) pairs: the
+    query string plus, for form POSTs such as DataTables requests, the body.
+    """
+    params = parse_qsl(query, keep_blank_values=True)
+    if body and content_type.startswith('application/x-www-form-urlencoded'):
+        params += parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True)
+    return params
+
+
+def is_table_request(params):
+    """
+    True for a DataTables server-side page request (it has start and length).
+    """
+    names = {name for name, _ in params}
+    return 'start' in names and 'length' in names
+
+
+def fixture_key(method, path, params, table=False):
+    """
+    Identifies a recorded response: the method, path and sorted parameters,
+    without the volatile ones. Table keys also leave out the paging and
+    DataTables state, so every page of a table shares one key.
+    """
+    kept = []
+    for name, value in params:
+        if name in VOLATILE_PARAMS:
+            continue
+        if table and (name in ('start', 'length') or name.startswith(DATATABLES_PARAM_PREFIXES)):
+            continue
+        kept.append((name, value))
+    query = urlencode(sorted(kept))
+    return f"{method} {path}{'?' + query if query else ''}"
+
+
+def _fixture_name(key):
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class FixtureStore:
+    """
+    Recorded responses of one site under <root>/<site>/.
+
+    Pages are stored as pages/<name>.json (key, status and headers) next to
+    pages/<name>.body (the decoded body). DataTables endpoints are stored per
+    table in tables/<name>.json, with every recorded row in order, so a replay
+    can serve any page size and offset out of the rows it has seen, the way
+    the real endpoint pages its results.
+    """
+
+    def __init__(self, site, root=FIXTURES_DIR):
+        self.site = site
+        self.dir = os.path.join(root, site)
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def _page_path(self, key, suffix):
+        return os.path.join(self.dir, 'pages', f"{_fixture_name(key)}.{suffix}")
+
+    def _table_path(self, key):
+        return os.path.join(self.dir, 'tables', f"{_fixture_name(key)}.json")
+
+    def get_page(self, key):
+        """
+        Returns (status, headers, body) of a recorded response, or None.
+        """
+        try:
+            with open(self._page_path(key, 'json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self._page_path(key, 'body'), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        return meta['status'], meta['headers'], body
+
+    def put_page(self, key, status, headers, body):
+        with self._lock:
+            _write_atomic(self._page_path(key, 'body'), body)
+            meta = {'key': key, 'status': status, 'headers': headers}
+            _write_atomic(self._page_path(key, 'json'), json.dumps(meta, indent=2).encode('utf-8'))
+
+    def get_table(self, key):
+        with self._lock:
+            if key not in self._tables:
+                try:
+                    with open(self._table_path(key), 'r', encoding='utf-8') as f:
+                        self._tables[key] = json.load(f)
+                except OSError:
+                    return None
+            return self._tables[key]
+
+    def put_table_page(self, key, start, payload):
+        """
+        Merges one page of a DataTables response into the table's recorded rows.
+        Pages that would leave a gap after the recorded rows are skipped.
+        """
+        data = payload.get('data')
+        if not isinstance(data, list):
+            return
+        table = self.get_table(key) or {'key': key, 'extra': {}, 'data': []}
+        with self._lock:
+            rows = table['data']
+            if start > len(rows):
+                return
+            rows[start:start + len(data)] = data
+            table['extra'] = {name: value for name, value in payload.items()
+                              if name not in ('data', 'draw')}
+            self._tables[key] = table
+            _write_atomic(self._table_path(key), json.dumps(table).encode('utf-8'))
+
+    def table_page(self, key, start, length, draw):
+        """
+        Returns a DataTables response for rows [start, start + length) of a
+        recorded table, or None if the table was never recorded.
+        """
+        table = self.get_table(key)
+        if table is None:
+            return None
+        rows = table['data']
+        # Only the recorded rows can be paged through, however many the site had
+        total = min(int(table['extra'].get('recordsTotal', len(rows))), len(rows))
+        end = len(rows) if length < 0 else start + length
+        payload = dict(table['extra'])
+        payload.update({
+            'draw': draw,
+            'recordsTotal': total,
+            'recordsFiltered': min(int(table['extra'].get('recordsFiltered', total)), total),
+            'data': rows[start:end],
+        })
+        return payload
+
+# =========================
+# 2. Record / replay server
+# =========================
+
+def _int_param(params, name, default=0):
+    for key, value in params:
+        if key == name:
+            try:
+                return int(value)
+            except ValueError:
+                return default
+    return default
+
+
+def _origin_pattern(upstream):
+    # Absolute links to the site, including protocol-relative and JSON-escaped ones
+    host = re.escape(urlsplit(upstream).netloc)
+    return re.compile(r'(?:https?:)?(?:\\?/){2}' + host)
+
+
+def _local_cookie(cookie):
+    # Drop the attributes that would stop a browser storing the cookie for 127.0.0.1
+    parts = [part for part in cookie.split(';')
+             if part.strip().split('=')[0].lower() not in ('domain', 'secure', 'samesite')]
+    return ';'.join(parts)
+
+
+class FixtureServer:
+    """
+    A local stand-in for one site.
+
+    In record mode every request is forwarded to the real site and the
+    response is saved to the FixtureStore before being returned. In replay
+    mode responses come from the store only and unknown requests get a 404.
+    Either way, links to the real site in pages and JSON are rewritten to the
+    local server, so a browser pointed at it stays on it, and only same-origin
+    requests are recorded.
+
+    Parameters:
+    - site (str): Key of SITES.
+    - record (bool): Forward to the real site and save what it returns.
+    - port (int): Port to listen on; 0 picks a free one.
+    - latency (float): Seconds added to every replayed response, to model the
+      round trip to the real site.
+    - root (str): Fixtures directory.
+    """
+
+    def __init__(self, site, record=False, port=0, latency=0.0, root=FIXTURES_DIR):
+        self.site = site
+        self.upstream = SITES[site]
+        self.record = record
+        self.latency = latency
+        self.store = FixtureStore(site, root)
+        self._origin = _origin_pattern(self.upstream)
+        self._session = requests.Session() if record else None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.misses = []
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=f"fixtures-{self.site}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {'site': self.site, 'requests': self.requests, 'misses': len(self.misses)}
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.misses = []
+
+    def to_local(self, body, content_type):
+        """
+        Points absolute links to the real site at this server.
+        """
+        if not content_type.startswith(TEXT_TYPES):
+            return body
+        text = body.decode('utf-8', 'replace')
+        text = self._origin.sub(lambda m: self.url.replace('/', '\\/') if '\\' in m.group(0) else self.url, text)
+        return text.encode('utf-8')
+
+    def to_upstream(self, value):
+        return value.replace(self.url, self.upstream)
+
+    # Request handling
+
+    def handle(self, method, path, query, headers, body):
+        """
+        Returns (status, headers, body) for one request.
+        """
+        with self._lock:
+            self.requests += 1
+        content_type = headers.get('Content-Type', '')
+        params = request_params(query, body, content_type)
+        table = is_table_request(params)
+        key = fixture_key(method, path, params, table)
+
+        if self.record:
+            status, out_headers, out_body = self._forward(method, path, query, headers, body)
+            if table and status == 200 and out_headers.get('content-type', '').startswith('application/json'):
+                try:
+                    self.store.put_table_page(key, _int_param(params, 'start'), json.loads(out_body))
+                except ValueError:
+                    pass
+            stored = {name: value for name, value in out_headers.items() if name != 'set-cookie'}
+            self.store.put_page(fixture_key(method, path, params), status, stored, out_body)
+        else:
+            if self.latency:
+                time.sleep(self.latency)
+            page = self.store.table_page(key, _int_param(params, 'start'), _int_param(params, 'length', 10),
+                                         _int_param(params, 'draw')) if table else None
+            if page is not None:
+                status, out_headers, out_body = 200, {'content-type': 'application/json'}, json.dumps(page).encode('utf-8')
+            else:
+                recorded = self.store.get_page(fixture_key(method, path, params))
+                if recorded is None:
+                    with self._lock:
+                        self.misses.append(key)
+                    message = f"No fixture for {key}\n".encode('utf-8')
+                    return 404, {'content-type': 'text/plain; charset=utf-8'}, message
+                status, out_headers, out_body = recorded
+
+        return status, out_headers, self.to_local(out_body, out_headers.get('content-type', ''))
+
+    def _forward(self, method, path, query, headers, body):
+        url = f"{self.upstream}{path}{'?' + query if query else ''}"
+        forwarded = {name: self.to_upstream(value) for name, value in headers.items()
+                     if name.lower() not in HOP_HEADERS}
+        response = self._session.request(method, url, headers=forwarded, data=body or None,
+                                         allow_redirects=False, timeout=30)
+        out_headers = {name.lower(): value for name, value in response.headers.items()
+                       if name.lower() in KEPT_HEADERS}
+        if 'location' in out_headers:
+            out_headers['location'] = self._origin.sub(self.url, out_headers['location'])
+        # Pass session cookies on (never stored) so the site's CSRF checks pass while recording
+        cookies = [_local_cookie(cookie) for cookie in response.raw.headers.getlist('Set-Cookie')]
+        if cookies:
+            out_headers['set-cookie'] = cookies
+        return response.status_code, out_headers, response.content
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _serve(self):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                try:
+                    status, headers, out = server.handle(self.command, parts.path, parts.query,
+                                                         dict(self.headers.items()), body)
+                except Exception as e:
+                    status, headers, out = 502, {'content-type': 'text/plain'}, f"{e}\n".encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    for item in (value if isinstance(value, list) else [value]):
+                        self.send_header(name, item)
+                self.send_header('Content-Length', str(len(out)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(out)
+
+            do_GET = do_POST = do_HEAD = _serve
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output readable
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded ShareSansar/MeroLagani responses locally")
+    parser.add_argument('site', choices=sorted(SITES))
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--record', action='store_true', help="Proxy to the real site and save its responses")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every replayed response")
+    args = parser.parse_args()
+
+    fixture_server = FixtureServer(args.site, args.record, args.port, args.latency)
+    env_name = 'SHARESANSAR_BASE_URL' if args.site == 'sharesansar' else 'MEROLAGANI_BASE_URL'
+    print(f"{'Recording' if args.record else 'Replaying'} {args.site} at {fixture_server.url}")
+    print(f"Point the scrapers at it with {env_name}={fixture_server.url}")
+    try:
+        fixture_server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from last_updated import LAST_UPDATED_PATH, MARKET_DATA_SOURCE, read_last_updated
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Precomputed forecasts for every supported symbol
+FORECAST_STORE_PATH = os.path.join(BASE_DIR, 'models', 'forecasts.json')
+# Bump when the layout of forecasts.json changes; older files are recomputed
+STORE_FORMAT_VERSION = 2
+
+# Recompute at least this often even if no new data arrived
+FORECAST_MAX_AGE_SECONDS = int(os.getenv('FORECAST_MAX_AGE_SECONDS', str(6 * 60 * 60)))
+# How often the background job checks for new data
+FORECAST_POLL_SECONDS = int(os.getenv('FORECAST_POLL_SECONDS', '60'))
+# How often requests check for new data; a stale store is refreshed in the background
+FORECAST_CHECK_SECONDS = float(os.getenv('FORECAST_CHECK_SECONDS', '30'))
+
+
+def read_data_version(path=LAST_UPDATED_PATH):
+    """
+    Returns when the market data source last updated according to
+    last_updated.txt, which identifies the data the forecasts were computed
+    from, or None if it never has. Updates of other sources are ignored.
+    """
+    return read_last_updated(path).get(MARKET_DATA_SOURCE)
+
+
+class ForecastStore:
+    """
+    Holds precomputed forecasts in memory, backed by a versioned JSON file.
+
+    compute(symbols) must return a dict of symbol -> JSON-serializable forecast.
+    Each forecast is serialized once per refresh, so routes can return the
+    stored bytes together with an ETag and Last-Modified time. on_publish, if
+    given, is called with the forecasts whenever they are computed or loaded.
+
+    Reads check for new data at most every check_seconds and, if the store is
+    stale, start a refresh in a background thread while the current forecasts
+    keep being served. start() adds a polling thread on top of that.
+    """
+
+    def __init__(self, compute, symbols, path=FORECAST_STORE_PATH,
+                 last_updated_path=LAST_UPDATED_PATH, max_age=FORECAST_MAX_AGE_SECONDS,
+                 on_publish=None, check_seconds=FORECAST_CHECK_SECONDS):
+        self._compute = compute
+        self._on_publish = on_publish
+        self.symbols = list(symbols)
+        self.path = path
+        self.last_updated_path = last_updated_path
+        self.max_age = max_age
+        self.check_seconds = check_seconds
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._load_attempted = False
+        self._entries = None
+        self.revision = 0
+        self.data_version = None
+        self.generated_at = None
+        self._checked = None  # The first read checks for staleness right away
+        self._refreshing = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    # -------------------------
+    # Reading
+    # -------------------------
+
+    def get(self, symbol):
+        """
+        Returns the stored entry for a symbol as a dict with 'body' (JSON bytes),
+        'etag' and 'last_modified', or None if the symbol has no forecast.
+
+        Never computes forecasts in the calling thread: until the first refresh
+        has filled the store (and no store file could be loaded), this starts
+        that refresh in the background and returns None.
+        """
+        if self._entries is None:
+            self._try_load()
+            if self._entries is None:
+                self._refresh_soon()
+                return None
+        self._check_stale()
+        with self._lock:
+            return self._entries.get(symbol)
+
+    def _refresh_soon(self):
+        # The polling thread, when running, is already computing the first forecasts
+        if self._thread is not None:
+            self.wake()
+        else:
+            self.refresh_in_background()
+
+    def _check_stale(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_seconds:
+            return
+        self._checked = now
+        if self.is_stale():
+            self._refresh_soon()
+
+    def _try_load(self):
+        # The store file is read once; afterwards only refreshes publish forecasts
+        with self._load_lock:
+            if self._entries is None and not self._load_attempted:
+                self._load_attempted = True
+                self._load()
+
+    def _ensure_loaded(self):
+        if self._entries is not None:
+            return
+        self._try_load()
+        if self._entries is None or self.is_stale():
+            self.refresh()
+
+    def is_stale(self):
+        """
+        True if new market data arrived or the forecasts are older than max_age.
+        """
+        if self.generated_at is None:
+            return True
+        if read_data_version(self.last_updated_path) != self.data_version:
+            return True
+        age = (datetime.now(timezone.utc) - self.generated_at).total_seconds()
+        return age > self.max_age
+
+    def _load(self):
+        """
+        Loads forecasts from disk. Returns False if the file is missing or in an old format.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if stored.get('format_version') != STORE_FORMAT_VERSION:
+            print(f"Ignoring forecast store with format version {stored.get('format_version')}")
+            return False
+
+        self._publish(
+            stored['forecasts'],
+            revision=stored['revision'],
+            data_version=stored['data_version'],
+            generated_at=datetime.fromisoformat(stored['generated_at']),
+        )
+        return True
+
+    # -------------------------
+    # Refreshing
+    # -------------------------
+
+    def refresh(self):
+        """
+        Recomputes every forecast and writes the store to disk.
+        """
+        with self._refresh_lock:
+            self._refresh_locked()
+
+    def refresh_in_background(self):
+        """
+        Starts a refresh in a daemon thread unless one is already running.
+
+        Returns:
+        - bool: True if a refresh was started.
+        """
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing forecasts: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='forecast-refresh-once', daemon=True).start()
+        return True
+
+    def _refresh_locked(self):
+        started = time.perf_counter()
+        data_version = read_data_version(self.last_updated_path)
+        forecasts = self._compute(self.symbols)
+        generated_at = datetime.now(timezone.utc).replace(microsecond=0)
+        revision = self.revision + 1
+
+        self._write({
+            'format_version': STORE_FORMAT_VERSION,
+            'revision': revision,
+            'data_version': data_version,
+            'generated_at': generated_at.isoformat(),
+            'forecasts': forecasts,
+        })
+        self._publish(forecasts, revision, data_version, generated_at)
+        print(f"Forecast store refreshed: {len(forecasts)} symbols in {time.perf_counter() - started:.2f}s")
+
+    def _write(self, stored):
+        # Write to a temp file and rename so readers never see a partial file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # The temp name is unique per process, as several app workers may refresh at once
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f)
+        os.replace(tmp_path, self.path)
+
+    def _publish(self, forecasts, revision, data_version, generated_at):
+        if self._on_publish is not None:
+            self._on_publish(forecasts)
+
+        entries = {}
+        for symbol, forecast in forecasts.items():
+            body = json.dumps(forecast).encode('utf-8')
+            digest = hashlib.sha1(body).hexdigest()[:16]
+            entries[symbol] = {
+                'body': body,
+                # From the content alone, so every worker gives the same body the same ETag
+                'etag': digest,
+                'last_modified': generated_at,
+            }
+        with self._lock:
+            self._entries = entries
+            self.revision = revision
+            self.data_version = data_version
+            self.generated_at = generated_at
+
+    # -------------------------
+    # Background job
+    # -------------------------
+
+    def start(self, interval=FORECAST_POLL_SECONDS):
+        """
+        Starts a daemon thread that refreshes the store whenever last_updated.txt
+        changes or the forecasts exceed max_age.
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(interval,),
+                                        name='forecast-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        """
+        Makes the background job check for new data now rather than at its next poll.
+        """
+        self._wake.set()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self._ensure_loaded()
+                if self.is_stale():
+                    self.refresh()
+            except Exception as e:
+                print(f"Error refreshing forecasts: {str(e)}")
+            self._wake.wait(interval)
+            self._wake.clear()
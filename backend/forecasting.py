@@ -0,0 +1,339 @@
+import os
+import weakref
+
+import numpy as np
+import torch
+
+from stock_model import INPUT_SIZE
+
+# Number of days forecast by the prediction routes
+FORECAST_HORIZON = 30
+
+# Carry (h, c) between steps instead of re-running the full window each step
+FORECAST_STATEFUL = os.getenv('FORECAST_STATEFUL', '1') == '1'
+# Carrying (h, c) is not equivalent to re-running the window by construction, so each
+# loaded model's first stateful forecast is checked against the windowed one; models
+# that deviate by more than this, relative to the price, stay on the windowed rollout
+FORECAST_PARITY_RTOL = float(os.getenv('FORECAST_PARITY_RTOL', '0.001'))
+
+# Model -> whether its stateful forecasts passed the parity check; kept while the model is loaded
+_stateful_verdicts = weakref.WeakKeyDictionary()
+
+# =========================
+# 1. Stacked LSTM Evaluation
+# =========================
+
+class StackedStockLSTM:
+    """
+    Evaluates N StockLSTM models with identical architecture as one batched network.
+
+    Each model keeps its own weights; the weights are stacked along a leading
+    model dimension so that row i of the input batch is run through model i
+    with a single set of batched matrix multiplies per timestep.
+    """
+
+    def __init__(self, models):
+        first = models[0]
+        self.num_layers = first.num_layers
+        self.hidden_size = first.hidden_size
+        self.device = next(first.parameters()).device
+
+        with torch.no_grad():
+            # PyTorch orders the gate rows (i, f, g, o); reorder them to (i, f, o, g)
+            # so the three sigmoid gates are one contiguous slice
+            H = self.hidden_size
+            order = torch.cat([torch.arange(0, 2 * H), torch.arange(3 * H, 4 * H), torch.arange(2 * H, 3 * H)])
+
+            self.layers = []
+            for k in range(self.num_layers):
+                w_ih = torch.stack([getattr(m.lstm, f'weight_ih_l{k}')[order] for m in models])
+                w_hh = torch.stack([getattr(m.lstm, f'weight_hh_l{k}')[order] for m in models])
+                bias = torch.stack([
+                    (getattr(m.lstm, f'bias_ih_l{k}') + getattr(m.lstm, f'bias_hh_l{k}'))[order]
+                    for m in models
+                ])
+                # Pre-transpose so the per-step products are plain bmm calls
+                self.layers.append((w_ih.transpose(1, 2).contiguous(),
+                                    w_hh.transpose(1, 2).contiguous(),
+                                    bias))
+
+            self.fc = []
+            for i, module in enumerate(first.fc_layers):
+                if isinstance(module, torch.nn.Linear):
+                    weight = torch.stack([m.fc_layers[i].weight for m in models])
+                    bias = torch.stack([m.fc_layers[i].bias for m in models])
+                    self.fc.append((weight.transpose(1, 2).contiguous(), bias))
+                else:
+                    self.fc.append(module)
+
+    def _head(self, hidden):
+        """
+        Applies the per-model fully connected layers to hidden states of shape [N, H].
+        """
+        out = hidden.unsqueeze(1)
+        for layer in self.fc:
+            if isinstance(layer, tuple):
+                weight, bias = layer
+                out = torch.baddbmm(bias.unsqueeze(1), out, weight)
+            else:
+                out = layer(out)
+        return out.squeeze(1)
+
+    def __call__(self, x):
+        """
+        Runs the stacked models over x of shape [N, seq_len, features] from a zero state.
+
+        Returns:
+        - Tensor: Outputs of shape [N, output_size].
+        """
+        return self.step(x)[0]
+
+    def step(self, x, state=None):
+        """
+        Runs x of shape [N, steps, features] starting from a carried per-layer (h, c) state.
+
+        Returns:
+        - tuple: Outputs of shape [N, output_size] and the updated state.
+        """
+        with torch.no_grad():
+            batch, steps, _ = x.shape
+            if state is None:
+                state = [(x.new_zeros(batch, 1, self.hidden_size),
+                          x.new_zeros(batch, 1, self.hidden_size))
+                         for _ in self.layers]
+            new_state = []
+            inputs = x
+            for (w_ih, w_hh, bias), (h, c) in zip(self.layers, state):
+                # Input projections for every timestep at once: [N, T, 4H]
+                projected = torch.baddbmm(bias.unsqueeze(1), inputs, w_ih)
+                outputs = []
+                for t in range(steps):
+                    h, c = self._cell(projected[:, t:t + 1], h, c, w_hh)
+                    outputs.append(h)
+                new_state.append((h, c))
+                inputs = torch.cat(outputs, dim=1)
+            return self._head(inputs[:, -1]), new_state
+
+    def _cell(self, projected, h, c, w_hh):
+        """
+        Advances one LSTM layer by a single timestep; all tensors are [N, 1, *].
+        """
+        H = self.hidden_size
+        gates = torch.baddbmm(projected, h, w_hh)
+        sig = torch.sigmoid(gates[:, :, :3 * H])
+        c = torch.addcmul(sig[:, :, H:2 * H] * c, sig[:, :, :H], torch.tanh(gates[:, :, 3 * H:]))
+        h = sig[:, :, 2 * H:] * torch.tanh(c)
+        return h, c
+
+# =========================
+# 2. Batched Forecasting
+# =========================
+
+def architecture_key(model, last_sequence):
+    """
+    Returns a key that is equal for models that can be stacked into one batch.
+    """
+    shapes = tuple((name, tuple(p.shape)) for name, p in model.named_parameters())
+    return shapes, tuple(last_sequence.shape), str(next(model.parameters()).device)
+
+
+def inverse_transform_close(scaler, scaled_close):
+    """
+    Maps scaled 'Close' values back to prices with one inverse_transform call.
+    """
+    scaled_close = np.asarray(scaled_close, dtype=np.float64)
+    dummy = np.zeros((len(scaled_close), scaler.n_features_in_))
+    dummy[:, 0] = scaled_close
+    return scaler.inverse_transform(dummy)[:, 0]
+
+
+def rollout_windowed(stacked, sequences, horizon=FORECAST_HORIZON):
+    """
+    Autoregressively forecasts `horizon` steps for a batch of sequences.
+
+    Each step re-runs the full window, then rolls it left by one and writes the
+    prediction into the 'Close' feature of the last row.
+
+    Parameters:
+    - stacked (StackedStockLSTM or StockLSTM): The models to evaluate, one per sequence.
+    - sequences (Tensor): Scaled input windows of shape [N, seq_len, features].
+    - horizon (int): Number of steps to forecast.
+
+    Returns:
+    - ndarray: Scaled 'Close' predictions of shape [N, horizon].
+    """
+    current = sequences.clone()
+    outputs = torch.empty(current.size(0), horizon, device=current.device)
+    with torch.no_grad():
+        for step in range(horizon):
+            output = stacked(current)[:, 0]
+            outputs[:, step] = output
+            current = torch.roll(current, -1, dims=1)
+            current[:, -1, 0] = output
+    return outputs.cpu().numpy()
+
+
+def rollout_stateful(network, sequences, horizon=FORECAST_HORIZON):
+    """
+    Autoregressively forecasts `horizon` steps while carrying the LSTM (h, c) state.
+
+    The window is encoded once; every later step feeds only the timestep the
+    windowed rollout would append (the row rolled off the front of the window
+    with its 'Close' feature replaced by the previous prediction). This costs
+    O(seq_len + horizon) LSTM steps instead of O(seq_len * horizon).
+
+    Parameters:
+    - network (StackedStockLSTM or StockLSTM): The models to evaluate, one per sequence.
+    - sequences (Tensor): Scaled input windows of shape [N, seq_len, features].
+    - horizon (int): Number of steps to forecast.
+
+    Returns:
+    - ndarray: Scaled 'Close' predictions of shape [N, horizon].
+    """
+    seq_len = sequences.size(1)
+    outputs = torch.empty(sequences.size(0), horizon, device=sequences.device)
+    with torch.no_grad():
+        output, state = network.step(sequences)
+        outputs[:, 0] = output[:, 0]
+        for step in range(1, horizon):
+            next_input = sequences[:, (step - 1) % seq_len].clone()
+            next_input[:, 0] = outputs[:, step - 1]
+            output, state = network.step(next_input.unsqueeze(1), state)
+            outputs[:, step] = output[:, 0]
+    return outputs.cpu().numpy()
+
+
+def max_relative_deviation(scaler, scaled, expected_scaled):
+    """
+    Returns the largest deviation of one scaled forecast from another, relative to the expected price.
+    """
+    actual = inverse_transform_close(scaler, scaled)
+    expected = inverse_transform_close(scaler, expected_scaled)
+    return float(np.max(np.abs(actual - expected) / np.maximum(np.abs(expected), 1e-8)))
+
+
+def verify_stateful(network, models, scalers, sequences, scaled, horizon, rtol=FORECAST_PARITY_RTOL):
+    """
+    Checks stateful forecasts against the windowed rollout for models not checked yet,
+    and replaces the rows of models that failed the check with windowed forecasts.
+
+    Parameters:
+    - network (StackedStockLSTM or StockLSTM): The models, one per sequence.
+    - models (list): The StockLSTM of each row.
+    - scalers (list): The scaler of each row.
+    - sequences (Tensor): Scaled input windows of shape [N, seq_len, features].
+    - scaled (ndarray): Stateful forecasts of shape [N, horizon]; updated in place.
+    - horizon (int): Number of steps forecast.
+    - rtol (float): Allowed deviation relative to the windowed price.
+
+    Returns:
+    - ndarray: The forecasts to use.
+    """
+    pending = [row for row, model in enumerate(models) if model not in _stateful_verdicts]
+    if not pending and all(_stateful_verdicts[model] for model in models):
+        return scaled
+
+    windowed = rollout_windowed(network, sequences, horizon)
+    for row in pending:
+        deviation = max_relative_deviation(scalers[row], scaled[row], windowed[row])
+        _stateful_verdicts[models[row]] = deviation <= rtol
+        if deviation > rtol:
+            print(f"Stateful forecast deviates by {deviation:.4%} from the windowed one; using the windowed rollout")
+    for row, model in enumerate(models):
+        if not _stateful_verdicts[model]:
+            scaled[row] = windowed[row]
+    return scaled
+
+
+def forecast_many(components_by_symbol, horizon=FORECAST_HORIZON, stateful=FORECAST_STATEFUL, verify=True):
+    """
+    Forecasts prices for many symbols, batching symbols that share an architecture.
+
+    Parameters:
+    - components_by_symbol (dict): Symbol -> (model, scaler, historical_data, last_sequence).
+    - horizon (int): Number of days to forecast.
+    - stateful (bool): Carry (h, c) between steps instead of re-running the full window.
+    - verify (bool): Check each model's first stateful forecast against the windowed
+      rollout and keep models that fail on the windowed one (see verify_stateful).
+
+    Returns:
+    - dict: Symbol -> ndarray of predicted prices. Symbols whose batch failed are omitted.
+    """
+    rollout = rollout_stateful if stateful else rollout_windowed
+
+    groups = {}
+    for symbol, (model, scaler, historical_data, last_sequence) in components_by_symbol.items():
+        if last_sequence.ndim != 2 or last_sequence.shape[1] != INPUT_SIZE:
+            print(f"Invalid input sequence shape for {symbol}: {last_sequence.shape}")
+            continue
+        key = architecture_key(model, last_sequence)
+        groups.setdefault(key, []).append(symbol)
+
+    forecasts = {}
+    for symbols in groups.values():
+        try:
+            models = [components_by_symbol[s][0] for s in symbols]
+            # A lone model runs faster through its own fused nn.LSTM kernel
+            network = models[0] if len(models) == 1 else StackedStockLSTM(models)
+            sequences = torch.as_tensor(
+                np.stack([components_by_symbol[s][3] for s in symbols]).astype(np.float32),
+                device=next(models[0].parameters()).device
+            )
+            scalers = [components_by_symbol[s][1] for s in symbols]
+            scaled = rollout(network, sequences, horizon)
+            if stateful and verify:
+                scaled = verify_stateful(network, models, scalers, sequences, scaled, horizon)
+            for row, symbol in enumerate(symbols):
+                forecasts[symbol] = inverse_transform_close(scalers[row], scaled[row])
+        except Exception as e:
+            print(f"Batched forecast failed for {', '.join(symbols)}: {str(e)}")
+    return forecasts
+
+# =========================
+# 3. Rollout Parity Check
+# =========================
+
+def check_rollout_parity(components_by_symbol, horizon=FORECAST_HORIZON):
+    """
+    Compares stateful forecasts against the windowed rollout, as forecast_many
+    does for each model the first time it forecasts with it.
+
+    Carrying (h, c) lets the oldest rows of the window keep a small influence
+    that the windowed rollout drops, so the two agree within a tolerance
+    rather than exactly.
+
+    Parameters:
+    - components_by_symbol (dict): Symbol -> (model, scaler, historical_data, last_sequence).
+    - horizon (int): Number of days to forecast.
+
+    Returns:
+    - dict: Symbol -> max relative deviation; stateful forecasts are used for
+      the symbols whose deviation is <= FORECAST_PARITY_RTOL.
+    """
+    windowed = forecast_many(components_by_symbol, horizon, stateful=False)
+    stateful = forecast_many(components_by_symbol, horizon, stateful=True, verify=False)
+    deviations = {}
+    for symbol, expected in windowed.items():
+        actual = stateful.get(symbol)
+        if actual is None:
+            deviations[symbol] = float('inf')
+            continue
+        deviations[symbol] = float(np.max(np.abs(actual - expected) / np.maximum(np.abs(expected), 1e-8)))
+    return deviations
+
+
+if __name__ == "__main__":
+    import sys
+    from stock_model import SUPPORTED_SYMBOLS
+    from model_registry import model_registry
+
+    available = {}
+    for symbol in SUPPORTED_SYMBOLS:
+        result = model_registry.get(symbol)
+        if not any(x is None for x in result):
+            available[symbol] = result
+
+    deviations = check_rollout_parity(available)
+    for symbol, deviation in deviations.items():
+        print(f"{symbol}: max relative deviation {deviation:.6f}")
+    sys.exit(0 if deviations and all(d <= FORECAST_PARITY_RTOL for d in deviations.values()) else 1)
@@ -0,0 +1,242 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from price_history import DATE_COLUMN, price_store
+
+# Resolutions served by /api/history/<symbol>
+RESOLUTIONS = ['raw', 'weekly', 'monthly', 'lttb']
+# Default and maximum number of points for LTTB downsampling
+DEFAULT_LTTB_POINTS = 500
+MAX_LTTB_POINTS = 5000
+
+# Relative windows accepted as ?range=, in days back from the last trading day
+RANGES = {
+    '1m': 31,
+    '3m': 92,
+    '6m': 183,
+    '1y': 366,
+    '5y': 5 * 366,
+}
+
+# Number of (symbol, window, resolution) responses kept serialized in memory
+HISTORY_CACHE_ENTRIES = int(os.getenv('HISTORY_CACHE_ENTRIES', '256'))
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# =========================
+# 1. Aggregation and Downsampling
+# =========================
+
+def period_starts(dates, resolution):
+    """
+    Returns the row positions where a new week or month starts in a sorted
+    datetime64[D] array. Weeks run Sunday to Saturday, matching NEPSE's
+    Sunday-Thursday trading week.
+    """
+    if resolution == 'weekly':
+        # 1970-01-01 was a Thursday, so shifting by 4 days puts Sundays on multiples of 7
+        buckets = (dates.astype(np.int64) + 4) // 7
+    else:
+        buckets = dates.astype('datetime64[M]').astype(np.int64)
+    if len(buckets) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+
+
+def aggregate_ohlc(history, resolution):
+    """
+    Aggregates daily rows into weekly or monthly bars: first Open, highest High,
+    lowest Low, last Close and summed Volume. Each bar is dated by its first
+    trading day. Columns missing from the history are left out.
+    """
+    dates = history[DATE_COLUMN]
+    starts = period_starts(dates, resolution)
+    ends = np.append(starts[1:], len(dates)) - 1
+
+    bars = {DATE_COLUMN: dates[starts]}
+    if len(starts) == 0:
+        bars.update({column: history[column][:0] for column in history if column != DATE_COLUMN})
+        return bars
+    reducers = {
+        'Open': lambda values: values[starts],
+        'High': lambda values: np.maximum.reduceat(values, starts),
+        'Low': lambda values: np.minimum.reduceat(values, starts),
+        'Close': lambda values: values[ends],
+        'Volume': lambda values: np.add.reduceat(values, starts),
+    }
+    for column, values in history.items():
+        if column in reducers:
+            bars[column] = reducers[column](values)
+    return bars
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the point
+    kept from the previous bucket and the mean of the next bucket. This
+    preserves the visual peaks and troughs of a line chart.
+
+    Parameters:
+    - x (array): Increasing x values, e.g. days.
+    - y (array): Values to preserve the shape of.
+    - threshold (int): Number of points to keep.
+
+    Returns:
+    - ndarray: Sorted positions of the kept points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Mean of the next bucket, or the last point for the final bucket
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(history, points):
+    """
+    Picks at most `points` daily rows with LTTB on the Close column.
+    """
+    dates = history[DATE_COLUMN]
+    kept = lttb(dates.astype(np.int64), history['Close'], points)
+    return {column: values[kept] for column, values in history.items()}
+
+# =========================
+# 2. Serialized Series Cache
+# =========================
+
+def _round_list(values, column):
+    if column == 'Volume':
+        return [int(v) for v in np.nan_to_num(values)]
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+def encode_series(symbol, resolution, history):
+    """
+    Serializes a series as columnar JSON: one array per column, so field names
+    are not repeated for every row.
+    """
+    columns = [c for c in OHLCV if c in history]
+    payload = {
+        'symbol': symbol,
+        'resolution': resolution,
+        'count': int(len(history[DATE_COLUMN])),
+        'columns': ['date'] + [c.lower() for c in columns],
+        'date': [str(d) for d in history[DATE_COLUMN]],
+    }
+    for column in columns:
+        payload[column.lower()] = _round_list(history[column], column)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def _resolve_window(history, start, end, window):
+    """
+    Turns ?range= into a start date relative to the last trading day.
+    """
+    if window and window != 'max':
+        if window not in RANGES:
+            raise ValueError(f"Unknown range {window}; use one of {', '.join(list(RANGES) + ['max'])}")
+        if len(history):
+            start = str(history.dates[-1] - np.timedelta64(RANGES[window], 'D'))
+    try:
+        start = None if start is None else str(np.datetime64(start, 'D'))
+        end = None if end is None else str(np.datetime64(end, 'D'))
+    except ValueError:
+        raise ValueError("Dates must be formatted as YYYY-MM-DD")
+    return start, end
+
+
+class HistorySeriesCache:
+    """
+    LRU of serialized /api/history responses keyed by (symbol, data version,
+    start, end, resolution, points). Entries have the same shape as forecast
+    store entries: 'body', 'etag' and 'last_modified'.
+    """
+
+    def __init__(self, store=price_store, max_entries=HISTORY_CACHE_ENTRIES):
+        self.store = store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol, start=None, end=None, window=None, resolution='raw', points=DEFAULT_LTTB_POINTS):
+        """
+        Returns the serialized series, or None if the symbol has no price history.
+
+        Raises:
+        - ValueError: On an unknown resolution or range, a malformed date or a
+          history without Close prices.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}; use one of {', '.join(RESOLUTIONS)}")
+        points = max(3, min(int(points), MAX_LTTB_POINTS)) if resolution == 'lttb' else None
+
+        history = self.store.open(symbol)
+        if history is None:
+            return None
+        start, end = _resolve_window(history, start, end, window)
+
+        key = (history.symbol, history.meta['version'], start, end, resolution, points)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        columns = [c for c in OHLCV if c in history.columns]
+        if 'Close' not in columns:
+            raise ValueError(f"{history.symbol} has no Close prices")
+        series = history.slice(start, end, columns)
+        if resolution in ('weekly', 'monthly'):
+            series = aggregate_ohlc(series, resolution)
+        elif resolution == 'lttb':
+            series = downsample(series, points)
+
+        body = encode_series(history.symbol, resolution, series)
+        entry = {
+            'body': body,
+            'etag': hashlib.sha1(body).hexdigest()[:16],
+            'last_modified': datetime.fromtimestamp(history.meta['source_signature'][0] / 1e9, timezone.utc),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'cached_series': len(self._entries)}
+
+
+# Shared cache used by the Flask routes
+history_cache = HistorySeriesCache()
@@ -0,0 +1,325 @@
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from last_updated import (INGEST_NOTIFY_URL, INGEST_TOKEN, INGEST_TOKEN_HEADER, mark_updated,
+                          read_last_updated, updated_at)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# NEPSE trades Sunday to Thursday, 11:00 to 15:00 Nepal time (UTC+05:45)
+NEPAL_TZ = timezone(timedelta(hours=5, minutes=45))
+TRADING_DAYS = {6, 0, 1, 2, 3}  # datetime.weekday(): Sunday is 6
+TRADING_OPEN = os.getenv('NEPSE_TRADING_OPEN', '11:00')
+TRADING_CLOSE = os.getenv('NEPSE_TRADING_CLOSE', '15:00')
+
+# Cadence of each source
+MARKET_SUMMARY_SECONDS = int(os.getenv('INGEST_MARKET_SUMMARY_SECONDS', '60'))
+# Outside trading hours the summary only changes once, after the close
+MARKET_SUMMARY_IDLE_SECONDS = int(os.getenv('INGEST_MARKET_SUMMARY_IDLE_SECONDS', '3600'))
+# Nepal time the company list is refreshed at each day, after the close
+COMPANY_LIST_DAILY_AT = os.getenv('INGEST_COMPANY_LIST_AT', '15:30')
+MEROLAGANI_NEWS_SECONDS = int(os.getenv('INGEST_MEROLAGANI_NEWS_SECONDS', '900'))
+COMPANY_NEWS_SECONDS = int(os.getenv('INGEST_COMPANY_NEWS_SECONDS', '1800'))
+ANNOUNCEMENTS_SECONDS = int(os.getenv('INGEST_ANNOUNCEMENTS_SECONDS', '3600'))
+# A failed run is retried after this long, or at its normal cadence if that is sooner
+RETRY_SECONDS = int(os.getenv('INGEST_RETRY_SECONDS', '300'))
+
+# Sources running at the same time, per kind of resource they use at worst. Each
+# kind has its own threads, so a long crawl never delays the other kinds. The
+# market summary has a lane of its own, and borrows from the browser sessions
+# browser_pool reserves for it (BROWSER_RESERVED_SESSIONS), so its one-minute
+# cadence holds while crawls fill the rest of the pool.
+RESOURCE_LIMITS = {
+    'market': 1,
+    'browser': int(os.getenv('INGEST_BROWSER_JOBS', '1')),
+    'http': int(os.getenv('INGEST_HTTP_JOBS', '2')),
+}
+# How often the scheduler checks which sources are due
+TICK_SECONDS = float(os.getenv('INGEST_TICK_SECONDS', '5'))
+
+# Returned by a source's run when it succeeded but found nothing new
+UNCHANGED = 'unchanged'
+
+
+def nepal_now():
+    return datetime.now(NEPAL_TZ)
+
+
+def _at(day, hh_mm):
+    hour, minute = (int(part) for part in hh_mm.split(':'))
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def is_trading_time(now=None):
+    """
+    True during NEPSE trading hours.
+    """
+    now = now or nepal_now()
+    return now.weekday() in TRADING_DAYS and _at(now, TRADING_OPEN) <= now < _at(now, TRADING_CLOSE)
+
+# =========================
+# 1. Sources
+# =========================
+
+def _symbols():
+    symbols = os.getenv('INGEST_SYMBOLS')
+    if symbols:
+        return [symbol.strip().upper() for symbol in symbols.split(',') if symbol.strip()]
+    from stock_model import SUPPORTED_SYMBOLS
+    return list(SUPPORTED_SYMBOLS)
+
+
+def run_company_list():
+    import nepse_scrape
+    return nepse_scrape.save_data()
+
+
+def run_market_summary():
+    import summary
+    return summary.scrape_summary() is not None
+
+
+def run_merolagani_news():
+    import server
+    news_data, changed = server.fetch_news()
+    if not news_data['all']:
+        return False
+    return True if changed else UNCHANGED
+
+
+def _run_company_tab(tab):
+    from company_crawler import crawl
+    results = crawl(_symbols(), [tab])
+    return any(saved.get(tab) is not None for saved in results.values())
+
+
+class Source:
+    """
+    One scheduled data source.
+
+    Parameters:
+    - name (str): Name used in last_updated.txt and in refresh notifications.
+    - run (callable): Scrapes the source; returns True on new data, UNCHANGED
+      if nothing changed and False on failure.
+    - resource (str): Key of RESOURCE_LIMITS the run counts against.
+    - interval (int, optional): Seconds between runs.
+    - idle_interval (int, optional): Seconds between runs outside trading hours.
+    - daily_at (str, optional): Nepal time ("HH:MM") to run once a day at, instead of an interval.
+    """
+
+    def __init__(self, name, run, resource, interval=None, idle_interval=None, daily_at=None):
+        self.name = name
+        self.run = run
+        self.resource = resource
+        self.interval = interval
+        self.idle_interval = idle_interval or interval
+        self.daily_at = daily_at
+
+    def is_due(self, last_run, now):
+        """
+        True if the source should run at `now` (Nepal time), given when it last ran.
+        """
+        if last_run is None:
+            return True
+        if self.daily_at:
+            scheduled = _at(now, self.daily_at)
+            if now < scheduled:
+                scheduled -= timedelta(days=1)
+            return last_run < scheduled
+        interval = self.interval if is_trading_time(now) else self.idle_interval
+        return (now - last_run).total_seconds() >= interval
+
+
+SOURCES = [
+    Source('market_summary', run_market_summary, 'market',
+           interval=MARKET_SUMMARY_SECONDS, idle_interval=MARKET_SUMMARY_IDLE_SECONDS),
+    # These try plain HTTP first but fall back to Chrome sessions
+    Source('company_list', run_company_list, 'browser', daily_at=COMPANY_LIST_DAILY_AT),
+    Source('company_news', lambda: _run_company_tab('news'), 'browser', interval=COMPANY_NEWS_SECONDS),
+    Source('announcements', lambda: _run_company_tab('announcements'), 'browser', interval=ANNOUNCEMENTS_SECONDS),
+    Source('merolagani_news', run_merolagani_news, 'http', interval=MEROLAGANI_NEWS_SECONDS),
+]
+
+# =========================
+# 2. Notifying the Flask app
+# =========================
+
+def notify_app(source, timestamp, url=INGEST_NOTIFY_URL):
+    """
+    Tells the Flask app a source has new data so it can refresh its caches.
+    Returns False if the app could not be reached; it then picks the data up
+    the next time it checks the files.
+    """
+    if not url:
+        return False
+    headers = {INGEST_TOKEN_HEADER: INGEST_TOKEN} if INGEST_TOKEN else {}
+    try:
+        response = requests.post(url, json={'source': source, 'updated_at': timestamp},
+                                 headers=headers, timeout=5)
+        response.raise_for_status()
+        return True
+    except requests.RequestException as e:
+        print(f"Could not notify the app about {source}: {str(e)}")
+        return False
+
+# =========================
+# 3. Scheduler
+# =========================
+
+class IngestScheduler:
+    """
+    Runs each source at its own cadence in bounded thread pools.
+
+    A source never runs twice at once: if it is still running when it comes
+    due again, that run is skipped. Each resource kind has its own pool sized
+    by its limit, so e.g. only one browser-based crawl runs at a time and
+    queued crawls never hold up sources of another kind. After a
+    successful run that found new data the source's time in last_updated.txt
+    is updated and the Flask app is notified.
+    """
+
+    def __init__(self, sources=SOURCES, resource_limits=RESOURCE_LIMITS, notify=notify_app):
+        self.sources = {source.name: source for source in sources}
+        self._notify = notify
+        self._executors = {
+            name: ThreadPoolExecutor(max_workers=max(1, limit), thread_name_prefix=f'ingest-{name}')
+            for name, limit in resource_limits.items()
+        }
+        self._lock = threading.Lock()
+        self._running = set()
+        self._stop = threading.Event()
+
+        # Carry on from the last successful runs instead of re-scraping everything on start
+        self.last_run = {}
+        for name in self.sources:
+            when = updated_at(name)  # Local time of this machine
+            self.last_run[name] = when.astimezone(NEPAL_TZ) if when else None
+        self.retry_at = {}
+        self.counts = {name: {'runs': 0, 'failures': 0, 'unchanged': 0, 'skipped': 0} for name in self.sources}
+
+    def submit(self, name):
+        """
+        Starts a run of a source unless one is already in progress.
+
+        Returns:
+        - bool: True if a run was started.
+        """
+        with self._lock:
+            if name in self._running:
+                self.counts[name]['skipped'] += 1
+                return False
+            self._running.add(name)
+            self.last_run[name] = nepal_now()
+        source = self.sources[name]
+        self._executors[source.resource].submit(self._run, source)
+        return True
+
+    def _run(self, source):
+        started = time.perf_counter()
+        result = False
+        try:
+            result = source.run()
+        except Exception as e:
+            print(f"Error ingesting {source.name}: {str(e)}")
+        finally:
+            ok = bool(result)
+            with self._lock:
+                self._running.discard(source.name)
+                self.counts[source.name]['runs'] += 1
+                if result == UNCHANGED:
+                    self.counts[source.name]['unchanged'] += 1
+                if ok:
+                    self.retry_at.pop(source.name, None)
+                else:
+                    self.counts[source.name]['failures'] += 1
+                    self.retry_at[source.name] = nepal_now() + timedelta(seconds=RETRY_SECONDS)
+
+        outcome = UNCHANGED if result == UNCHANGED else ('updated' if ok else 'failed')
+        print(f"[ingest] {source.name} {outcome} in {time.perf_counter() - started:.1f}s")
+        if ok and result != UNCHANGED:
+            timestamp = mark_updated(source.name)
+            if self._notify is not None:
+                self._notify(source.name, timestamp)
+
+    def due(self, now=None):
+        """
+        Returns the names of the sources that should start now.
+        """
+        now = now or nepal_now()
+        names = []
+        with self._lock:
+            for name, source in self.sources.items():
+                if name in self._running:
+                    continue
+                retry_at = self.retry_at.get(name)
+                if source.is_due(self.last_run[name], now) or (retry_at is not None and now >= retry_at):
+                    names.append(name)
+        return names
+
+    def run_forever(self, tick=TICK_SECONDS):
+        print(f"Ingestion scheduler started with sources: {', '.join(self.sources)}")
+        while not self._stop.is_set():
+            for name in self.due():
+                self.submit(name)
+            self._stop.wait(tick)
+        self._shutdown()
+
+    def run_once(self, names):
+        """
+        Runs the given sources now, concurrently within the resource limits, and waits for them.
+        """
+        for name in names:
+            self.submit(name)
+        self._shutdown()
+
+    def _shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: dict(counts, running=name in self._running,
+                           last_run=self.last_run[name].isoformat() if self.last_run[name] else None)
+                for name, counts in self.counts.items()
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape every data source on its own schedule")
+    parser.add_argument('--once', nargs='*', metavar='SOURCE',
+                        help="Run these sources (default: all) once and exit instead of scheduling")
+    parser.add_argument('--status', action='store_true', help="Print when each source last updated")
+    args = parser.parse_args()
+
+    # The scrapers write their JSON files relative to the backend directory
+    os.chdir(BASE_DIR)
+
+    if args.status:
+        updated = read_last_updated()
+        for source in SOURCES:
+            print(f"{source.name:<16} {updated.get(source.name, 'never')}")
+        sys.exit(0)
+
+    scheduler = IngestScheduler()
+    if args.once is not None:
+        names = args.once or list(scheduler.sources)
+        unknown = [name for name in names if name not in scheduler.sources]
+        if unknown:
+            parser.error(f"Unknown sources: {', '.join(unknown)}")
+        scheduler.run_once(names)
+    else:
+        signal.signal(signal.SIGINT, scheduler.stop)
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        scheduler.run_forever()
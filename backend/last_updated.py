@@ -0,0 +1,75 @@
+import os
+import threading
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# When each ingestion source last brought in new data, one "<source> <timestamp>" per line
+LAST_UPDATED_PATH = os.path.join(BASE_DIR, 'data', 'last_updated.txt')
+
+# The source whose updates mean new market data; forecasts are recomputed when it changes.
+# A file in the old single-timestamp format is read as this source's time.
+MARKET_DATA_SOURCE = 'company_list'
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Where ingest.py reports new data, and the shared secret it sends with the report
+INGEST_NOTIFY_URL = os.getenv('INGEST_NOTIFY_URL', 'http://127.0.0.1:5000/api/internal/refresh')
+INGEST_TOKEN = os.getenv('INGEST_TOKEN', '')
+INGEST_TOKEN_HEADER = 'X-Ingest-Token'
+
+_write_lock = threading.Lock()
+
+
+def read_last_updated(path=LAST_UPDATED_PATH):
+    """
+    Returns a dict of source -> timestamp string, empty if the file is missing.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+    except OSError:
+        return {}
+
+    if len(lines) == 1 and ' ' in lines[0] and lines[0][:4].isdigit():
+        return {MARKET_DATA_SOURCE: lines[0]}
+    updated = {}
+    for line in lines:
+        source, _, timestamp = line.partition(' ')
+        if timestamp:
+            updated[source] = timestamp.strip()
+    return updated
+
+
+def mark_updated(source, when=None, path=LAST_UPDATED_PATH):
+    """
+    Records that a source has new data, keeping the times of the other sources.
+
+    Returns:
+    - str: The timestamp written.
+    """
+    timestamp = (when or datetime.now()).strftime(TIMESTAMP_FORMAT)
+    with _write_lock:
+        updated = read_last_updated(path)
+        updated[source] = timestamp
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for name in sorted(updated):
+                f.write(f"{name} {updated[name]}\n")
+        os.replace(tmp_path, path)
+    return timestamp
+
+
+def updated_at(source, path=LAST_UPDATED_PATH):
+    """
+    Returns when a source last updated as a datetime, or None if it never has.
+    """
+    timestamp = read_last_updated(path).get(source)
+    if not timestamp:
+        return None
+    try:
+        return datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
@@ -0,0 +1,161 @@
+import os
+import threading
+from collections import OrderedDict
+
+from stock_model import load_model_and_scaler, model_file_paths
+
+# Upper bound on the memory held by cached model components
+MODEL_CACHE_MAX_MB = int(os.getenv('MODEL_CACHE_MAX_MB', '512'))
+
+MISSING = (None, None, None, None)
+
+
+def file_signature(paths):
+    """
+    Returns a (path, mtime, size) tuple for each path, or None if any file is missing.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def estimate_nbytes(components):
+    """
+    Roughly estimates the memory held by a (model, scaler, historical_data, last_sequence) tuple.
+    """
+    model, scaler, historical_data, last_sequence = components
+    total = 0
+    if model is not None:
+        total += sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+    if historical_data is not None:
+        total += int(historical_data.memory_usage(index=True, deep=True).sum())
+    if last_sequence is not None:
+        total += last_sequence.nbytes
+    if scaler is not None:
+        total += sum(getattr(v, 'nbytes', 0) for v in vars(scaler).values())
+    return total
+
+
+class _Entry:
+    __slots__ = ('components', 'signature', 'nbytes')
+
+    def __init__(self, components, signature, nbytes):
+        self.components = components
+        self.signature = signature
+        self.nbytes = nbytes
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded model components keyed by symbol.
+
+    Entries are reloaded lazily when any backing file changes (mtime or size),
+    and the least recently used symbols are evicted once the estimated memory
+    exceeds max_bytes.
+    """
+
+    def __init__(self, loader=load_model_and_scaler, paths=model_file_paths,
+                 max_bytes=MODEL_CACHE_MAX_MB * 1024 * 1024):
+        self._loader = loader
+        self._paths = paths
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(self, symbol):
+        """
+        Returns (model, scaler, historical_data, last_sequence) for the symbol,
+        loading it from disk only when it is not cached or its files have changed.
+        """
+        signature = file_signature(self._paths(symbol).values())
+        if signature is None:
+            # Let the loader report which file is missing
+            self.invalidate(symbol)
+            return self._loader(symbol)
+
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(symbol)
+                self.hits += 1
+                return entry.components
+            load_lock = self._load_locks.setdefault(symbol, threading.Lock())
+
+        # Only one thread loads a given symbol; the others wait and reuse its result
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(symbol)
+                if entry is not None and entry.signature == signature:
+                    self._entries.move_to_end(symbol)
+                    self.hits += 1
+                    return entry.components
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.reloads += 1
+
+            components = self._loader(symbol)
+            if any(x is None for x in components):
+                self.invalidate(symbol)
+                return components
+
+            self._store(symbol, _Entry(components, signature, estimate_nbytes(components)))
+            return components
+
+    def _store(self, symbol, entry):
+        with self._lock:
+            previous = self._entries.pop(symbol, None)
+            if previous is not None:
+                self._nbytes -= previous.nbytes
+            self._entries[symbol] = entry
+            self._nbytes += entry.nbytes
+
+            # Evict least recently used symbols, always keeping the newest entry
+            while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, symbol=None):
+        """
+        Drops one symbol, or every symbol when none is given, from the cache.
+        """
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+                self._nbytes = 0
+                return
+            entry = self._entries.pop(symbol, None)
+            if entry is not None:
+                self._nbytes -= entry.nbytes
+
+    def stats(self):
+        """
+        Returns the cache counters and the symbols currently held in memory.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'cached_symbols': list(self._entries.keys()),
+                'cached_bytes': self._nbytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# Shared registry used by the Flask routes
+model_registry = ModelRegistry()
@@ -1,20 +1,44 @@
 import socket
 import json
 import os
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select
 from selenium.common.exceptions import (
     TimeoutException,
-    NoSuchElementException,
     ElementClickInterceptedException,
     ElementNotInteractableException,
 )
-from webdriver_manager.chrome import ChromeDriverManager
+
+from table_extract import extract_table
+from scrape_waits import LatencyBudget, table_state, wait_for_element, wait_for_table_change
+from browser_pool import browser_pool, create_driver
+from sharesansar_http import BASE_URL as SHARESANSAR_BASE_URL, HttpFetchError, company_list_rows, company_list_sectors, fetch_html
+
+COMPANY_LIST_URL = f"{SHARESANSAR_BASE_URL}/company-list"
+
+# Sectors crawled in parallel (over HTTP or in pooled browser sessions); 1 keeps the sequential crawl
+SCRAPE_WORKERS = int(os.getenv('NEPSE_SCRAPE_WORKERS', '4'))
+
+# Sector options in crawl order: the default selection first, then the rest of the dropdown
+SECTOR_OPTIONS_SCRIPT = """
+const select = document.querySelector("select[name='sector']");
+if (!select) {
+    return [];
+}
+const selected = select.options[select.selectedIndex];
+const sectors = [];
+if (selected && selected.value) {
+    sectors.push({id: selected.value, name: selected.text.trim()});
+}
+Array.from(select.options).slice(1).forEach(option => {
+    if (option.value && (!selected || option.value !== selected.value)) {
+        sectors.push({id: option.value, name: option.text.trim()});
+    }
+});
+return sectors;
+"""
 
 def check_internet_connection():
     """
@@ -30,29 +54,60 @@ def check_internet_connection():
     except OSError:
         return False
 
-def setup_driver():
+def setup_driver(headless=True):
     """
-    Sets up the Selenium WebDriver with the necessary configurations.
+    Starts a standalone Chrome session, outside the shared browser pool.
+    
+    Args:
+        headless (bool): Run Chrome without a window.
     
     Returns:
         webdriver.Chrome: Configured Chrome WebDriver instance.
     """
-    options = Options()
-    # Uncomment the next line to run Chrome in headless mode (no GUI)
-    # options.add_argument('--headless')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--window-size=1920,1080')  # Ensures all elements are visible
-    options.add_argument('--start-maximized')  # Starts the browser maximized
-
-    # Initialize WebDriver using webdriver_manager for automatic driver management
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    driver.set_page_load_timeout(30)
-    driver.set_script_timeout(30)
-
-    return driver
+    return create_driver(headless=headless)
+
+def extract_sector_companies(driver, sector_name):
+    """
+    Reads the companies shown in the company list table in one WebDriver call.
+
+    Args:
+        driver (webdriver.Chrome): The Selenium WebDriver instance.
+        sector_name (str): Sector the listed companies belong to.
+
+    Returns:
+        list: Company dictionaries for the rows of the table.
+    """
+    page = extract_table(driver, ".table-responsive")
+    if not page['found']:
+        print(f"Error: Table not found for sector {sector_name}")
+    return companies_from_rows(page['rows'], sector_name)
+
+def companies_from_rows(rows, sector_name):
+    """
+    Maps company list rows (cell dictionaries, from the browser or from HTTP) to companies.
+
+    Args:
+        rows (list): Rows of the company list table.
+        sector_name (str): Sector the listed companies belong to.
+
+    Returns:
+        list: Company dictionaries.
+    """
+    sector_companies = []
+    for cols in rows:
+        if len(cols) >= 10:  # Ensure the row has the required columns
+            sector_companies.append({
+                'symbol': cols[1]['text'],
+                'name': cols[2]['text'],
+                'sector': sector_name,
+                'listed_shares': cols[3]['text'],
+                'paid_up': cols[4]['text'],
+                'total_paid_up_capital': cols[5]['text'],
+                'market_capitalization': cols[6]['text'],
+                'market_price': cols[8]['text'],
+                'as_of': cols[9]['text']
+            })
+    return sector_companies
 
 def scrape_sectors_and_companies(driver, url):
     """
@@ -66,13 +121,13 @@ def scrape_sectors_and_companies(driver, url):
     Returns:
         tuple: A tuple containing a list of sectors and a list of companies.
     """
+    budget = LatencyBudget("company list")
     try:
         print("Navigating to URL...")
         driver.get(url)
-        wait = WebDriverWait(driver, 20)
 
         # Locate the sector dropdown by its name attribute
-        sector_dropdown = wait.until(EC.presence_of_element_located((By.NAME, "sector")))
+        sector_dropdown = wait_for_element(driver, (By.NAME, "sector"), budget)
         select = Select(sector_dropdown)
 
         # Retrieve the default selected sector (e.g., "Commercial Bank")
@@ -88,6 +143,7 @@ def scrape_sectors_and_companies(driver, url):
             print(f"\nProcessing default sector: {default_sector_name}")
 
             # Click the search button to load companies for the default sector
+            before = table_state(driver, ".table-responsive")
             try:
                 search_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'Search')]")
                 if search_buttons:
@@ -101,51 +157,22 @@ def scrape_sectors_and_companies(driver, url):
                 # Continue to the next sector if unable to click search
                 pass
 
-            # Wait for the table to load by checking the presence of the table container
+            # Wait until the table has been redrawn with the sector's companies
             try:
-                wait.until(EC.presence_of_element_located((By.CLASS_NAME, "table-responsive")))
-                time.sleep(2)  # Additional wait to ensure AJAX content is fully loaded
+                wait_for_table_change(driver, ".table-responsive", before, budget)
             except TimeoutException:
                 print(f"Timeout waiting for table to load for sector {default_sector_name}")
                 # Optionally, you can choose to skip processing this sector
                 pass
 
-            # Locate the updated table
-            try:
-                table = driver.find_element(By.CLASS_NAME, "table-responsive")
-                rows = table.find_elements(By.CSS_SELECTOR, "tbody tr")
-            except NoSuchElementException:
-                print(f"Error: Table not found for sector {default_sector_name}")
-                rows = []
-
-            # Extract company data from each row
-            sector_companies = []
-            for row in rows:
-                try:
-                    cols = row.find_elements(By.TAG_NAME, "td")
-                    if len(cols) >= 8:  # Ensure the row has the required columns
-                        company = {
-                            'symbol': cols[1].text.strip(),
-                            'name': cols[2].text.strip(),
-                            'sector': default_sector_name,
-                            'listed_shares': cols[3].text.strip(),
-                            'paid_up': cols[4].text.strip(),
-                            'total_paid_up_capital': cols[5].text.strip(),
-                            'market_capitalization': cols[6].text.strip(),
-                            'market_price': cols[8].text.strip(),
-                            'as_of': cols[9].text.strip()
-                        }
-                        sector_companies.append(company)
-                except Exception as row_error:
-                    print(f"Error processing row in {default_sector_name}: {row_error}")
+            # Extract company data from all rows at once
+            with budget.extracting():
+                sector_companies = extract_sector_companies(driver, default_sector_name)
 
             print(f"Found {len(sector_companies)} companies in {default_sector_name}")
             sectors.append({'id': default_sector_id, 'name': default_sector_name})
             all_companies.extend(sector_companies)
 
-            # Pause briefly before processing the next sector
-            time.sleep(1)
-
         # Now, iterate over the remaining sector options
         sector_options = select.options[1:]  # Skip the first option if it's a placeholder
 
@@ -161,10 +188,8 @@ def scrape_sectors_and_companies(driver, url):
             # Select the sector from the dropdown
             select.select_by_value(sector_id)
 
-            # Wait briefly to ensure the selection is registered
-            time.sleep(1)
-
             # Click the search button to load companies for the selected sector
+            before = table_state(driver, ".table-responsive")
             try:
                 search_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'Search')]")
                 if search_buttons:
@@ -177,63 +202,200 @@ def scrape_sectors_and_companies(driver, url):
                 print(f"Error clicking search button for {sector_name}: {e}")
                 continue  # Skip to the next sector if unable to click search
 
-            # Wait for the table to load by checking the presence of the table container
+            # Wait until the table has been redrawn with the sector's companies
             try:
-                wait.until(EC.presence_of_element_located((By.CLASS_NAME, "table-responsive")))
-                time.sleep(2)  # Additional wait to ensure AJAX content is fully loaded
+                wait_for_table_change(driver, ".table-responsive", before, budget)
             except TimeoutException:
                 print(f"Timeout waiting for table to load for sector {sector_name}")
                 continue  # Skip to the next sector if table doesn't load
 
-            # Locate the updated table
-            try:
-                table = driver.find_element(By.CLASS_NAME, "table-responsive")
-                rows = table.find_elements(By.CSS_SELECTOR, "tbody tr")
-            except NoSuchElementException:
-                print(f"Error: Table not found for sector {sector_name}")
-                rows = []
-
-            # Extract company data from each row
-            sector_companies = []
-            for row in rows:
-                try:
-                    cols = row.find_elements(By.TAG_NAME, "td")
-                    if len(cols) >= 8:  # Ensure the row has the required columns
-                        company = {
-                            'symbol': cols[1].text.strip(),
-                            'name': cols[2].text.strip(),
-                            'sector': sector_name,
-                            'listed_shares': cols[3].text.strip(),
-                            'paid_up': cols[4].text.strip(),
-                            'total_paid_up_capital': cols[5].text.strip(),
-                            'market_capitalization': cols[6].text.strip(),
-                            'market_price': cols[8].text.strip(),
-                            'as_of': cols[9].text.strip()
-                            
-                            
-                        }
-                        sector_companies.append(company)
-                except Exception as row_error:
-                    print(f"Error processing row in {sector_name}: {row_error}")
+            # Extract company data from all rows at once
+            with budget.extracting():
+                sector_companies = extract_sector_companies(driver, sector_name)
 
             print(f"Found {len(sector_companies)} companies in {sector_name}")
             sectors.append({'id': sector_id, 'name': sector_name})
             all_companies.extend(sector_companies)
 
-            # Pause briefly before processing the next sector
-            time.sleep(1)
-
         print(f"\nTotal sectors processed: {len(sectors)}")
         print(f"Total companies scraped: {len(all_companies)}")
+        budget.report()
         return sectors, all_companies
     
     except:
         return
 
-def save_data():
+def list_sectors(driver, url):
+    """
+    Loads the company list page and returns its sectors in crawl order.
+    
+    Args:
+        driver (webdriver.Chrome): The Selenium WebDriver instance.
+        url (str): The URL of the ShareSansar company list page.
+    
+    Returns:
+        list: Sector dictionaries with 'id' and 'name'.
+    """
+    driver.get(url)
+    wait_for_element(driver, (By.NAME, "sector"), LatencyBudget("sector list"))
+    return driver.execute_script(SECTOR_OPTIONS_SCRIPT)
+
+def scrape_sector(driver, url, sector, budget=None):
+    """
+    Loads the companies of one sector in a browser session that is already on,
+    or will be navigated to, the company list page.
+    
+    Args:
+        driver (webdriver.Chrome): The Selenium WebDriver instance.
+        url (str): The URL of the ShareSansar company list page.
+        sector (dict): Sector with 'id' and 'name'.
+        budget (LatencyBudget, optional): Budget the waits draw from.
+    
+    Returns:
+        list: Company dictionaries for the sector.
+    """
+    budget = budget or LatencyBudget(sector['name'])
+    if driver.current_url != url:
+        driver.get(url)
+
+    select = Select(wait_for_element(driver, (By.NAME, "sector"), budget))
+    select.select_by_value(sector['id'])
+
+    search_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'Search')]")
+    if not search_buttons:
+        print(f"Warning: Could not find search button for sector {sector['name']}")
+        return []
+    before = table_state(driver, ".table-responsive")
+    search_buttons[0].click()
+
+    try:
+        wait_for_table_change(driver, ".table-responsive", before, budget)
+    except TimeoutException:
+        # The sector may render exactly like the previous one; read what is there
+        print(f"Timeout waiting for table to load for sector {sector['name']}")
+    with budget.extracting():
+        return extract_sector_companies(driver, sector['name'])
+
+def scrape_sectors_parallel(url, workers=SCRAPE_WORKERS):
+    """
+    Scrapes every sector using sessions from the shared browser pool.
+    
+    Sectors are handed to whichever session is free, so the crawl takes about
+    as long as the slowest sector rather than the sum of all of them. Results
+    are merged in dropdown order, which is the order the sequential crawl
+    writes to companies.json.
+    
+    Args:
+        url (str): The URL of the ShareSansar company list page.
+        workers (int): Sectors crawled at once, further capped by the pool size.
+    
+    Returns:
+        tuple: The list of sectors, the list of companies and the per-sector
+        timings as a list of dictionaries with 'sector', 'companies' and 'seconds'.
+    """
+    def crawl(sector):
+        budget = LatencyBudget(sector['name'])
+        try:
+            with browser_pool.session() as driver:
+                companies = scrape_sector(driver, url, sector, budget)
+        except Exception as e:
+            print(f"Error scraping sector {sector['name']}: {e}")
+            companies = None
+        finally:
+            budget.stop()
+        return companies, budget
+
+    with browser_pool.session() as driver:
+        sector_list = list_sectors(driver, url)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(crawl, sector_list))
+
+    sectors = []
+    all_companies = []
+    timings = []
+    for sector, (companies, budget) in zip(sector_list, results):
+        timings.append({
+            'sector': sector['name'],
+            'companies': len(companies or []),
+            'seconds': round(budget.elapsed(), 2),
+            'wait_seconds': round(budget.wait_seconds, 2),
+            'extract_seconds': round(budget.extract_seconds, 2),
+        })
+        if companies is None:
+            continue  # Leave failed sectors out, as the sequential crawl does
+        print(f"Found {len(companies)} companies in {sector['name']} ({budget.elapsed():.1f}s)")
+        sectors.append({'id': sector['id'], 'name': sector['name']})
+        all_companies.extend(companies)
+
+    print(f"\nTotal sectors processed: {len(sectors)}")
+    print(f"Total companies scraped: {len(all_companies)}")
+    if timings:
+        slowest = max(timings, key=lambda t: t['seconds'])
+        print(f"Slowest sector: {slowest['sector']} ({slowest['seconds']}s)")
+    return sectors, all_companies, timings
+
+def scrape_sectors_http(url, workers=SCRAPE_WORKERS):
+    """
+    Scrapes every sector with plain HTTP requests over a pooled session,
+    without starting a browser.
+    
+    Args:
+        url (str): The URL of the ShareSansar company list page.
+        workers (int): Sectors requested at the same time.
+    
+    Returns:
+        tuple: The list of sectors and the list of companies, in the same order
+        as the browser crawl.
+    
+    Raises:
+        HttpFetchError: If the page cannot be filtered by sector over HTTP.
+    """
+    sector_list = company_list_sectors(fetch_html(url))
+    if not sector_list:
+        raise HttpFetchError("No sectors on the company list page")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(lambda sector: company_list_rows(url, sector['id']), sector_list))
+
+    sectors = []
+    all_companies = []
+    for sector, rows in zip(sector_list, results):
+        companies = companies_from_rows(rows, sector['name'])
+        print(f"Found {len(companies)} companies in {sector['name']}")
+        sectors.append({'id': sector['id'], 'name': sector['name']})
+        all_companies.extend(companies)
+    if not all_companies:
+        raise HttpFetchError("No companies in the company list tables")
+
+    print(f"\nTotal sectors processed: {len(sectors)}")
+    print(f"Total companies scraped: {len(all_companies)}")
+    return sectors, all_companies
+
+def write_json(path, data):
+    """
+    Writes data to a JSON file through a temp file and a rename, so the company
+    index never re-reads a partially written file.
+    
+    Args:
+        path (str): Destination file.
+        data: JSON-serializable data.
+    """
+    # The temp name is unique per process, as a manual run may overlap the ingest job
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def save_data(workers=SCRAPE_WORKERS):
     """
     Main function to execute the scraping process and save the data to JSON files.
     
+    Args:
+        workers (int): Sectors fetched at once over HTTP, or crawled at once in
+            pooled browser sessions if HTTP fails; 1 crawls them one after
+            another in a single session.
+    
     Returns:
         bool: True if data is saved successfully, False otherwise.
     """
@@ -242,25 +404,33 @@ def save_data():
         print("No internet connection. Please check your connection and try again.")
         return False
 
-    driver = None
     try:
-        driver = setup_driver()
-        url = "https://www.sharesansar.com/company-list"
-
-        sectors, companies = scrape_sectors_and_companies(driver, url)
+        url = COMPANY_LIST_URL
+
+        # Plain HTTP first; a browser is only started if that fails
+        sectors, companies = None, None
+        try:
+            sectors, companies = scrape_sectors_http(url, workers)
+        except HttpFetchError as e:
+            print(f"HTTP scrape failed, using the browser: {str(e)}")
+
+        if not companies and workers > 1:
+            sectors, companies, timings = scrape_sectors_parallel(url, workers)
+            for timing in timings:
+                print(f"  {timing['sector']:<40} {timing['companies']:4d} companies {timing['seconds']:7.2f}s "
+                      f"(waiting {timing['wait_seconds']:.2f}s, extracting {timing['extract_seconds']:.2f}s)")
+        elif not companies:
+            with browser_pool.session() as driver:
+                sectors, companies = scrape_sectors_and_companies(driver, url) or (None, None)
 
         if sectors and companies:
             # Create 'data' directory if it doesn't exist
             if not os.path.exists('data'):
                 os.makedirs('data')
 
-            # Save sectors to JSON
-            with open('data/sectors.json', 'w', encoding='utf-8') as f:
-                json.dump(sectors, f, indent=2, ensure_ascii=False)
-
-            # Save companies to JSON
-            with open('data/companies.json', 'w', encoding='utf-8') as f:
-                json.dump(companies, f, indent=2, ensure_ascii=False)
+            # Save sectors and companies to JSON
+            write_json('data/sectors.json', sectors)
+            write_json('data/companies.json', companies)
 
             print(f"Successfully saved {len(sectors)} sectors and {len(companies)} companies.")
             return True
@@ -272,10 +442,13 @@ def save_data():
         print(f"Error in main process: {str(e)}")
         return False
 
-    finally:
-        if driver:
-            driver.quit()
-            print("WebDriver closed successfully.")
-
 if __name__ == "__main__":
-    save_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape the ShareSansar company list into data/companies.json")
+    parser.add_argument('workers', nargs='?', type=int, default=SCRAPE_WORKERS, help="Sectors to fetch at once")
+    parser.add_argument('--visible', action='store_true', help="Show the browser window if Chrome is needed")
+    args = parser.parse_args()
+
+    # Sessions are headless unless asked otherwise, here or with BROWSER_HEADLESS=0
+    if args.visible:
+        browser_pool.headless = False
+    save_data(args.workers)
\ No newline at end of file
@@ -0,0 +1,318 @@
+import os
+import csv
+import glob
+import json
+import time
+import base64
+import threading
+from bisect import bisect_left
+from datetime import date, datetime
+
+from response_cache import make_entry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# MeroLagani homepage news, written by server.py
+NEWS_LINKS_PATH = os.path.join(BASE_DIR, 'news_links.json')
+# ShareSansar company news, written by company_crawler.py as <SYMBOL>/sharesansar_news.csv
+COMPANY_NEWS_FILENAME = 'sharesansar_news.csv'
+
+# news_links.json category lists; its 'all' list repeats their items
+NEWS_LINK_CATEGORIES = ['market', 'company', 'corporate']
+# Category given to the per-symbol ShareSansar news
+COMPANY_NEWS_CATEGORY = 'company'
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+# The source files are stat'ed at most this often; ingestion notifications refresh the index right away
+NEWS_INDEX_CHECK_SECONDS = float(os.getenv('NEWS_INDEX_CHECK_SECONDS', '30'))
+
+
+def parse_date(value):
+    """
+    Parses a YYYY-MM-DD date, raising ValueError otherwise.
+    """
+    return datetime.strptime(value.strip(), '%Y-%m-%d').date()
+
+
+def encode_cursor(key):
+    """
+    Encodes a (date ordinal, url) key as an opaque, URL-safe cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        ordinal, url = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (int(ordinal), str(url))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+# =========================
+# 1. Reading the sources
+# =========================
+
+def news_link_items(path=NEWS_LINKS_PATH):
+    """
+    Yields the MeroLagani homepage items as dicts. The homepage lists no
+    dates, so items are dated by the first_seen date server.py records per
+    URL; files written before that fall back to the file's mtime.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            news_data = json.load(f)
+        seen_on = date.fromtimestamp(os.path.getmtime(path))
+    except (OSError, ValueError) as e:
+        print(f"Error loading news from {path}: {str(e)}")
+        return
+
+    categories = [name for name in NEWS_LINK_CATEGORIES if isinstance(news_data.get(name), list)]
+    categories += [name for name, items in news_data.items()
+                   if isinstance(items, list) and name != 'all' and name not in categories]
+    for category in ['all'] + categories:
+        for item in news_data.get(category) or []:
+            if item.get('url') and item.get('title'):
+                try:
+                    first_seen = parse_date(item['first_seen']) if item.get('first_seen') else seen_on
+                except (TypeError, ValueError):
+                    first_seen = seen_on
+                yield {
+                    'title': item['title'],
+                    'url': item['url'],
+                    'date': first_seen,
+                    'source': 'merolagani',
+                    'categories': [] if category == 'all' else [category],
+                    'symbols': [],
+                }
+
+
+def company_news_items(path):
+    """
+    Yields the rows of one <SYMBOL>/sharesansar_news.csv as dicts.
+    """
+    symbol = os.path.basename(os.path.dirname(path)).upper()
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    except OSError as e:
+        print(f"Error loading news from {path}: {str(e)}")
+        return
+
+    for row in rows:
+        url = row.get('URL')
+        if not url or url == 'N/A' or not row.get('Title'):
+            continue
+        try:
+            published = parse_date(row.get('Date') or '')
+        except ValueError:
+            continue
+        yield {
+            'title': row['Title'],
+            'url': url,
+            'date': published,
+            'source': 'sharesansar',
+            'categories': [COMPANY_NEWS_CATEGORY],
+            'symbols': [symbol],
+        }
+
+# =========================
+# 2. Snapshot
+# =========================
+
+class NewsSnapshot:
+    """
+    Immutable index over one version of the news sources.
+
+    Items are deduplicated by URL; an article listed under several categories
+    or symbols appears once with all of them. Each view (everything, one
+    category, one symbol) is an ascending array of (date ordinal, url) keys
+    with the matching item positions, so date ranges and cursors are found by
+    binary search and pages are read newest first by walking a view backwards.
+
+    The unpaged lists only hold the MeroLagani homepage news, in homepage
+    order, as /api/news returned before the ShareSansar news was merged in;
+    the per-symbol rows are only reachable through query().
+    """
+
+    def __init__(self, items):
+        by_url = {}
+        self.homepage_order = {}  # MeroLagani url -> position on the homepage
+        for item in items:
+            if item['source'] == 'merolagani':
+                self.homepage_order.setdefault(item['url'], len(self.homepage_order))
+            merged = by_url.get(item['url'])
+            if merged is None:
+                by_url[item['url']] = dict(item, categories=list(item['categories']),
+                                           symbols=list(item['symbols']))
+                continue
+            # Keep the earliest date an article was seen with
+            merged['date'] = min(merged['date'], item['date'])
+            for field in ('categories', 'symbols'):
+                for value in item[field]:
+                    if value not in merged[field]:
+                        merged[field].append(value)
+
+        entries = sorted(((item['date'].toordinal(), url), item) for url, item in by_url.items())
+        self.keys = [key for key, _ in entries]
+        self.items = [self._public(item) for _, item in entries]
+
+        self.views = {None: list(range(len(self.items)))}
+        for i, (_, item) in enumerate(entries):
+            for category in item['categories']:
+                self.views.setdefault(('category', category), []).append(i)
+            for symbol in item['symbols']:
+                self.views.setdefault(('symbol', symbol), []).append(i)
+        self.view_keys = {view: [self.keys[i] for i in positions] for view, positions in self.views.items()}
+
+        self.symbols = sorted(view[1] for view in self.views if view and view[0] == 'symbol')
+        self.categories = sorted(view[1] for view in self.views if view and view[0] == 'category')
+        self._lists = {}
+        self._lists_lock = threading.Lock()
+
+    @staticmethod
+    def _public(item):
+        return {
+            'title': item['title'],
+            'url': item['url'],
+            'date': item['date'].isoformat(),
+            'source': item['source'],
+            'categories': item['categories'],
+            'symbols': item['symbols'],
+        }
+
+    def _view(self, category=None, symbol=None):
+        # A symbol view is always the smallest, so it is walked and the category checked per item
+        if symbol:
+            return ('symbol', symbol.upper())
+        if category and category.lower() != 'all':
+            return ('category', category)
+        return None
+
+    def list_entry(self, category=None):
+        """
+        Returns the stored response (see response_cache.make_entry) listing the
+        MeroLagani homepage news of a category, or of all categories, in homepage order.
+        """
+        view = self._view(category)
+        if view not in self.views:
+            view = 'empty'  # Unknown categories share one empty list
+        with self._lists_lock:
+            entry = self._lists.get(view)
+            if entry is None:
+                items = sorted((self.items[i] for i in self.views.get(view, [])
+                                if self.items[i]['url'] in self.homepage_order),
+                               key=lambda item: self.homepage_order[item['url']])
+                entry = make_entry(json.dumps(items).encode('utf-8'))
+                self._lists[view] = entry
+            return entry
+
+    def query(self, category=None, symbol=None, since=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Returns one page of news, newest first.
+
+        Parameters:
+        - category (str, optional): Only items of this category; 'all' or None for every category.
+        - symbol (str, optional): Only items about this symbol.
+        - since (str, optional): Only items dated on or after this YYYY-MM-DD date.
+        - limit (int): Page size.
+        - cursor (str, optional): next_cursor of the previous page.
+
+        Returns:
+        - tuple: The items on the page and the cursor of the next page (or None).
+
+        Raises:
+        - ValueError: On a malformed date or cursor.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        view = self._view(category, symbol)
+        positions = self.views.get(view, [])
+        keys = self.view_keys.get(view, [])
+        need_category = symbol and category and category.lower() != 'all'
+
+        low = bisect_left(keys, (parse_date(since).toordinal(), '')) if since else 0
+        pos = bisect_left(keys, decode_cursor(cursor)) if cursor else len(keys)
+
+        page = []
+        last_key = None
+        while pos > low and len(page) < limit:
+            pos -= 1
+            item = self.items[positions[pos]]
+            if need_category and category not in item['categories']:
+                continue
+            page.append(item)
+            last_key = keys[pos]
+
+        next_cursor = encode_cursor(last_key) if pos > low and len(page) == limit else None
+        return page, next_cursor
+
+
+class NewsIndex:
+    """
+    Keeps a NewsSnapshot of news_links.json and every <SYMBOL>/sharesansar_news.csv.
+
+    The snapshot is rebuilt when refresh() is called (after each ingest) or
+    when a periodic check finds that the set of files or their mtimes and
+    sizes changed.
+    """
+
+    def __init__(self, root=BASE_DIR, check_seconds=NEWS_INDEX_CHECK_SECONDS):
+        self.root = root
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked = 0.0
+        self._snapshot = NewsSnapshot([])
+
+    def source_paths(self):
+        paths = [os.path.join(self.root, 'news_links.json')]
+        paths += sorted(glob.glob(os.path.join(self.root, '*', COMPANY_NEWS_FILENAME)))
+        return paths
+
+    def _file_signature(self):
+        signature = []
+        for path in self.source_paths():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                pass
+        return tuple(signature)
+
+    def current(self):
+        """
+        Returns the current snapshot, checking the files for changes at most every check_seconds.
+        """
+        now = time.monotonic()
+        if now - self._checked >= self.check_seconds:
+            with self._lock:
+                if now - self._checked >= self.check_seconds:
+                    signature = self._file_signature()
+                    if signature != self._signature:
+                        self._rebuild(signature)
+                    self._checked = now
+        return self._snapshot
+
+    def refresh(self):
+        """
+        Rebuilds the snapshot now, e.g. when the ingestion daemon reports new news.
+        """
+        with self._lock:
+            self._rebuild(self._file_signature())
+            self._checked = time.monotonic()
+        return self._snapshot
+
+    def _rebuild(self, signature):
+        items = []
+        for path, _, _ in signature:
+            if path.endswith(COMPANY_NEWS_FILENAME):
+                items.extend(company_news_items(path))
+            else:
+                items.extend(news_link_items(path))
+        self._snapshot = NewsSnapshot(items)
+        self._signature = signature
+
+
+# Shared index used by the Flask routes
+news_index = NewsIndex()
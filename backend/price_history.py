@@ -0,0 +1,309 @@
+import os
+import re
+import sys
+import json
+import shutil
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Per-symbol historical price CSVs (Date index, Close, ...)
+PRICE_HISTORY_DIR = os.getenv('PRICE_HISTORY_DIR', 'C:\\Users\\DELL\\Desktop\\Stock Prices')
+
+# Columnar copies of the price CSVs: one .npy file per column per symbol
+HISTORY_STORE_DIR = os.getenv('HISTORY_STORE_DIR', os.path.join(BASE_DIR, 'data', 'history'))
+# Index history shipped with the frontend (Date,Open,High,Low,Close,Volume; dates like 7/20/1997)
+NEPSE_CSV_PATH = os.path.join(BASE_DIR, '..', 'frontend', 'public', 'NEPSE.csv')
+INDEX_SYMBOL = 'NEPSE'
+
+# Bump when the on-disk layout changes; older conversions are rebuilt
+HISTORY_FORMAT_VERSION = 2
+
+DATE_COLUMN = 'Date'
+
+# Superseded version directories are removed once they are this old; readers may still
+# map them until then, and on Windows mapped files cannot be deleted at all
+HISTORY_VERSION_GRACE_SECONDS = float(os.getenv('HISTORY_VERSION_GRACE_SECONDS', '3600'))
+
+# Symbols become file and directory names, so only plain alphanumerics are accepted
+SYMBOL_PATTERN = re.compile(r'^[A-Za-z0-9]+$')
+
+
+def is_valid_symbol(symbol):
+    return bool(symbol) and SYMBOL_PATTERN.match(symbol) is not None
+
+
+def history_source(symbol):
+    """
+    Returns the CSV a symbol's price history is converted from.
+    Raises ValueError for symbols that are not plain alphanumerics.
+    """
+    if not is_valid_symbol(symbol):
+        raise ValueError(f"Invalid symbol {symbol!r}")
+    if symbol.upper() == INDEX_SYMBOL:
+        return NEPSE_CSV_PATH
+    return os.path.join(PRICE_HISTORY_DIR, f"{symbol}.csv")
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _to_day(value):
+    if value is None:
+        return None
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[D]')
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+# =========================
+# 1. CSV Conversion
+# =========================
+
+def convert_history(symbol, source=None, root=HISTORY_STORE_DIR):
+    """
+    Parses a symbol's price CSV once and writes it as per-column .npy files.
+
+    Rows are sorted by date with unparseable dates and duplicate dates dropped,
+    so lookups can binary-search the Date column. Text columns holding
+    comma-formatted numbers are converted to numbers. Each conversion writes a
+    new, uniquely named version directory and replaces meta.json last; existing
+    version directories are never modified, since readers may have their files
+    memory-mapped. Superseded versions are removed lazily, see remove_old_versions.
+
+    Parameters:
+    - symbol (str): Stock symbol, or NEPSE for the index.
+    - source (str, optional): CSV path; defaults to history_source(symbol).
+    - root (str): Store directory.
+
+    Returns:
+    - dict: The metadata written to meta.json.
+    """
+    if not is_valid_symbol(symbol):
+        raise ValueError(f"Invalid symbol {symbol!r}")
+    source = source or history_source(symbol)
+    signature = _source_signature(source)
+
+    # The first column holds the dates in both the per-symbol CSVs and NEPSE.csv
+    df = pd.read_csv(source, index_col=0)
+    dates = pd.to_datetime(df.index, errors='coerce')
+    df = df[~pd.isna(dates)]
+    df.index = dates[~pd.isna(dates)].normalize()
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            # e.g. Close written as "1,234.50"
+            numeric = pd.to_numeric(df[column].astype(str).str.replace(',', ''), errors='coerce')
+            if numeric.notna().any():
+                df[column] = numeric
+    columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+
+    # Unique per source version and process; nobody maps the directory until meta.json names it
+    symbol_dir = os.path.join(root, symbol.upper())
+    os.makedirs(symbol_dir, exist_ok=True)
+    base = f"v{signature[0]}-{signature[1]}-{os.getpid()}"
+    version = base
+    attempt = 0
+    while True:
+        try:
+            os.mkdir(os.path.join(symbol_dir, version))
+            break
+        except FileExistsError:
+            attempt += 1
+            version = f"{base}-{attempt}"
+    version_dir = os.path.join(symbol_dir, version)
+
+    np.save(os.path.join(version_dir, f"{DATE_COLUMN}.npy"), df.index.values.astype('datetime64[D]'))
+    for column in columns:
+        np.save(os.path.join(version_dir, f"{column}.npy"), df[column].to_numpy(dtype=np.float64))
+
+    meta = {
+        'format_version': HISTORY_FORMAT_VERSION,
+        'symbol': symbol.upper(),
+        'source': os.path.abspath(source),
+        'source_signature': signature,
+        'version': version,
+        'rows': int(len(df)),
+        'columns': columns,
+        'first_date': str(df.index[0].date()) if len(df) else None,
+        'last_date': str(df.index[-1].date()) if len(df) else None,
+    }
+    meta_path = os.path.join(symbol_dir, 'meta.json')
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+    remove_old_versions(symbol_dir, keep=version)
+    return meta
+
+
+def remove_old_versions(symbol_dir, keep, grace_seconds=HISTORY_VERSION_GRACE_SECONDS):
+    """
+    Deletes version directories other than `keep` that were last modified more
+    than grace_seconds ago. Directories whose files are still mapped (which
+    Windows refuses to delete) are left for a later conversion to retry.
+    """
+    cutoff = time.time() - grace_seconds
+    for name in os.listdir(symbol_dir):
+        path = os.path.join(symbol_dir, name)
+        if not name.startswith('v') or name == keep or not os.path.isdir(path):
+            continue
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+# =========================
+# 2. Memory-Mapped Reads
+# =========================
+
+class PriceHistory:
+    """
+    One converted version of a symbol's history, with every column memory-mapped.
+    Pages are loaded lazily by the OS and shared by all processes mapping the files.
+    """
+
+    def __init__(self, meta, version_dir):
+        self.meta = meta
+        self.symbol = meta['symbol']
+        self.columns = meta['columns']
+        self.dates = np.load(os.path.join(version_dir, f"{DATE_COLUMN}.npy"), mmap_mode='r')
+        self._arrays = {
+            column: np.load(os.path.join(version_dir, f"{column}.npy"), mmap_mode='r')
+            for column in self.columns
+        }
+
+    def __len__(self):
+        return len(self.dates)
+
+    def bounds(self, start=None, end=None):
+        """
+        Returns the [lo, hi) row range of dates between start and end, inclusive.
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.dates, _to_day(start), side='left'))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, _to_day(end), side='right'))
+        return lo, max(lo, hi)
+
+    def slice(self, start=None, end=None, columns=None):
+        lo, hi = self.bounds(start, end)
+        columns = self.columns if columns is None else columns
+        missing = [c for c in columns if c not in self._arrays]
+        if missing:
+            raise KeyError(f"{self.symbol} has no column {', '.join(missing)}")
+        history = {DATE_COLUMN: self.dates[lo:hi]}
+        for column in columns:
+            history[column] = self._arrays[column][lo:hi]
+        return history
+
+
+class PriceHistoryStore:
+    """
+    Serves price history from the columnar store, converting a symbol's CSV on
+    first use and again whenever the CSV's mtime or size changes.
+    """
+
+    def __init__(self, root=HISTORY_STORE_DIR, source=history_source):
+        self.root = root
+        self._source = source
+        self._histories = {}
+        self._lock = threading.Lock()
+        self._convert_locks = {}
+
+    def open(self, symbol):
+        """
+        Returns the current PriceHistory of a symbol, or None if it has no CSV.
+        """
+        if not is_valid_symbol(symbol):
+            return None
+        symbol = symbol.upper()
+        source = self._source(symbol)
+        try:
+            signature = _source_signature(source)
+        except OSError:
+            return None
+
+        history = self._histories.get(symbol)
+        if history is not None and history.meta['source_signature'] == signature:
+            return history
+
+        with self._lock:
+            convert_lock = self._convert_locks.setdefault(symbol, threading.Lock())
+        with convert_lock:
+            history = self._histories.get(symbol)
+            if history is not None and history.meta['source_signature'] == signature:
+                return history
+
+            meta = self._read_meta(symbol)
+            if (meta is None or meta.get('format_version') != HISTORY_FORMAT_VERSION
+                    or meta.get('source_signature') != signature
+                    or meta.get('source') != os.path.abspath(source)):
+                meta = convert_history(symbol, source, self.root)
+                print(f"Converted price history for {symbol}: {meta['rows']} rows")
+
+            history = PriceHistory(meta, os.path.join(self.root, symbol, meta['version']))
+            self._histories[symbol] = history
+            return history
+
+    def _read_meta(self, symbol):
+        try:
+            with open(os.path.join(self.root, symbol, 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_history(self, symbol, start=None, end=None, columns=None):
+        """
+        Returns a symbol's price history between two dates without copying it.
+
+        Parameters:
+        - symbol (str): Stock symbol, or NEPSE for the index.
+        - start (str/date, optional): First date, inclusive.
+        - end (str/date, optional): Last date, inclusive.
+        - columns (list, optional): Columns to return; all by default.
+
+        Returns:
+        - dict: 'Date' (datetime64[D]) and each requested column as read-only
+          array views into the memory-mapped files, or None if the symbol has no data.
+
+        Raises:
+        - KeyError: If a requested column does not exist.
+        """
+        history = self.open(symbol)
+        if history is None:
+            return None
+        return history.slice(start, end, columns)
+
+    def get_frame(self, symbol, start=None, end=None, columns=None):
+        """
+        Same as get_history but as a DataFrame indexed by date, for pandas callers.
+        """
+        history = self.get_history(symbol, start, end, columns)
+        if history is None:
+            return None
+        dates = history.pop(DATE_COLUMN)
+        return pd.DataFrame(history, index=pd.DatetimeIndex(dates.astype('datetime64[ns]'), name=DATE_COLUMN), copy=False)
+
+
+# Shared store used by the model loader and the Flask routes
+price_store = PriceHistoryStore()
+
+
+if __name__ == "__main__":
+    from stock_model import SUPPORTED_SYMBOLS
+
+    # Converts the given symbols (default: every supported symbol and NEPSE) ahead of time
+    for symbol in sys.argv[1:] or SUPPORTED_SYMBOLS + [INDEX_SYMBOL]:
+        try:
+            meta = convert_history(symbol)
+            print(f"{symbol}: {meta['rows']} rows, {meta['first_date']} to {meta['last_date']}, columns {meta['columns']}")
+        except OSError as e:
+            print(f"Skipping {symbol}: {str(e)}")
@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from charts import render_chart
+
+# Worker processes rendering charts; each owns its own Figure and Agg canvas
+CHART_RENDER_WORKERS = int(os.getenv('CHART_RENDER_WORKERS', str(os.cpu_count() or 2)))
+# Jobs allowed in flight (running + queued) before new ones are rejected
+CHART_RENDER_QUEUE = int(os.getenv('CHART_RENDER_QUEUE', str(CHART_RENDER_WORKERS * 4)))
+# Longest a request waits for its chart
+CHART_RENDER_TIMEOUT = float(os.getenv('CHART_RENDER_TIMEOUT', '30'))
+
+# Number of recent jobs kept for the timing percentiles
+TIMING_WINDOW = 500
+
+
+class RenderPoolFull(Exception):
+    """
+    Raised when the render queue is full; routes answer with 503.
+    """
+
+
+def render_job(spec, fmt):
+    """
+    Runs inside a worker process. Returns the image bytes and the render time.
+    """
+    started = time.perf_counter()
+    image = render_chart(spec, fmt)
+    return image, time.perf_counter() - started
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RenderPool:
+    """
+    Pool of chart-rendering worker processes with a bounded queue.
+
+    Matplotlib keeps per-figure state that is not safe to share between
+    threads, so rendering happens in separate processes and scales across
+    cores instead of blocking request threads. The processes are spawned on
+    the first render.
+    """
+
+    def __init__(self, workers=CHART_RENDER_WORKERS, max_pending=CHART_RENDER_QUEUE,
+                 timeout=CHART_RENDER_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.pending = 0
+        self._queue_waits = deque(maxlen=TIMING_WINDOW)
+        self._render_times = deque(maxlen=TIMING_WINDOW)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawn, not fork: the parent holds torch threads and open sockets
+                context = multiprocessing.get_context('spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    def render(self, spec, fmt='png'):
+        """
+        Renders a chart spec in a worker process and returns the image bytes.
+
+        Raises:
+        - RenderPoolFull: If max_pending jobs are already in flight.
+        - concurrent.futures.TimeoutError: If the job takes longer than the timeout.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RenderPoolFull(f"{self.max_pending} chart renders already pending")
+
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.pending += 1
+        try:
+            future = self._get_executor().submit(render_job, spec, fmt)
+        except BaseException as e:
+            self._job_done(None)
+            with self._lock:
+                self.failed += 1
+                if isinstance(e, BrokenProcessPool):
+                    self._executor = None
+            raise
+        # The slot is held until the job itself finishes, not just until this request
+        # stops waiting, so slow renders keep counting against max_pending
+        future.add_done_callback(self._job_done)
+
+        try:
+            image, render_seconds = future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # Drop the job if it has not started yet; a running one finishes in its worker
+            future.cancel()
+            with self._lock:
+                self.failed += 1
+                self.timeouts += 1
+            raise
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next job
+            with self._lock:
+                self.failed += 1
+                self._executor = None
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+
+        total_seconds = time.perf_counter() - submitted_at
+        with self._lock:
+            self.completed += 1
+            self._render_times.append(render_seconds)
+            self._queue_waits.append(max(0.0, total_seconds - render_seconds))
+        return image
+
+    def _job_done(self, _future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def stats(self):
+        """
+        Returns job counters and render/queue-wait timings in milliseconds.
+        """
+        with self._lock:
+            render_times = list(self._render_times)
+            queue_waits = list(self._queue_waits)
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'render_ms_p50': round(_percentile(render_times, 0.5) * 1000, 2),
+                'render_ms_p95': round(_percentile(render_times, 0.95) * 1000, 2),
+                'queue_wait_ms_p50': round(_percentile(queue_waits, 0.5) * 1000, 2),
+                'queue_wait_ms_p95': round(_percentile(queue_waits, 0.95) * 1000, 2),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Shared pool used by the chart cache
+render_pool = RenderPool()
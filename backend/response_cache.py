@@ -0,0 +1,131 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+GZIP_LEVEL = 6
+
+# Responses kept in memory; each file/variant pair is one entry
+RESPONSE_CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '64'))
+
+
+def make_entry(body, last_modified=None):
+    """
+    Builds a stored response for stored_json_response: the JSON body, its
+    gzipped copy (None for small bodies), a content-derived ETag and the
+    Last-Modified time.
+
+    Parameters:
+    - body (bytes): Serialized JSON.
+    - last_modified (datetime, optional): When the data last changed; defaults to now.
+
+    Returns:
+    - dict: 'body', 'gzip', 'etag' and 'last_modified'.
+    """
+    return {
+        'body': body,
+        'gzip': gzip.compress(body, GZIP_LEVEL) if len(body) >= GZIP_MIN_BYTES else None,
+        'etag': hashlib.sha1(body).hexdigest()[:16],
+        'last_modified': (last_modified or datetime.now(timezone.utc)).replace(microsecond=0),
+    }
+
+
+def file_signature(path):
+    """
+    Returns (mtime_ns, size) of a file, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+class FileResponseCache:
+    """
+    Pre-serialized responses derived from JSON files.
+
+    An entry is keyed by the file path and a variant name (e.g. a news
+    category) and remembers the (mtime, size) of the file it was built from.
+    Requests only stat the file; it is read, parsed, transformed and
+    serialized again only when that signature changes. If the file cannot be
+    parsed, e.g. while a scraper rewrites it, the previous entry keeps being
+    served.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, variant=None, transform=None):
+        """
+        Returns the stored response for a file.
+
+        Parameters:
+        - path (str): JSON file the response is built from.
+        - variant (str, optional): Distinguishes responses built from the same file.
+        - transform (callable, optional): Maps the parsed file to the response data.
+
+        Returns:
+        - dict: An entry from make_entry.
+
+        Raises:
+        - FileNotFoundError: If the file does not exist.
+        - ValueError: If the file is not valid JSON and there is no earlier entry to fall back on.
+        """
+        key = (path, variant)
+        signature = file_signature(path)
+        if signature is None:
+            raise FileNotFoundError(path)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except ValueError:
+            if cached is not None:
+                return cached[1]
+            raise
+        if transform is not None:
+            data = transform(data)
+
+        last_modified = datetime.fromtimestamp(signature[0] / 1e9, timezone.utc)
+        entry = make_entry(json.dumps(data).encode('utf-8'), last_modified)
+        with self._lock:
+            self._entries[key] = (signature, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, path=None):
+        """
+        Drops the entries of one file, or all entries, so they are rebuilt on next use.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if path is None or key[0] == path]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared cache used by the Flask routes
+response_cache = FileResponseCache()
@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+from fixture_server import FixtureServer, FIXTURES_DIR
+
+# Runs the scrapers against fixture_server.py instead of the real sites, for
+# repeatable timings offline. Record fixtures once with --record (this hits
+# the real sites through the recording proxy), then benchmark as often as
+# needed without a network.
+#
+# Usage: python scrape_bench.py [--record] [--runs N] [--latency S] [scenario ...]
+
+BENCH_SYMBOLS = {'news': 'JBBL', 'announcements': 'SCB'}
+
+
+def _scenarios(workdir):
+    """
+    Returns scenario name -> callable returning the number of items scraped.
+    Imported here, after the base URLs point at the fixture servers, since the
+    scrapers read them at import time.
+    """
+    import nepse_scrape
+    import company_crawler
+    import summary
+
+    def nepse_http():
+        _, companies = nepse_scrape.scrape_sectors_http(nepse_scrape.COMPANY_LIST_URL)
+        return len(companies)
+
+    def nepse_browser():
+        _, companies, _ = nepse_scrape.scrape_sectors_parallel(nepse_scrape.COMPANY_LIST_URL)
+        return len(companies)
+
+    def company_tab(tab, use_http):
+        symbol = BENCH_SYMBOLS[tab]
+
+        def run():
+            # A full crawl into the scratch directory, so every run reads every page
+            saved = company_crawler.crawl([symbol], [tab], workers=1, root=workdir, incremental=False,
+                                          use_http=use_http)
+            rows = saved[symbol][tab]
+            if rows is None:
+                raise RuntimeError(f"{symbol} {tab} failed")
+            return rows
+        return run
+
+    def market_summary():
+        path = os.path.join(workdir, 'market-summary-1.json')
+        if os.path.exists(path):
+            os.remove(path)
+        summary.scrape_summary(path)
+        with open(path, 'r') as f:
+            return len(json.load(f)['summary'])
+
+    def merolagani_news():
+        import server
+        news_data, _ = server.fetch_news(os.path.join(workdir, 'news_links.json'))
+        return len(news_data['all'])
+
+    return {
+        'nepse_scrape': nepse_http,
+        'nepse_scrape[browser]': nepse_browser,
+        'news_scrape': company_tab('news', True),
+        'news_scrape[browser]': company_tab('news', False),
+        'announcements': company_tab('announcements', True),
+        'announcements[browser]': company_tab('announcements', False),
+        'summary': market_summary,
+        'server.scrape_news': merolagani_news,
+    }
+
+
+def run_scenario(fn, runs, servers):
+    """
+    Runs a scenario `runs` times and returns its timings and the number of
+    requests it made to the fixture servers.
+    """
+    seconds = []
+    items = None
+    error = None
+    for server in servers:
+        server.reset_stats()
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            items = fn()
+        except Exception as e:
+            error = str(e)
+            break
+        seconds.append(time.perf_counter() - started)
+    requests_made = sum(server.stats()['requests'] for server in servers)
+    misses = sum(server.stats()['misses'] for server in servers)
+    return {
+        'runs': len(seconds),
+        'items': items,
+        'error': error,
+        'mean': statistics.mean(seconds) if seconds else None,
+        'median': statistics.median(seconds) if seconds else None,
+        'max': max(seconds) if seconds else None,
+        'requests': requests_made / max(1, len(seconds)),
+        'misses': misses,
+    }
+
+
+def benchmark(names=None, runs=3, record=False, latency=0.0, root=FIXTURES_DIR):
+    """
+    Starts a fixture server per site, points the scrapers at them and times
+    each scenario.
+
+    Parameters:
+    - names (list, optional): Scenarios to run; all of them by default.
+    - runs (int): Timed runs per scenario (one when recording).
+    - record (bool): Proxy to the real sites and save their responses.
+    - latency (float): Seconds added to every replayed response.
+    - root (str): Fixtures directory.
+
+    Returns:
+    - dict: Scenario name -> result of run_scenario.
+    """
+    servers = [FixtureServer(site, record=record, latency=latency, root=root).start()
+               for site in ('sharesansar', 'merolagani')]
+    os.environ['SHARESANSAR_BASE_URL'] = servers[0].url
+    os.environ['MEROLAGANI_BASE_URL'] = servers[1].url
+
+    # The scenarios write their output to a scratch working directory, not the backend's files
+    previous_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='scrape-bench-')
+    os.chdir(workdir)
+    try:
+        scenarios = _scenarios(workdir)
+        unknown = [name for name in names or [] if name not in scenarios]
+        if unknown:
+            raise ValueError(f"Unknown scenarios: {', '.join(unknown)}")
+
+        results = {}
+        for name in names or scenarios:
+            print(f"\n=== {name} ===")
+            results[name] = run_scenario(scenarios[name], 1 if record else runs, servers)
+    finally:
+        os.chdir(previous_cwd)
+        for server in servers:
+            server.stop()
+
+    print(f"\n{'scenario':<24} {'runs':>4} {'items':>6} {'mean s':>8} {'median s':>9} {'max s':>7} "
+          f"{'req/run':>8} {'misses':>7}")
+    for name, result in results.items():
+        if result['error']:
+            print(f"{name:<24} failed: {result['error']}")
+            continue
+        print(f"{name:<24} {result['runs']:4d} {result['items']:6d} {result['mean']:8.2f} "
+              f"{result['median']:9.2f} {result['max']:7.2f} {result['requests']:8.1f} {result['misses']:7d}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against recorded fixtures")
+    parser.add_argument('scenarios', nargs='*', help="Scenarios to run (default: all)")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--record', action='store_true', help="Record fixtures from the real sites first")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every replayed response")
+    args = parser.parse_args()
+
+    results = benchmark(args.scenarios, args.runs, args.record, args.latency)
+    sys.exit(1 if any(result['error'] for result in results.values()) else 0)
@@ -0,0 +1,180 @@
+import os
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# Longest a single scrape may spend waiting on the site, across all its waits
+SCRAPE_LATENCY_BUDGET = float(os.getenv('SCRAPE_LATENCY_BUDGET', '180'))
+# Longest any one wait may take, within the remaining budget
+SCRAPE_WAIT_TIMEOUT = float(os.getenv('SCRAPE_WAIT_TIMEOUT', '20'))
+# How often wait conditions are re-checked
+POLL_SECONDS = 0.05
+
+# State of a table in one round trip: DataTables draw count, first row text,
+# row count and whether the "Processing..." indicator is showing. The draw.dt
+# listener is attached on first use and counts redraws on the table element.
+TABLE_STATE_SCRIPT = """
+const container = document.querySelector(arguments[0]);
+if (!container) {
+    return null;
+}
+const table = container.tagName === 'TABLE' ? container : container.querySelector('table');
+if (table && !table.__drawHooked && window.jQuery && jQuery.fn.dataTable
+        && jQuery.fn.dataTable.isDataTable(table)) {
+    jQuery(table).on('draw.dt', () => { table.__drawCount = (table.__drawCount || 0) + 1; });
+    table.__drawHooked = true;
+}
+const rows = (table || container).querySelectorAll('tbody tr');
+let processing = false;
+const indicators = document.querySelectorAll(
+    (table && table.id ? '#' + table.id + '_processing, ' : '') + '.dataTables_processing');
+indicators.forEach(el => {
+    if (el.offsetParent !== null && getComputedStyle(el).display !== 'none') {
+        processing = true;
+    }
+});
+return {
+    draws: table ? (table.__drawCount || 0) : 0,
+    first_row: rows.length ? rows[0].innerText.trim() : null,
+    rows: rows.length,
+    processing: processing,
+};
+"""
+
+
+class LatencyBudget:
+    """
+    Time allowance for one scrape, with a breakdown of where the time went.
+
+    Waits draw from the remaining budget and stop with a TimeoutException once
+    it is used up. Code wrapped in extracting() is counted as extraction.
+    """
+
+    def __init__(self, name, seconds=SCRAPE_LATENCY_BUDGET):
+        self.name = name
+        self.seconds = seconds
+        self.started = time.perf_counter()
+        self.finished = None
+        self.wait_seconds = 0.0
+        self.extract_seconds = 0.0
+        self.waits = 0
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def stop(self):
+        """
+        Ends the scrape's clock, e.g. before its report is printed later.
+        """
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def remaining(self):
+        return max(0.0, self.seconds - self.elapsed())
+
+    @contextmanager
+    def extracting(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.extract_seconds += time.perf_counter() - started
+
+    def wait(self, driver, condition, timeout=SCRAPE_WAIT_TIMEOUT, message=''):
+        """
+        Polls condition(driver) until it returns a truthy value, which is returned.
+
+        Raises:
+            TimeoutException: If the condition does not hold within timeout or
+            the remaining budget, whichever is shorter.
+        """
+        limit = min(timeout, self.remaining())
+        started = time.perf_counter()
+        try:
+            if limit <= 0:
+                raise TimeoutException(f"{self.name}: latency budget of {self.seconds:g}s used up")
+            return WebDriverWait(driver, limit, poll_frequency=POLL_SECONDS).until(condition, message)
+        finally:
+            self.wait_seconds += time.perf_counter() - started
+            self.waits += 1
+
+    def report(self):
+        """
+        Prints and returns how the scrape's time split between waiting, extracting and the rest.
+        """
+        self.stop()
+        total = self.elapsed()
+        summary = {
+            'name': self.name,
+            'total_seconds': round(total, 2),
+            'wait_seconds': round(self.wait_seconds, 2),
+            'extract_seconds': round(self.extract_seconds, 2),
+            'other_seconds': round(max(0.0, total - self.wait_seconds - self.extract_seconds), 2),
+            'waits': self.waits,
+            'budget_seconds': self.seconds,
+        }
+        print(f"[{self.name}] {summary['total_seconds']:.2f}s total: "
+              f"{summary['wait_seconds']:.2f}s waiting ({self.waits} waits), "
+              f"{summary['extract_seconds']:.2f}s extracting, "
+              f"{summary['other_seconds']:.2f}s other (budget {self.seconds:g}s)")
+        return summary
+
+# =========================
+# Wait conditions
+# =========================
+
+def table_state(driver, container_selector):
+    """
+    Returns the current state of a table (see TABLE_STATE_SCRIPT), or None if it is not on the page.
+    """
+    return driver.execute_script(TABLE_STATE_SCRIPT, container_selector)
+
+
+def wait_for_element(driver, locator, budget, timeout=SCRAPE_WAIT_TIMEOUT):
+    """
+    Waits until an element is present and returns it.
+    """
+    return budget.wait(driver, EC.presence_of_element_located(locator), timeout,
+                       f"Timed out waiting for {locator[1]}")
+
+
+def wait_for_rows(driver, container_selector, budget, timeout=SCRAPE_WAIT_TIMEOUT):
+    """
+    Waits until a table has rows and is not processing. Returns its state.
+    """
+    def loaded(driver):
+        state = table_state(driver, container_selector)
+        if state and state['rows'] and not state['processing']:
+            return state
+        return False
+
+    return budget.wait(driver, loaded, timeout, f"Timed out waiting for rows in {container_selector}")
+
+
+def wait_for_table_change(driver, container_selector, previous, budget, timeout=SCRAPE_WAIT_TIMEOUT):
+    """
+    Waits until a table has been redrawn since `previous` (a table_state result):
+    a DataTables draw event fired, or the first row or the row count changed,
+    and the processing indicator is gone. Returns the new state.
+    """
+    def changed(driver):
+        state = table_state(driver, container_selector)
+        if not state or state['processing'] or not state['rows']:
+            return False
+        if previous is None or (state['draws'] != previous['draws']
+                                or state['first_row'] != previous['first_row']
+                                or state['rows'] != previous['rows']):
+            return state
+        return False
+
+    return budget.wait(driver, changed, timeout, f"Timed out waiting for {container_selector} to change")
+
+
+def wait_for_script(driver, script, budget, timeout=SCRAPE_WAIT_TIMEOUT, message=''):
+    """
+    Waits until a JavaScript expression returns a truthy value and returns that value.
+    """
+    return budget.wait(driver, lambda driver: driver.execute_script(script), timeout, message)
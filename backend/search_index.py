@@ -0,0 +1,308 @@
+import os
+import re
+import csv
+import glob
+import math
+import time
+import heapq
+import threading
+from datetime import date, datetime
+
+from news_index import news_link_items
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Per-symbol CSVs written by company_crawler.py -> the kind of item they hold
+CSV_KINDS = {
+    'sharesansar_news.csv': 'news',
+    'sharesansar_announcements.csv': 'announcement',
+    'sharesansar_financial_reports.csv': 'financial_report',
+}
+NEWS_LINKS_FILENAME = 'news_links.json'
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Scores are multiplied by 1 + RECENCY_WEIGHT * 0.5 ** (age in days / RECENCY_HALF_LIFE_DAYS)
+RECENCY_WEIGHT = float(os.getenv('SEARCH_RECENCY_WEIGHT', '0.5'))
+RECENCY_HALF_LIFE_DAYS = float(os.getenv('SEARCH_RECENCY_HALF_LIFE_DAYS', '180'))
+
+DEFAULT_RESULTS = 20
+MAX_RESULTS = 100
+
+# The source files are stat'ed at most this often; ingestion notifications update the index right away
+SEARCH_INDEX_CHECK_SECONDS = float(os.getenv('SEARCH_INDEX_CHECK_SECONDS', '30'))
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase alphanumeric tokens, e.g. "AGM, 2080/81" -> ['agm', '2080', '81'].
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def read_csv_items(path, kind):
+    """
+    Yields the (date, title, url) rows of a company CSV as item dicts.
+    """
+    symbol = os.path.basename(os.path.dirname(path)).upper()
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    except OSError as e:
+        print(f"Error loading {path}: {str(e)}")
+        return
+
+    for row in rows:
+        title = (row.get('Title') or '').strip()
+        if not title:
+            continue
+        try:
+            published = datetime.strptime((row.get('Date') or '').strip(), '%Y-%m-%d').date()
+        except ValueError:
+            published = None
+        url = row.get('URL') if row.get('URL') not in (None, '', 'N/A') else None
+        yield {'title': title, 'url': url, 'date': published, 'kind': kind, 'symbol': symbol}
+
+
+def file_items(path):
+    """
+    Yields the searchable items of one source file.
+    """
+    name = os.path.basename(path)
+    if name == NEWS_LINKS_FILENAME:
+        for item in news_link_items(path):
+            yield {'title': item['title'], 'url': item['url'], 'date': item['date'], 'kind': 'news', 'symbol': None}
+    else:
+        yield from read_csv_items(path, CSV_KINDS[name])
+
+
+class _Doc:
+    __slots__ = ('id', 'title', 'url', 'date', 'refs', 'terms', 'length')
+
+    def __init__(self, doc_id, item):
+        self.id = doc_id
+        self.title = item['title']
+        self.url = item['url']
+        self.date = item['date']
+        self.refs = {}  # Source path -> (symbol or None, kind) the item was listed under
+        self.terms = {}
+        self.length = 0
+
+    def symbols(self):
+        return sorted({symbol for symbol, _ in self.refs.values() if symbol})
+
+    def kinds(self):
+        return sorted({kind for _, kind in self.refs.values()})
+
+
+class SearchIndex:
+    """
+    In-process inverted index over news, announcement and financial report titles.
+
+    Each token maps to a posting dict of doc id -> term frequency. A doc's
+    terms are its title tokens plus the symbols it is listed under, so
+    "dividend NABIL" matches NABIL's items whose titles only say "dividend".
+    Items are deduplicated by URL (or kind, date and title when there is no
+    link) across files.
+
+    update() re-reads only the files whose mtime or size changed and applies
+    the difference: items that disappeared are removed from their postings
+    and new ones added, so appending rows costs time proportional to the
+    rows, not to the index.
+    """
+
+    def __init__(self, root=BASE_DIR, check_seconds=SEARCH_INDEX_CHECK_SECONDS):
+        self.root = root
+        self.check_seconds = check_seconds
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._postings = {}
+        self._files = {}  # Path -> ((mtime_ns, size), set of doc keys)
+        self._next_id = 0
+        self._by_id = {}
+        self._total_length = 0
+        self._checked = 0.0
+
+    def source_paths(self):
+        paths = [os.path.join(self.root, NEWS_LINKS_FILENAME)]
+        for filename in CSV_KINDS:
+            paths += glob.glob(os.path.join(self.root, '*', filename))
+        return sorted(path for path in paths if os.path.exists(path))
+
+    # -------------------------
+    # Building
+    # -------------------------
+
+    def update(self, force=True):
+        """
+        Re-indexes the source files that changed since the last update.
+
+        Parameters:
+        - force (bool): Check the files now rather than at most every check_seconds.
+
+        Returns:
+        - int: Number of files re-indexed.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_seconds:
+            return 0
+        with self._lock:
+            if not force and now - self._checked < self.check_seconds:
+                return 0
+            changed = 0
+            paths = self.source_paths()
+            for path in set(self._files) - set(paths):
+                self._index_file(path, None, [])
+                changed += 1
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if path in self._files and self._files[path][0] == signature:
+                    continue
+                self._index_file(path, signature, list(file_items(path)))
+                changed += 1
+            self._checked = time.monotonic()
+            return changed
+
+    def _index_file(self, path, signature, items):
+        previous = self._files.get(path, (None, set()))[1]
+        keys = set()
+        for item in items:
+            key = item['url'] or f"{item['kind']}|{item['date']}|{item['title']}"
+            keys.add(key)
+            doc = self._docs.get(key)
+            if doc is None:
+                doc = _Doc(self._next_id, item)
+                self._next_id += 1
+                self._docs[key] = doc
+                self._by_id[doc.id] = doc
+            elif path in doc.refs:
+                continue  # Already indexed from this file
+            if doc.date is None or (item['date'] is not None and item['date'] < doc.date):
+                doc.date = item['date']
+            symbols = doc.symbols()
+            doc.refs[path] = (item['symbol'], item['kind'])
+            if not doc.terms or doc.symbols() != symbols:
+                self._reindex_doc(doc)
+
+        for key in previous - keys:
+            doc = self._docs.get(key)
+            if doc is None:
+                continue
+            symbols = doc.symbols()
+            doc.refs.pop(path, None)
+            if doc.refs:
+                if doc.symbols() != symbols:
+                    self._reindex_doc(doc)
+            else:
+                self._reindex_doc(doc, remove=True)
+                del self._docs[key]
+                del self._by_id[doc.id]
+
+        if signature is None:
+            self._files.pop(path, None)
+        else:
+            self._files[path] = (signature, keys)
+
+    def _reindex_doc(self, doc, remove=False):
+        for term in doc.terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc.id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= doc.length
+        doc.terms = {}
+        doc.length = 0
+        if remove:
+            return
+
+        tokens = tokenize(doc.title) + [symbol.lower() for symbol in doc.symbols()]
+        for token in tokens:
+            doc.terms[token] = doc.terms.get(token, 0) + 1
+        doc.length = len(tokens)
+        self._total_length += doc.length
+        for term, tf in doc.terms.items():
+            self._postings.setdefault(term, {})[doc.id] = tf
+
+    # -------------------------
+    # Searching
+    # -------------------------
+
+    def search(self, query, limit=DEFAULT_RESULTS, symbol=None, kind=None, today=None):
+        """
+        Returns the best matching items for a query, ranked by BM25 with a recency boost.
+
+        Parameters:
+        - query (str): Free text, e.g. "dividend NABIL".
+        - limit (int): Maximum number of results.
+        - symbol (str, optional): Only items listed under this symbol.
+        - kind (str, optional): Only items of this kind: news, announcement or financial_report.
+        - today (date, optional): Reference date for the recency boost.
+
+        Returns:
+        - list: Dicts with 'title', 'url', 'date', 'kinds', 'symbols' and 'score'.
+        """
+        self.update(force=False)
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        terms = list(dict.fromkeys(tokenize(query or '')))
+        if not terms:
+            return []
+        today = today or date.today()
+        symbol = symbol.upper() if symbol else None
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    length = self._by_id[doc_id].length
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+            def boosted(doc_id):
+                doc = self._by_id[doc_id]
+                if doc.date is None:
+                    return scores[doc_id]
+                age = max(0, (today - doc.date).days)
+                return scores[doc_id] * (1 + RECENCY_WEIGHT * 0.5 ** (age / RECENCY_HALF_LIFE_DAYS))
+
+            candidates = (
+                doc_id for doc_id in scores
+                if (symbol is None or symbol in self._by_id[doc_id].symbols())
+                and (kind is None or kind in self._by_id[doc_id].kinds())
+            )
+            ranked = heapq.nlargest(limit, ((boosted(doc_id), doc_id) for doc_id in candidates))
+            return [
+                {
+                    'title': self._by_id[doc_id].title,
+                    'url': self._by_id[doc_id].url,
+                    'date': self._by_id[doc_id].date.isoformat() if self._by_id[doc_id].date else None,
+                    'kinds': self._by_id[doc_id].kinds(),
+                    'symbols': self._by_id[doc_id].symbols(),
+                    'score': round(score, 4),
+                }
+                for score, doc_id in ranked
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._docs), 'terms': len(self._postings), 'files': len(self._files)}
+
+
+# Shared index used by the Flask routes
+search_index = SearchIndex()
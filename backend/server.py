@@ -1,60 +1,212 @@
+import os
+import hashlib
+import threading
+from datetime import date
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
 import json
 
-BASE_URL = "https://eng.merolagani.com"
+BASE_URL = os.getenv('MEROLAGANI_BASE_URL', "https://eng.merolagani.com").rstrip('/')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NEWS_LINKS_PATH = os.path.join(BASE_DIR, 'news_links.json')
+
+HTTP_TIMEOUT = float(os.getenv('MEROLAGANI_HTTP_TIMEOUT', '15'))
+
+# News block of each homepage list -> the category it is saved under
+NEWS_BLOCKS = {
+    'ctl00_ContentPlaceHolder1_rptStockMarketNews_ctl00_NewsBlock1_divNewsBlock': 'market',
+    'ctl00_ContentPlaceHolder1_rptCompanyNews_ctl00_NewsBlock2_divNewsBlock': 'company',
+    'ctl00_ContentPlaceHolder1_rptCorporateNews_ctl00_NewsBlock4_divNewsBlock': 'corporate',
+}
+
+# Only the news blocks are built into a tree; the rest of the homepage is skipped while parsing
+NEWS_BLOCK_STRAINER = SoupStrainer(id=lambda value: value in NEWS_BLOCKS)
+
+
+class ConditionalFetcher:
+    """
+    Fetches one URL over a pooled session and reports when it has not changed.
+
+    The ETag and Last-Modified of the last processed response are sent back as
+    If-None-Match and If-Modified-Since. A 304, or a 200 whose body hashes the
+    same as the last processed one, means the page is unchanged. The
+    validators are only remembered once the caller calls processed(), so a
+    page that failed to parse is fetched and parsed again next time.
+    """
+
+    def __init__(self, url, timeout=HTTP_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=['GET'])
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=4, max_retries=retry))
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=4, max_retries=retry))
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+        self._pending = None
+
+        self.fetches = 0
+        self.not_modified = 0
+        self.same_content = 0
+
+    def fetch(self):
+        """
+        Returns the page body as bytes, or None if it is unchanged since the last processed fetch.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        self.fetches += 1
+        if response.status_code == 304:
+            self.not_modified += 1
+            return None
+        response.raise_for_status()
+
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if content_hash == self.content_hash:
+            self.same_content += 1
+            return None
+        self._pending = (response.headers.get('ETag'), response.headers.get('Last-Modified'), content_hash)
+        return response.content
+
+    def processed(self):
+        """
+        Remembers the validators of the last fetched body, once it has been handled.
+        """
+        if self._pending is not None:
+            self.etag, self.last_modified, self.content_hash = self._pending
+            self._pending = None
+
+
+def parse_news(html):
+    """
+    Extracts the homepage news links into {'all', 'company', 'market', 'corporate'} lists.
+    """
+    try:
+        soup = BeautifulSoup(html, 'lxml', parse_only=NEWS_BLOCK_STRAINER)
+    except FeatureNotFound:
+        soup = BeautifulSoup(html, 'html.parser', parse_only=NEWS_BLOCK_STRAINER)
 
-def scrape_news():
-    response = requests.get(BASE_URL)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Let's print the HTML to debug    
     news_data = {
         "all": [],
         "company": [],
         "market": [],
         "corporate": []
     }
-    
-    loop_through = {
-        '1': 'StockMarketNews',
-        '2': 'CompanyNews',
-        '4': 'CorporateNews'
-    }
 
-    for key, value in loop_through.items():
-        # Print the ID we're looking for
-        search_id = f"ctl00_ContentPlaceHolder1_rpt{value}_ctl00_NewsBlock{key}_divNewsBlock"
-        print(f"Searching for ID: {search_id}")
-        
+    for search_id, category in NEWS_BLOCKS.items():
         articles = soup.find(id=search_id)
         if articles is None:
             print(f"Could not find element with ID: {search_id}")
             continue
-            
+
         for article in articles.find_all('a'):
             title = article.text.strip()
-            url = BASE_URL + article.get("href")
-            if url and title:
+            href = article.get("href")
+            if href and title:
+                url = BASE_URL + href
                 news_data["all"].append({"title": title, "url": url})
-                
-                category_map = {
-                    'StockMarketNews': 'market',
-                    'CompanyNews': 'company',
-                    'CorporateNews': 'corporate'
-                }
-                
-                if value in category_map:
-                    category = category_map[value]
-                    news_data[category].append({"title": title, "url": url})
-
-    # Save the data
-    with open('news_links.json', 'w') as f:
-        json.dump(news_data, f, indent=4)
+                news_data[category].append({"title": title, "url": url})
 
     return news_data
 
-try:
-    scrape_news()
-except Exception as e:
-    print(f"Error occurred: {str(e)}")
+
+def previous_first_seen(path):
+    """
+    Returns url -> first_seen date (YYYY-MM-DD) of the items in an existing news_links.json.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {
+        item['url']: item['first_seen']
+        for items in previous.values() if isinstance(items, list)
+        for item in items if isinstance(item, dict) and item.get('url') and item.get('first_seen')
+    }
+
+
+def add_first_seen(news_data, first_seen, today=None):
+    """
+    Dates every item with the day its URL first appeared on the homepage. The
+    homepage lists no dates, and items keep their date across scrapes, so the
+    file only changes when the news does.
+    """
+    today = (today or date.today()).isoformat()
+    for items in news_data.values():
+        for item in items:
+            item['first_seen'] = first_seen.get(item['url'], today)
+    return news_data
+
+
+def write_if_changed(path, data):
+    """
+    Writes data as JSON unless the file already holds exactly that, so the
+    file's mtime only moves when the news changes.
+
+    Returns:
+    - bool: True if the file was written.
+    """
+    body = json.dumps(data, indent=4).encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == body:
+                return False
+    except OSError:
+        pass
+    # Write to a temp file and rename so readers never see a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+    return True
+
+
+_fetcher = ConditionalFetcher(BASE_URL)
+_fetch_lock = threading.Lock()
+_last_news = None
+
+
+def fetch_news(path=NEWS_LINKS_PATH):
+    """
+    Refreshes news_links.json from the MeroLagani homepage.
+
+    Returns:
+    - tuple: The news data and whether news_links.json changed.
+    """
+    global _last_news
+    with _fetch_lock:
+        html = _fetcher.fetch()
+        if html is None:
+            return _last_news, False
+
+        news_data = add_first_seen(parse_news(html), previous_first_seen(path))
+        changed = write_if_changed(path, news_data)
+        _fetcher.processed()
+        _last_news = news_data
+        return news_data, changed
+
+
+def scrape_news():
+    """
+    Saves the MeroLagani homepage news to news_links.json and returns it.
+    Unchanged pages are neither parsed nor written again.
+    """
+    news_data, _ = fetch_news()
+    return news_data
+
+if __name__ == "__main__":
+    # Scheduled by ingest.py; run directly for a one-off scrape
+    try:
+        scrape_news()
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
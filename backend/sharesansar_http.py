@@ -0,0 +1,242 @@
+import os
+import re
+import threading
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+
+# Plain-HTTP access to the data behind ShareSansar's DataTables. Rows come back
+# in the same shape as table_extract.extract_table, so the scrapers can use
+# either path. Anything unexpected raises HttpFetchError and the caller falls
+# back to Selenium.
+
+# Overridable so the scrapers can run against fixture_server.py
+BASE_URL = os.getenv('SHARESANSAR_BASE_URL', "https://www.sharesansar.com").rstrip('/')
+
+HTTP_TIMEOUT = float(os.getenv('SHARESANSAR_HTTP_TIMEOUT', '15'))
+# Rows requested per DataTables page
+HTTP_PAGE_SIZE = int(os.getenv('SHARESANSAR_HTTP_PAGE_SIZE', '50'))
+# Connections kept open per host, shared by all scraper threads
+HTTP_POOL_SIZE = int(os.getenv('SHARESANSAR_HTTP_POOL_SIZE', '8'))
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/131.0 Safari/537.36")
+
+
+class HttpFetchError(Exception):
+    """
+    Raised when a page or data endpoint does not look like the scrapers expect.
+    """
+
+# =========================
+# 1. Pooled session
+# =========================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the shared requests.Session, with keep-alive connections pooled
+    per host and retries on connection errors and 5xx responses.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                          allowed_methods=['GET'])
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+                                  max_retries=retry)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({'User-Agent': USER_AGENT})
+            _session = session
+        return _session
+
+
+def fetch_html(url, params=None):
+    """
+    GETs a page and returns its parsed HTML.
+    """
+    try:
+        response = get_session().get(url, params=params, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise HttpFetchError(f"GET {url} failed: {e}")
+    return BeautifulSoup(response.text, 'html.parser')
+
+# =========================
+# 2. Cells and tables
+# =========================
+
+def parse_cell(cell, base_url=BASE_URL):
+    """
+    Converts a <td> (or an HTML string from a JSON response) into the cell
+    dictionary used by table_extract: 'text', 'link_text' and 'href'.
+    """
+    if isinstance(cell, str):
+        cell = BeautifulSoup(cell, 'html.parser')
+    elif cell is None or not hasattr(cell, 'find'):
+        return {'text': '' if cell is None else str(cell).strip(), 'link_text': None, 'href': None}
+    link = cell.find('a', href=True)
+    return {
+        'text': cell.get_text(' ', strip=True),
+        'link_text': link.get_text(' ', strip=True) if link else None,
+        'href': urljoin(base_url, link['href']) if link else None,
+    }
+
+
+def parse_table_rows(soup, container_selector, row_selector='tbody tr'):
+    """
+    Reads the rows of the first element matching container_selector.
+
+    Raises:
+        HttpFetchError: If the container is not in the page.
+    """
+    container = soup.select_one(container_selector)
+    if container is None:
+        raise HttpFetchError(f"{container_selector} not found")
+    return [[parse_cell(td) for td in row.find_all('td')] for row in container.select(row_selector)]
+
+
+def csrf_token(soup):
+    """
+    Returns the Laravel CSRF token of a page, or None if it has none.
+    """
+    for name in ('csrf-token', '_token'):
+        meta = soup.find('meta', attrs={'name': name})
+        if meta and meta.get('content'):
+            return meta['content']
+    field = soup.find('input', attrs={'name': '_token'})
+    return field.get('value') if field else None
+
+
+def discover_ajax_url(soup, table_id):
+    """
+    Finds the ajax URL in the inline DataTable setup of #table_id, or None.
+    """
+    pattern = re.compile(r"#" + re.escape(table_id) + r"\b[\s\S]{0,3000}?url\s*:\s*['\"]([^'\"]+)['\"]")
+    for script in soup.find_all('script'):
+        match = pattern.search(script.string or '')
+        if match:
+            return urljoin(BASE_URL, match.group(1))
+    return None
+
+# =========================
+# 3. Company pages
+# =========================
+
+class CompanyPage:
+    """
+    A fetched ShareSansar company page: the CSRF token and company id its
+    DataTables send with every request, and the tables' ajax endpoints.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol.upper()
+        self.url = f"{BASE_URL}/company/{symbol.lower()}"
+        self.soup = fetch_html(self.url)
+        self.token = csrf_token(self.soup)
+
+        company_input = self.soup.find('input', attrs={'id': 'companyid'})
+        if company_input is None or not company_input.get('value'):
+            raise HttpFetchError(f"No company id on {self.url}")
+        self.company_id = company_input['value']
+
+    def table_pages(self, table_id, page_size=HTTP_PAGE_SIZE):
+        """
+        Yields the rows of a company DataTable one server-side page at a time,
+        asking the server to sort by the first (date) column, newest first.
+
+        Raises:
+            HttpFetchError: If the endpoint is unknown or its response is not DataTables JSON.
+        """
+        endpoint = discover_ajax_url(self.soup, table_id)
+        if endpoint is None:
+            raise HttpFetchError(f"No ajax endpoint for #{table_id} on {self.url}")
+
+        headers = {'X-Requested-With': 'XMLHttpRequest', 'Referer': self.url}
+        if self.token:
+            headers['X-CSRF-TOKEN'] = self.token
+
+        start = 0
+        draw = 1
+        while True:
+            params = {
+                'draw': draw, 'start': start, 'length': page_size, 'company': self.company_id,
+                # Incremental crawls stop at the first known row, so the order must not be left to the server
+                'columns[0][data]': 0, 'columns[0][orderable]': 'true',
+                'order[0][column]': 0, 'order[0][dir]': 'desc',
+            }
+            try:
+                response = get_session().get(endpoint, params=params, headers=headers, timeout=HTTP_TIMEOUT)
+                response.raise_for_status()
+                payload = response.json()
+            except (requests.RequestException, ValueError) as e:
+                raise HttpFetchError(f"{endpoint} failed: {e}")
+
+            data = payload.get('data') if isinstance(payload, dict) else None
+            if not isinstance(data, list):
+                raise HttpFetchError(f"{endpoint} did not return DataTables JSON")
+
+            try:
+                rows = [self._row_cells(row) for row in data]
+                total = payload.get('recordsFiltered', payload.get('recordsTotal'))
+                total = None if total is None else int(total)
+            except (TypeError, ValueError, KeyError, AttributeError) as e:
+                raise HttpFetchError(f"{endpoint} returned unexpected rows: {e}")
+            yield rows
+
+            start += len(data)
+            if not data or total is None or start >= total:
+                return
+            draw += 1
+
+    @staticmethod
+    def _row_cells(row):
+        # Server-side DataTables rows are either arrays of cell HTML or objects keyed by column
+        values = row.values() if isinstance(row, dict) else row
+        return [parse_cell(value) for value in values]
+
+# =========================
+# 4. Company list
+# =========================
+
+def company_list_sectors(soup):
+    """
+    Returns the sector options of the company list page in crawl order: the
+    selected sector first, then the rest of the dropdown.
+    """
+    select = soup.find('select', attrs={'name': 'sector'})
+    if select is None:
+        raise HttpFetchError("Sector dropdown not found")
+    options = select.find_all('option')
+    selected = select.find('option', selected=True) or (options[0] if options else None)
+
+    sectors = []
+    if selected is not None and selected.get('value'):
+        sectors.append({'id': selected['value'], 'name': selected.get_text(strip=True)})
+    for option in options[1:]:
+        if option.get('value') and (selected is None or option['value'] != selected.get('value')):
+            sectors.append({'id': option['value'], 'name': option.get_text(strip=True)})
+    return sectors
+
+
+def company_list_rows(url, sector_id):
+    """
+    Loads the company list filtered to one sector and returns its table rows.
+
+    Raises:
+        HttpFetchError: If the page did not come back with that sector selected,
+        i.e. the filter is not driven by the query string.
+    """
+    soup = fetch_html(url, params={'sector': sector_id})
+    selected = soup.select_one("select[name='sector'] option[selected]")
+    if selected is None or selected.get('value') != str(sector_id):
+        raise HttpFetchError(f"Sector {sector_id} was not applied by the company list page")
+    return parse_table_rows(soup, '.table-responsive')
@@ -0,0 +1,125 @@
+import os
+import hashlib
+import threading
+
+# Longest a request waits for an identical call that is already running
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', '60'))
+
+
+def input_hash(data):
+    """
+    Returns a short digest of a request's input, for use in a single-flight key.
+
+    Parameters:
+    - data (bytes or str): The request input, e.g. decoded image bytes.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive with the same key while it is running wait for it and receive the
+    same result, or the same exception. Once the call finishes the key is
+    forgotten, so nothing is cached: the next request runs the function again.
+
+    Keys are tuples such as (route, symbol, input hash).
+    """
+
+    def __init__(self, timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.by_route = {}  # Route -> {'leaders': n, 'coalesced': n}
+
+    def _count(self, key, field):
+        route = key[0] if isinstance(key, tuple) and key else key
+        counts = self.by_route.setdefault(route, {'leaders': 0, 'coalesced': 0})
+        counts[field] += 1
+
+    def do(self, key, fn, timeout=None):
+        """
+        Runs fn() unless an identical call is in flight, in which case its result is shared.
+
+        Parameters:
+        - key (tuple): Identifies identical calls, e.g. ('analyze', 'NABIL', input_hash(image)).
+        - fn (callable): The computation, called without arguments.
+        - timeout (float, optional): Longest a follower waits; defaults to the instance timeout.
+
+        Returns:
+        - The result of fn().
+
+        Raises:
+        - TimeoutError: If this caller waited on another's call for longer than timeout.
+        - Exception: Whatever fn() raised, in the leader and in every follower.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                self._count(key, 'leaders')
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self._count(key, 'coalesced')
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values()),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'routes': {route: dict(counts) for route, counts in self.by_route.items()},
+            }
+
+
+# Shared instance used by the Flask routes
+single_flight = SingleFlight()
@@ -0,0 +1,132 @@
+import os
+import joblib
+import numpy as np
+
+import torch
+import torch.nn as nn
+
+from price_history import PRICE_HISTORY_DIR, price_store
+
+# Location of the trained model components; price CSVs live in PRICE_HISTORY_DIR.
+MODEL_ROOT = os.getenv('MODEL_ROOT', 'D:\\Model')
+
+# Symbols with trained models (matches the frontend selector)
+SUPPORTED_SYMBOLS = ['SCB', 'NABIL', 'JBBL', 'API', 'NTC']
+
+# Number of features per timestep the models were trained on
+INPUT_SIZE = 26
+
+# =========================
+# 1. Define the PyTorch Model
+# =========================
+
+class StockLSTM(nn.Module):
+    def __init__(self, input_size, hidden_size, num_layers, output_size):
+        super(StockLSTM, self).__init__()
+        self.hidden_size = hidden_size
+        self.num_layers = num_layers
+        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=0.4)
+        self.fc_layers = nn.Sequential(
+            nn.Linear(hidden_size, 64),
+            nn.ReLU(),
+            nn.Linear(64, 16),
+            nn.ReLU(),
+            nn.Linear(16, output_size)
+        )
+
+    def forward(self, x):
+        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
+        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size).to(x.device)
+        out, _ = self.lstm(x, (h0, c0))
+        out = self.fc_layers(out[:, -1, :])
+        return out
+
+    def step(self, x, state=None):
+        """
+        Incremental inference: runs x of shape [batch, steps, features] starting
+        from a carried (h, c) state instead of a zero state.
+
+        Parameters:
+        - x (Tensor): The new timesteps; a full window on the first call, then one step at a time.
+        - state (tuple, optional): (h, c) returned by the previous call.
+
+        Returns:
+        - tuple: Output for the last timestep [batch, output_size] and the updated (h, c).
+        """
+        if state is None:
+            h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size, device=x.device)
+            c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size, device=x.device)
+            state = (h0, c0)
+        out, state = self.lstm(x, state)
+        return self.fc_layers(out[:, -1, :]), state
+
+# =========================
+# 2. Model Loading Function (Fixed input_size)
+# =========================
+
+def model_file_paths(symbol):
+    """
+    Returns the paths of every file a symbol's model depends on.
+
+    Parameters:
+    - symbol (str): The stock symbol (e.g., SCB, NABIL).
+
+    Returns:
+    - dict: Paths keyed by 'model', 'scaler', 'historical' and 'sequence'.
+    """
+    model_dir = os.path.join(MODEL_ROOT, symbol, 'model_components')
+    return {
+        'model': os.path.join(model_dir, f'{symbol}_model.pth'),
+        'scaler': os.path.join(model_dir, f'{symbol}_scaler.pkl'),
+        'historical': os.path.join(PRICE_HISTORY_DIR, f"{symbol}.csv"),
+        'sequence': os.path.join(model_dir, f'{symbol.lower()}_last_sequence.npy'),
+    }
+
+def load_model_and_scaler(symbol):
+    """
+    Loads a trained PyTorch model, a scaler, and relevant data based on the symbol.
+    """
+    try:
+        paths = model_file_paths(symbol)
+
+        # Check if all required files exist
+        for path in paths.values():
+            if not os.path.exists(path):
+                print(f"Missing file: {path}")
+                return None, None, None, None
+
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+        # Load model with correct input_size (26 features)
+        model = StockLSTM(
+            input_size=INPUT_SIZE,  # Updated to match trained model's expected input
+            hidden_size=128,
+            num_layers=3,
+            output_size=1
+        ).to(device)
+
+        model.load_state_dict(torch.load(paths['model'], map_location=device))
+        model.eval()
+
+        scaler = joblib.load(paths['scaler'])
+        # Memory-mapped columnar copy of the CSV, converted once per change of the file
+        historical_df = price_store.get_frame(symbol)
+
+        if historical_df is None or 'Close' not in historical_df.columns:
+            print("Missing 'Close' column in historical data")
+            return None, None, None, None
+
+        historical_data = historical_df[['Close']]
+        last_sequence = np.load(paths['sequence'], allow_pickle=True)
+
+        # Validate and reshape sequence
+        if last_sequence.ndim == 1:
+            last_sequence = last_sequence.reshape((-1, INPUT_SIZE))  # Match input_size
+        elif last_sequence.shape[1] != INPUT_SIZE:
+            last_sequence = last_sequence[:, -INPUT_SIZE:]
+
+        return model, scaler, historical_data, last_sequence
+
+    except Exception as e:
+        print(f"Error loading model for {symbol}: {str(e)}")
+        return None, None, None, None
@@ -1,59 +1,79 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import os
+from selenium.common.exceptions import WebDriverException
 import json
 
-BASE_URL = "https://eng.merolagani.com"
+from scrape_waits import LatencyBudget, wait_for_script
+from browser_pool import browser_pool
 
-def scrape_summary():
-    # Set up Chrome options for headless mode
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    
-    # Initialize Selenium WebDriver with the options for headless mode
-    driver = webdriver.Chrome(options=options)
-    driver.get(BASE_URL)
+BASE_URL = os.getenv('MEROLAGANI_BASE_URL', "https://eng.merolagani.com").rstrip('/')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MARKET_SUMMARY_PATH = os.path.join(BASE_DIR, 'market-summary-1.json')
+
+# True once the live market summary table has rows with values and its heading has text
+MARKET_SUMMARY_READY_SCRIPT = """
+const table = document.querySelector("table[data-live-label='#label-market-summary-1']");
+const label = document.getElementById('label-market-summary-1');
+if (!table || !label || !label.innerText.trim()) {
+    return false;
+}
+return Array.from(table.querySelectorAll('tr')).some(row => {
+    const cells = row.querySelectorAll('td');
+    return cells.length === 2 && cells[1].innerText.trim() !== '';
+});
+"""
+
+def scrape_summary(path=MARKET_SUMMARY_PATH):
+    """
+    Saves the live market summary to market-summary-1.json.
+
+    Parameters:
+    - path (str): File to save the summary to.
+
+    Returns:
+    - dict: The saved summary, or None if the scrape failed.
+    """
+    # Borrow a headless session from the shared browser pool; the summary may use
+    # the reserved sessions, so crawls filling the pool do not hold it up
+    driver = browser_pool.acquire(priority=True)
+    broken = False
+    result = None
+    budget = LatencyBudget("market summary")
     
     try:
-        # Wait for the table with data-live-label='#label-market-summary-1' to load
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table[data-live-label='#label-market-summary-1']"))
-        )
+        driver.get(BASE_URL)
 
-        # Ensure dynamic updates by adding an additional wait
-        time.sleep(5)  # Adjust this as needed for the website's loading time
+        # Wait until the live table has been filled in and its heading is set
+        wait_for_script(driver, MARKET_SUMMARY_READY_SCRIPT, budget,
+                        message="Timed out waiting for the market summary table")
 
         # Use JavaScript to get the updated HTML of the table
-        table_html = driver.execute_script(
-            "return document.querySelector('table[data-live-label=\"#label-market-summary-1\"]').outerHTML;"
-        )
-
-        # Use JavaScript to get the updated heading
-        heading_text = driver.execute_script(
-            "return document.getElementById('label-market-summary-1').innerText.trim();"
-        )
-
-        # Format the heading
-        formatted_heading = f"Market Summary {heading_text}"
-
-        # Process the table HTML using BeautifulSoup
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(table_html, "html.parser")
-
-        # Extract rows from the table
-        summary_data = {}
-        rows = soup.find_all('tr')
-        for row in rows:
-            cells = row.find_all('td')
-            if len(cells) == 2:
-                key = cells[0].get_text(strip=True)
-                value = cells[1].get_text(strip=True)
-                summary_data[key] = value
+        with budget.extracting():
+            table_html = driver.execute_script(
+                "return document.querySelector('table[data-live-label=\"#label-market-summary-1\"]').outerHTML;"
+            )
+
+            # Use JavaScript to get the updated heading
+            heading_text = driver.execute_script(
+                "return document.getElementById('label-market-summary-1').innerText.trim();"
+            )
+
+            # Format the heading
+            formatted_heading = f"Market Summary {heading_text}"
+
+            # Process the table HTML using BeautifulSoup
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(table_html, "html.parser")
+
+            # Extract rows from the table
+            summary_data = {}
+            rows = soup.find_all('tr')
+            for row in rows:
+                cells = row.find_all('td')
+                if len(cells) == 2:
+                    key = cells[0].get_text(strip=True)
+                    value = cells[1].get_text(strip=True)
+                    summary_data[key] = value
         
         # Combine formatted heading and table data
         result = {
@@ -61,17 +81,24 @@ def scrape_summary():
             "summary": summary_data
         }
 
-        # Save the result as a JSON file
-        with open("market-summary-1.json", "w") as json_file:
+        # Write to a temp file and rename so the app never serves a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as json_file:
             json.dump(result, json_file, indent=4)
+        os.replace(tmp_path, path)
 
-        print("Data has been saved to market-summary-1.json")
+        print(f"Data has been saved to {path}")
     
     except Exception as e:
         print(f"An error occurred: {e}")
+        result = None
+        broken = isinstance(e, WebDriverException)
     
     finally:
-        driver.quit()  # Close the browser
+        budget.report()
+        browser_pool.release(driver, broken)  # Return the browser to the pool
+
+    return result
 
 if __name__ == "__main__":
     scrape_summary()
@@ -0,0 +1,150 @@
+import re
+from bisect import bisect_left
+
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 20
+
+# Shortest word that is matched with typo tolerance, and the longest prefix indexed for it
+MIN_FUZZY_LENGTH = 3
+MAX_FUZZY_PREFIX = 10
+
+# Score of each kind of match; a company's score is the sum over the query words
+MATCH_SCORES = {
+    'symbol': 100,
+    'symbol_prefix': 60,
+    'name': 30,
+    'name_prefix': 20,
+    'symbol_typo': 15,
+    'name_typo': 10,
+}
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def words(text):
+    return WORD_PATTERN.findall((text or '').lower())
+
+
+def deletes(word):
+    """
+    Returns word and every string obtained by deleting one character from it.
+    """
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def within_one_edit(a, b):
+    """
+    True if a and b differ by at most one insertion, deletion, substitution
+    or swap of adjacent characters.
+    """
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
+
+
+class SymbolSuggester:
+    """
+    Autocomplete over company symbols and the words of company names.
+
+    Distinct words are kept in a sorted array, so the words starting with a
+    typed prefix are one binary search away. For typo tolerance, every prefix
+    of 3 to 10 characters of every word is indexed under itself and its
+    one-character deletions; a query word looks up its own deletions, and
+    the candidates are checked to be within one edit of the word's prefix.
+
+    Built from the companies of one CompanySnapshot and immutable afterwards.
+    """
+
+    def __init__(self, companies):
+        self.companies = companies
+        postings = {}  # Word -> {company index: 'symbol' or 'name'}
+        for i, company in enumerate(companies):
+            for word in words(company.get('name')):
+                postings.setdefault(word, {}).setdefault(i, 'name')
+            symbol = (company.get('symbol') or '').lower()
+            if symbol:
+                postings.setdefault(symbol, {})[i] = 'symbol'
+
+        self.words = sorted(postings)
+        self.postings = [postings[word] for word in self.words]
+
+        self.variants = {}
+        for position, word in enumerate(self.words):
+            for length in range(MIN_FUZZY_LENGTH, min(len(word), MAX_FUZZY_PREFIX) + 1):
+                for variant in deletes(word[:length]):
+                    self.variants.setdefault(variant, set()).add(position)
+
+    def _prefix_matches(self, word):
+        matches = {}
+        position = bisect_left(self.words, word)
+        while position < len(self.words) and self.words[position].startswith(word):
+            exact = self.words[position] == word
+            for i, field in self.postings[position].items():
+                kind = field if exact else f"{field}_prefix"
+                matches[i] = max(matches.get(i, 0), MATCH_SCORES[kind])
+            position += 1
+        return matches
+
+    def _typo_matches(self, word):
+        matches = {}
+        candidates = set()
+        for variant in deletes(word[:MAX_FUZZY_PREFIX]):
+            candidates |= self.variants.get(variant, set())
+        for position in candidates:
+            indexed = self.words[position]
+            # Compare against the indexed word's prefix of about the same length as the typed word
+            if not any(within_one_edit(word, indexed[:length])
+                       for length in (len(word) - 1, len(word), len(word) + 1) if length > 0):
+                continue
+            for i, field in self.postings[position].items():
+                matches[i] = max(matches.get(i, 0), MATCH_SCORES[f"{field}_typo"])
+        return matches
+
+    def suggest(self, query, limit=DEFAULT_SUGGESTIONS):
+        """
+        Returns companies whose symbol or name matches every word of the query,
+        each word as a prefix, or within one typo of one when it has at least
+        three characters and too few exact prefix matches.
+
+        Returns:
+        - list: Dicts with 'symbol', 'name', 'sector' and 'score', best first.
+        """
+        limit = max(1, min(int(limit), MAX_SUGGESTIONS))
+        query_words = words(query)
+        if not query_words:
+            return []
+
+        scores = None
+        for word in query_words:
+            matches = self._prefix_matches(word)
+            if len(word) >= MIN_FUZZY_LENGTH and len(matches) < limit:
+                for i, score in self._typo_matches(word).items():
+                    matches.setdefault(i, score)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {i: scores[i] + score for i, score in matches.items() if i in scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(),
+                        key=lambda item: (-item[1], len(self.companies[item[0]].get('symbol') or ''),
+                                          self.companies[item[0]].get('symbol') or ''))
+        return [
+            {
+                'symbol': self.companies[i].get('symbol'),
+                'name': self.companies[i].get('name'),
+                'sector': self.companies[i].get('sector'),
+                'score': score,
+            }
+            for i, score in ranked[:limit]
+        ]
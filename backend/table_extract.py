@@ -0,0 +1,196 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# Every WebDriver call (find_element, .text, get_attribute, click, ...) is an
+# HTTP request to chromedriver. These scripts read or page a whole table in
+# one request instead of one request per row and per cell.
+
+EXTRACT_TABLE_SCRIPT = """
+const container = document.querySelector(arguments[0]);
+const next = arguments[2] ? document.querySelector(arguments[2]) : null;
+if (!container) {
+    return {found: false, rows: [], has_next: false};
+}
+const rows = Array.from(container.querySelectorAll(arguments[1]), row =>
+    Array.from(row.querySelectorAll('td'), cell => {
+        const link = cell.querySelector('a');
+        return {
+            text: cell.innerText.trim(),
+            link_text: link ? link.innerText.trim() : null,
+            href: link ? link.href : null,
+        };
+    })
+);
+return {
+    found: true,
+    rows: rows,
+    has_next: next !== null && !next.classList.contains('disabled'),
+};
+"""
+
+CLICK_NEXT_SCRIPT = """
+const next = document.querySelector(arguments[0]);
+if (!next || next.classList.contains('disabled')) {
+    return false;
+}
+(next.querySelector('a') || next).click();
+return true;
+"""
+
+
+def extract_table(driver, container_selector, row_selector='tbody tr', next_selector=None):
+    """
+    Reads every row of a table in a single execute_script call.
+
+    Parameters:
+    - driver (webdriver.Chrome): The Selenium WebDriver instance.
+    - container_selector (str): CSS selector of the table or its wrapper; the first match is used.
+    - row_selector (str): CSS selector of the rows inside the container.
+    - next_selector (str, optional): CSS selector of the DataTables "Next" button.
+
+    Returns:
+    - dict: 'found' (bool), 'rows' (a list per row of {'text', 'link_text', 'href'}
+      per cell, with link fields None when the cell has no link) and 'has_next'
+      (bool, True if the Next button exists and is not disabled).
+    """
+    return driver.execute_script(EXTRACT_TABLE_SCRIPT, container_selector, row_selector, next_selector)
+
+
+def click_next(driver, next_selector):
+    """
+    Clicks the DataTables "Next" button if it is enabled, in one round trip.
+
+    Returns:
+    - bool: True if the button was clicked, False on the last page.
+    """
+    return bool(driver.execute_script(CLICK_NEXT_SCRIPT, next_selector))
+
+
+def dated_links(rows):
+    """
+    Converts ShareSansar news/announcement rows into (date, title, url) tuples.
+    The title and URL come from the link in the second cell, or 'N/A' when it has none.
+    """
+    for cells in rows:
+        if len(cells) < 2:
+            continue  # e.g. DataTables' "No data available" row
+        date = cells[0]['text']
+        title_cell = cells[1]
+        if title_cell['href']:
+            yield date, title_cell['link_text'], title_cell['href']
+        else:
+            yield date, title_cell['text'], 'N/A'
+
+# =========================
+# Round-trip counting
+# =========================
+
+class RoundTripCounter:
+    """
+    Counts WebDriver commands sent while active, grouped by command name.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_command = {}
+
+    def record(self, command):
+        self.total += 1
+        self.by_command[command] = self.by_command.get(command, 0) + 1
+
+
+@contextmanager
+def count_round_trips(driver):
+    """
+    Counts the WebDriver commands the block sends. Every command, including
+    WebElement calls, goes through driver.execute, so wrapping it sees them all.
+    """
+    counter = RoundTripCounter()
+    original_execute = driver.execute
+
+    def counting_execute(driver_command, params=None):
+        counter.record(driver_command)
+        return original_execute(driver_command, params)
+
+    driver.execute = counting_execute
+    try:
+        yield counter
+    finally:
+        del driver.execute
+
+# =========================
+# Benchmark
+# =========================
+
+def _legacy_extract(driver, container_selector, row_selector='tbody tr'):
+    # What the scrapers did before: find the rows, then ask for each cell's text
+    from selenium.webdriver.common.by import By
+    table = driver.find_element(By.CSS_SELECTOR, container_selector)
+    rows = []
+    for row in table.find_elements(By.CSS_SELECTOR, row_selector):
+        rows.append([cell.text.strip() for cell in row.find_elements(By.TAG_NAME, "td")])
+    return rows
+
+
+def _synthetic_table_url(n_rows=50, n_cols=10):
+    cells = ''.join(f'<td>{{r}}-{c}</td>' for c in range(n_cols - 1))
+    body = ''.join(
+        f'<tr><td><a href="https://example.com/{r}">Row {r}</a></td>{cells.format(r=r)}</tr>'
+        for r in range(n_rows)
+    )
+    html = f'<div class="table-responsive"><table><tbody>{body}</tbody></table></div>'
+    return 'data:text/html;charset=utf-8,' + html
+
+
+def benchmark(driver, url=None, container_selector='.table-responsive', row_selector='tbody tr'):
+    """
+    Compares per-cell extraction with extract_table on one page and prints the
+    number of WebDriver round trips and the time each approach takes.
+
+    Parameters:
+    - driver (webdriver.Chrome): The Selenium WebDriver instance.
+    - url (str, optional): Page to load; defaults to a synthetic 50 x 10 table.
+    - container_selector (str): CSS selector of the table container.
+    - row_selector (str): CSS selector of the rows inside the container.
+
+    Returns:
+    - dict: Round trips and seconds for 'legacy' and 'bulk'.
+    """
+    driver.get(url or _synthetic_table_url())
+    results = {}
+
+    with count_round_trips(driver) as counter:
+        started = time.perf_counter()
+        legacy_rows = _legacy_extract(driver, container_selector, row_selector)
+        results['legacy'] = {'round_trips': counter.total, 'seconds': time.perf_counter() - started}
+
+    with count_round_trips(driver) as counter:
+        started = time.perf_counter()
+        page = extract_table(driver, container_selector, row_selector)
+        results['bulk'] = {'round_trips': counter.total, 'seconds': time.perf_counter() - started}
+
+    bulk_rows = [[cell['text'] for cell in cells] for cells in page['rows']]
+    if bulk_rows != legacy_rows:
+        print("Warning: bulk extraction returned different rows than per-cell extraction")
+
+    print(f"Rows on page: {len(bulk_rows)}")
+    for name, result in results.items():
+        print(f"{name:>6}: {result['round_trips']:5d} round trips, {result['seconds'] * 1000:8.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python table_extract.py [url [container_selector [row_selector]]]
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    driver = webdriver.Chrome(options=options)
+    try:
+        benchmark(driver, *sys.argv[1:4])
+    finally:
+        driver.quit()
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import summary
+from browser_pool import BrowserPool
+
+
+class FakeDriver:
+    def __init__(self, headless=True):
+        self.visited = []
+
+    def get(self, url):
+        # Stops scrape_summary right after it has borrowed the session
+        self.visited.append(url)
+        raise RuntimeError("offline")
+
+    def quit(self):
+        pass
+
+
+def saturated_pool(size=4):
+    pool = BrowserPool(size=size, factory=FakeDriver, reserved=1)
+    # Crawls hold every session they are allowed to borrow
+    borrowed = [pool.acquire(timeout=1) for _ in range(size - 1)]
+    return pool, borrowed
+
+
+def test_shared_borrowers_cannot_take_the_reserved_session():
+    pool, _ = saturated_pool()
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.1)
+
+
+def test_market_summary_gets_a_session_while_the_pool_is_saturated(monkeypatch):
+    pool, borrowed = saturated_pool()
+    monkeypatch.setattr(summary, 'browser_pool', pool)
+
+    started = time.monotonic()
+    assert summary.scrape_summary() is None  # The fake driver fails the page load
+    assert time.monotonic() - started < 1
+    assert pool.stats()['borrows'] == len(borrowed) + 1
+
+    # The reserved session is back, and crawls still only get the shared ones
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.1)
+    pool.release(borrowed[0])
+    assert pool.acquire(timeout=0.1) is not None
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from forecast_store import ForecastStore
+
+
+def make_store(tmp_path, compute):
+    return ForecastStore(compute, ['SCB', 'NABIL'], path=str(tmp_path / 'forecasts.json'),
+                         last_updated_path=str(tmp_path / 'last_updated.txt'))
+
+
+def constant_forecasts(symbols):
+    return {symbol: {'symbol': symbol, 'predictions': [1.0, 2.0]} for symbol in symbols}
+
+
+def test_cold_get_refreshes_in_the_background(tmp_path):
+    release = threading.Event()
+    callers = []
+
+    def compute(symbols):
+        callers.append(threading.current_thread())
+        release.wait(5)
+        return constant_forecasts(symbols)
+
+    store = make_store(tmp_path, compute)
+
+    # Nothing is stored yet, so the caller gets None instead of waiting for compute
+    assert store.get('SCB') is None
+    assert store.get('NABIL') is None
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while store.get('SCB') is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert store.get('SCB') is not None
+    assert threading.current_thread() not in callers
+    assert len(callers) == 1
+
+
+def test_etag_depends_only_on_the_forecast(tmp_path):
+    first = make_store(tmp_path / 'a', constant_forecasts)
+    second = make_store(tmp_path / 'b', constant_forecasts)
+    first.refresh()
+    for _ in range(3):
+        second.refresh()
+
+    assert first.revision != second.revision
+    assert first.get('SCB')['etag'] == second.get('SCB')['etag']
+    assert first.get('SCB')['etag'] != first.get('NABIL')['etag']
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import torch
+from sklearn.preprocessing import MinMaxScaler
+
+import forecasting
+from stock_model import INPUT_SIZE, StockLSTM
+from forecasting import StackedStockLSTM, forecast_many, rollout_stateful, rollout_windowed
+
+# Architecture of the deployed models (see stock_model.load_model_and_scaler)
+HIDDEN_SIZE = 128
+NUM_LAYERS = 3
+HORIZON = 30
+
+# Stacked and per-model evaluation do the same arithmetic in a different order
+STACKED_ATOL = 1e-5
+# Max absolute difference allowed between the stateful and windowed rollouts, in scaled
+# 'Close' units (prices are scaled to about [0, 1]), by window length. Carrying (h, c)
+# keeps a trace of the rows the window has dropped; the shorter the window, the less of
+# that trace has decayed by the time a row drops out.
+STATEFUL_ATOL = {10: 2e-4, 60: 1e-6}
+
+
+def make_models(count, seed=0):
+    torch.manual_seed(seed)
+    return [StockLSTM(INPUT_SIZE, HIDDEN_SIZE, NUM_LAYERS, 1).eval() for _ in range(count)]
+
+
+def make_sequences(count, seq_len, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    return torch.rand(count, seq_len, INPUT_SIZE, generator=generator)
+
+
+def test_stacked_models_match_individual_models():
+    models = make_models(3)
+    sequences = make_sequences(3, 60)
+
+    stacked = rollout_windowed(StackedStockLSTM(models), sequences, HORIZON)
+    individual = np.concatenate([
+        rollout_windowed(model, sequences[i:i + 1], HORIZON) for i, model in enumerate(models)
+    ])
+
+    np.testing.assert_allclose(stacked, individual, rtol=0, atol=STACKED_ATOL)
+
+
+@pytest.mark.parametrize('seq_len', sorted(STATEFUL_ATOL))
+def test_stateful_rollout_matches_windowed(seq_len):
+    models = make_models(3)
+    sequences = make_sequences(3, seq_len)
+
+    for network in (models[0], StackedStockLSTM(models)):
+        batch = sequences[:1] if network is models[0] else sequences
+        windowed = rollout_windowed(network, batch, HORIZON)
+        stateful = rollout_stateful(network, batch, HORIZON)
+
+        # The first step sees the same window from a zero state in both rollouts
+        np.testing.assert_allclose(stateful[:, 0], windowed[:, 0], rtol=0, atol=STACKED_ATOL)
+        np.testing.assert_allclose(stateful, windowed, rtol=0, atol=STATEFUL_ATOL[seq_len])
+
+
+def make_components(count, seq_len=60):
+    scaler = MinMaxScaler().fit(np.random.default_rng(0).uniform(100, 1500, size=(50, INPUT_SIZE)))
+    sequences = make_sequences(count, seq_len).numpy()
+    return {
+        f"S{i}": (model, scaler, None, sequences[i])
+        for i, model in enumerate(make_models(count))
+    }
+
+
+def test_forecast_many_uses_stateful_rollout_that_passes_the_parity_check():
+    components = make_components(2)
+
+    windowed = forecast_many(components, HORIZON, stateful=False)
+    stateful = forecast_many(components, HORIZON, stateful=True)
+
+    for symbol, (model, _, _, _) in components.items():
+        assert forecasting._stateful_verdicts[model] is True
+        np.testing.assert_allclose(stateful[symbol], windowed[symbol], rtol=forecasting.FORECAST_PARITY_RTOL)
+
+
+def test_forecast_many_keeps_models_failing_the_parity_check_on_the_windowed_rollout(monkeypatch):
+    components = make_components(2)
+    models = [model for model, _, _, _ in components.values()]
+
+    def diverging_rollout(network, sequences, horizon):
+        return rollout_stateful(network, sequences, horizon) + 0.5
+
+    monkeypatch.setattr(forecasting, 'rollout_stateful', diverging_rollout)
+    windowed = forecast_many(components, HORIZON, stateful=False)
+    first = forecast_many(components, HORIZON, stateful=True)
+    second = forecast_many(components, HORIZON, stateful=True)
+
+    assert all(forecasting._stateful_verdicts[model] is False for model in models)
+    for symbol in components:
+        np.testing.assert_allclose(first[symbol], windowed[symbol])
+        np.testing.assert_allclose(second[symbol], windowed[symbol])
@@ -0,0 +1,29 @@
+import csv
+from datetime import date
+
+from search_index import SearchIndex
+
+
+def write_csv(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'Title', 'URL'])
+        writer.writerows(rows)
+
+
+def test_search_finds_financial_reports_by_kind(tmp_path):
+    write_csv(tmp_path / 'SCB' / 'sharesansar_financial_reports.csv', [
+        ('2024-10-23', 'SCB posted a net profit and published its 1st quarter report', 'https://example.com/scb-q1'),
+    ])
+    write_csv(tmp_path / 'SCB' / 'sharesansar_news.csv', [
+        ('2024-10-24', 'SCB quarter profit rises', 'https://example.com/scb-news'),
+    ])
+    index = SearchIndex(root=str(tmp_path))
+
+    results = index.search('quarter profit', kind='financial_report', today=date(2024, 11, 1))
+
+    assert [result['url'] for result in results] == ['https://example.com/scb-q1']
+    assert results[0]['kinds'] == ['financial_report']
+    assert results[0]['symbols'] == ['SCB']
+    assert len(index.search('quarter profit', today=date(2024, 11, 1))) == 2
@@ -1,6 +1,5 @@
 import React, { useState, useEffect } from 'react';
 import { Line } from 'react-chartjs-2';
-import Papa from 'papaparse';
 import {
   Chart as ChartJS,
   CategoryScale,
@@ -114,57 +113,45 @@ const Home = () => {
   useEffect(() => {
     const fetchChartData = async () => {
       try {
-        const response = await fetch('/NEPSE.csv');
-        const csvText = await response.text();
-
-        Papa.parse(csvText, {
-          header: true,
-          skipEmptyLines: true,
-          complete: (results) => {
-            const filteredData = results.data
-              .filter((row) => row.Date && row.Close)
-              .filter((row) => {
-                const date = new Date(row.Date);
-                return date.getFullYear() >= 2024;
-              })
-              .sort((a, b) => new Date(a.Date) - new Date(b.Date));
-
-            const monthFirstAppearance = {};
-            const labels = [];
-            const dates = [];
-            const values = [];
-
-            filteredData.forEach((row) => {
-              const date = new Date(row.Date);
-              const monthKey = date.toLocaleDateString('en-US', {
-                month: 'short',
-                year: 'numeric'
-              });
+        // Daily closes since the start of 2024, as columnar arrays
+        const response = await fetch(
+          'http://localhost:5000/api/history/NEPSE?start=2024-01-01&resolution=raw'
+        );
+        if (!response.ok) {
+          throw new Error(`History request failed with status ${response.status}`);
+        }
+        const series = await response.json();
 
-              if (!monthFirstAppearance[monthKey]) {
-                monthFirstAppearance[monthKey] = true;
-                labels.push(
-                  date.toLocaleDateString('en-US', { month: 'short' })
-                );
-              } else {
-                labels.push('');
-              }
+        const monthFirstAppearance = {};
+        const labels = [];
+        const dates = [];
+        const values = [];
 
-              dates.push(row.Date);
-              values.push(parseFloat(row.Close));
-            });
+        series.date.forEach((rawDate, index) => {
+          if (series.close[index] === null) return;
+          const date = new Date(rawDate);
+          const monthKey = date.toLocaleDateString('en-US', {
+            month: 'short',
+            year: 'numeric'
+          });
 
-            setChartData({ labels, values, dates });
-            setLoading(false);
-          },
-          error: (error) => {
-            console.error('Error parsing CSV:', error);
-            setError('Error loading chart data');
-            setLoading(false);
+          if (!monthFirstAppearance[monthKey]) {
+            monthFirstAppearance[monthKey] = true;
+            labels.push(
+              date.toLocaleDateString('en-US', { month: 'short' })
+            );
+          } else {
+            labels.push('');
           }
+
+          dates.push(rawDate);
+          values.push(series.close[index]);
         });
+
+        setChartData({ labels, values, dates });
+        setLoading(false);
       } catch (error) {
-        console.error('Error fetching CSV:', error);
+        console.error('Error fetching NEPSE history:', error);
         setError('Error loading chart data');
         setLoading(false);
       }
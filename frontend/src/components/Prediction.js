@@ -7,7 +7,7 @@ const Prediction = () => {
   const [selectedSector, setSelectedSector] = useState('');
   const [selectedScript, setSelectedScript] = useState('');
   const [showError, setShowError] = useState(false);
-  const [plotImage, setPlotImage] = useState(''); // To store the base64 image from prediction
+  const [plotImage, setPlotImage] = useState(''); // To store the prediction chart URL
   const [plotError, setPlotError] = useState(''); // To store error messages from prediction
   const [showAIPanel, setShowAIPanel] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
@@ -96,8 +96,8 @@ const Prediction = () => {
         const data = await response.json();
 
         if (data.success) {
-          // Set the plot image using base64 data
-          setPlotImage(`data:image/png;base64,${data.graph}`);
+          // Charts are served from their own cacheable URL
+          setPlotImage(`http://localhost:5000${data.graph_url}`);
         } else {
           // Display error message
           setPlotError(data.error || 'Prediction failed. Please try again.');